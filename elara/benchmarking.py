@@ -7,7 +7,7 @@ import logging
 import json
 from matplotlib import pyplot as plt
 
-from elara.factory import WorkStation, Tool
+from elara.factory import WorkStation, Tool, output_name, read_table
 from elara import get_benchmark_data
 from elara.helpers import try_sort_on_numeric_index
 
@@ -77,11 +77,17 @@ class CsvComparison(BenchmarkTool):
         # Read benchmark and simulation csv files
         self.logger.debug(f"Loading BM data from {self.benchmark_data_path}")
         self.logger.debug(f"Using indices '{self.index_fields}'")
-        benchmarks_df = pd.read_csv(self.benchmark_data_path, index_col=self.index_fields)
+        if self.unsafe_load:  # benchmark data is an elara output, in the configured output format
+            benchmarks_df = read_table(
+                output_name(self.benchmark_data_path, self.output_format),
+                self.output_format,
+                index_col=self.index_fields
+            )
+        else:
+            benchmarks_df = pd.read_csv(self.benchmark_data_path, index_col=self.index_fields)
 
-        simulation_path = os.path.join(self.config.output_path, self.simulation_name)
-        self.logger.debug(f"Loading Simulation data from {simulation_path}")
-        simulation_df = pd.read_csv(simulation_path, index_col=self.index_fields)
+        self.logger.debug(f"Loading Simulation data from {self.simulation_name}")
+        simulation_df = self.read_csv(self.simulation_name, index_col=self.index_fields)
 
         # compare
         bm_df = pd.concat([benchmarks_df[self.value_field], simulation_df[self.value_field]], axis = 1)
@@ -673,8 +679,7 @@ class LinkCounterComparison(BenchmarkTool):
         # Extract simulation results
         # Build paths and load appropriate volume counts from previous workstation
         results_name = f"link_vehicle_counts_{self.mode}.csv"
-        results_path = os.path.join(self.config.output_path, results_name)
-        results_df = pd.read_csv(results_path)
+        results_df = self.read_csv(results_name)
         results_df.index = results_df.link_id.map(str)  # indices converted to strings
         results_df = results_df[[str(h) for h in range(24)]]  # just keep hourly counts
 
@@ -931,8 +936,7 @@ class TransitInteractionComparison(BenchmarkTool):
         model_results = {}
         for direction in ["boardings", "alightings"]:
             results_name = f"stop_passenger_counts_{self.mode}_{direction}.csv"
-            results_path = os.path.join(self.config.output_path, results_name)
-            results_df = pd.read_csv(results_path, index_col=0,dtype={0:str})
+            results_df = self.read_csv(results_name, index_col=0,dtype={0:str})
             results_df = results_df[[str(h) for h in range(24)]]  # just keep hourly counts
             results_df.index = results_df.index.map(str)  # indices converted to strings
             results_df.index.name = 'stop_id'
@@ -1184,8 +1188,7 @@ class PassengerStopToStop(BenchmarkTool):
         # Extract simulation results
         # Build paths and load appropriate volume counts from previous workstation
         results_name = f"stop_to_stop_passenger_counts_{self.mode}.csv"
-        results_path = os.path.join(self.config.output_path, results_name)
-        results_df = pd.read_csv(results_path, index_col=False,dtype = {0:str})
+        results_df = self.read_csv(results_name, index_col=False,dtype = {0:str})
         results_df.origin = results_df.origin.map(str)  # indices converted to strings
         results_df.destination = results_df.destination.map(str)  # indices converted to strings
         results_df = results_df.set_index(["origin", "destination"])
@@ -1510,8 +1513,12 @@ class InputModeComparison(BenchmarkTool):
         usecols = ['agent', 'seq', 'mode']
         indexcols = ['agent', 'seq']
 
-        trips_input = pd.read_csv(self.benchmark_data_path, usecols=usecols, header=0).set_index(indexcols)
-        trips_output = pd.read_csv(self.simulation_data_path, usecols=usecols, header=0).set_index(indexcols)
+        trips_input = read_table(
+            output_name(self.benchmark_data_path, self.output_format), self.output_format, usecols=usecols, header=0
+        ).set_index(indexcols)
+        trips_output = read_table(
+            output_name(self.simulation_data_path, self.output_format), self.output_format, usecols=usecols, header=0
+        ).set_index(indexcols)
 
         trips_input.rename({'mode': 'prev_mode'}, axis=1, inplace=True)
         trips_output.rename({'mode': 'new_mode'}, axis=1, inplace=True)
@@ -1643,8 +1650,7 @@ class PointsCounter(BenchmarkTool):
         # Extract simulation results
         # Build paths and load appropriate volume counts from previous workstation
         results_name = "link_vehicle_counts_{}.csv".format(self.mode)
-        results_path = os.path.join(self.config.output_path, results_name)
-        results_df = pd.read_csv(results_path)
+        results_df = self.read_csv(results_name)
         results_df.index = results_df.link_id.map(str)
 
         results_df = results_df[[str(h) for h in range(24)]]  # just keep counts
@@ -1776,8 +1782,7 @@ class Cordon(BenchmarkTool):
 
         # Build paths and load appropriate volume counts
         results_name = "link_vehicle_counts_{}.csv".format(self.mode)
-        results_path = os.path.join(self.config.output_path, results_name)
-        results_df = pd.read_csv(results_path, index_col=0)
+        results_df = self.read_csv(results_name, index_col=0)
         results_df.index.name = 'link_id'
 
         # get scores and write outputs
@@ -2130,6 +2135,8 @@ class BenchmarkWorkStation(WorkStation):
     WorkStation class for building benchmarks.
     """
 
+    concurrent_build = True
+
     tools = {
         # trip mode shares and counts
         "trip_mode_shares_comparison": TripModeSharesComparison,
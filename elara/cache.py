@@ -0,0 +1,338 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import geopandas as gdp
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from elara import __version__
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_SAMPLE_SIZE = 1 << 20
+
+# config settings that tool results depend on, other than input files and tool options
+RESULT_CONFIG_ATTRIBUTES = [
+    "time_periods", "scale_factor", "version", "using_experienced_plans", "contract",
+    "output_format", "geometry_format", "spatial_format",
+]
+EVENT_BATCH_SIZE = 65536
+
+# event attributes stored as dictionary encoded columns, all other attributes are kept in a map column
+EVENT_ID_COLUMNS = ["type", "vehicle", "person", "link", "facility"]
+EVENT_SCHEMA = pa.schema(
+    [("time", pa.float64())]
+    + [(column, pa.dictionary(pa.int32(), pa.string())) for column in EVENT_ID_COLUMNS]
+    + [("attributes", pa.map_(pa.string(), pa.string()))]
+)
+
+
+def file_fingerprint(path, sample_size=FINGERPRINT_SAMPLE_SIZE) -> str:
+    """
+    Build a cheap fingerprint of a (potentially very large) input file from its size, modification
+    time and a hash of its first and last bytes.
+    :param path: file path string
+    :param sample_size: number of bytes hashed from each end of the file
+    :return: hex digest string
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(sample_size))
+        if stat.st_size > sample_size:
+            f.seek(-sample_size, os.SEEK_END)
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def stat_fingerprint(path, size, mtime_ns) -> str:
+    """
+    Memoised file_fingerprint(), for a file of given size and modification time.
+    """
+    return file_fingerprint(path)
+
+
+def input_fingerprint(path) -> str:
+    """
+    Fingerprint an input file, computed once per version (size and modification time) of the file.
+    :param path: file path string
+    :return: hex digest string
+    """
+    stat = os.stat(path)
+    return stat_fingerprint(path, stat.st_size, stat.st_mtime_ns)
+
+
+def result_fingerprint(tool) -> str:
+    """
+    Build a fingerprint of the results of a tool instance, from its class and options, the config
+    settings that results depend on, the package version and the fingerprints of the input files.
+    File path options (eg benchmark data) are fingerprinted by content rather than by path.
+    :param tool: Tool
+    :return: hex digest string
+    """
+    config = tool.config
+    parts = [
+        __version__,
+        f"{tool.__class__.__module__}.{tool.__class__.__name__}",
+        repr(tool.mode),
+        repr(tool.groupby_person_attribute),
+        repr(tool.compression),
+    ]
+    for name, value in sorted((tool.kwargs or {}).items()):
+        if isinstance(value, str) and os.path.isfile(value):
+            value = input_fingerprint(value)
+        parts.append(f"{name}={value!r}")
+    for name in RESULT_CONFIG_ATTRIBUTES:
+        parts.append(f"{name}={getattr(config, name, None)!r}")
+    parts.append(f"crs={config.settings['scenario'].get('crs')!r}")
+    for name, path in sorted(config.settings.get("inputs", {}).items()):
+        if isinstance(path, str) and os.path.isfile(path):
+            parts.append(f"{name}={input_fingerprint(path)}")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def result_cache_path(tool) -> str:
+    """
+    Get the result cache directory path of a tool instance, under the config cache path.
+    :param tool: Tool
+    :return: path string
+    """
+    return os.path.join(tool.config.cache_path, "results", f"{tool.name}-{result_fingerprint(tool)[:16]}")
+
+
+def write_result_files(path: str, file_paths: list) -> None:
+    """
+    Copy the output files of a tool to a result cache directory.
+    The directory is written to a temporary location first and moved into place when complete.
+    :param path: result cache directory path string
+    :param file_paths: list of output file path strings
+    :return: None
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    for file_path in file_paths:
+        shutil.copy2(file_path, os.path.join(tmp_path, os.path.basename(file_path)))
+    try:
+        os.replace(tmp_path, path)
+        logger.debug(f"Written results cache to {path}")
+    except OSError:  # another process has already written this cache
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_result_files(path: str, output_path: str) -> list:
+    """
+    Copy the cached output files of a tool from a result cache directory to the output directory.
+    :param path: result cache directory path string
+    :param output_path: output directory path string
+    :return: list of restored file path strings
+    """
+    restored = []
+    for file_name in sorted(os.listdir(path)):
+        restored.append(shutil.copy2(os.path.join(path, file_name), os.path.join(output_path, file_name)))
+    return restored
+
+
+def cache_file_path(cache_path, source_path, suffix="", name=None, key="") -> str:
+    """
+    Build the cache file path for a given source file. The path includes the source fingerprint so
+    that changed inputs are never matched to stale caches.
+    :param cache_path: cache directory path string, created if missing
+    :param source_path: source file path string
+    :param suffix: cache file suffix, e.g. '.parquet'
+    :param name: optional cache file name prefix, defaults to the source file name
+    :param key: optional string of other build options that the cached content depends on
+    :return: cache file path string
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    if name is None:
+        name = os.path.basename(source_path).split(".")[0]
+    digest = hashlib.sha1(f"{file_fingerprint(source_path)}:{key}".encode()).hexdigest()
+    return os.path.join(cache_path, f"{name}-{digest[:16]}{suffix}")
+
+
+def write_state(path: str, state: dict) -> None:
+    """
+    Write a dictionary of built tool state to a cache directory. GeoDataFrames are written as
+    GeoParquet, everything else (mappings, lists, counts) is pickled together.
+    The directory is written to a temporary location first and moved into place when complete.
+    :param path: cache directory path string
+    :param state: dictionary of attribute names to values
+    :return: None
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    others = {}
+    for name, value in state.items():
+        if isinstance(value, gdp.GeoDataFrame):
+            value.to_parquet(os.path.join(tmp_path, f"{name}.parquet"))
+        else:
+            others[name] = value
+    with open(os.path.join(tmp_path, "state.pkl"), "wb") as f:
+        pickle.dump(others, f, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        os.replace(tmp_path, path)
+        logger.info(f"Written cache to {path}")
+    except OSError:  # another process has already written this cache
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_state(path: str) -> dict:
+    """
+    Read a dictionary of built tool state from a cache directory written by write_state.
+    :param path: cache directory path string
+    :return: dictionary of attribute names to values
+    """
+    logger.info(f"Reading cache from {path}")
+    with open(os.path.join(path, "state.pkl"), "rb") as f:
+        state = pickle.load(f)
+    for file_name in os.listdir(path):
+        if file_name.endswith(".parquet"):
+            state[file_name[:-len(".parquet")]] = gdp.read_parquet(os.path.join(path, file_name))
+    return state
+
+
+class CachedEvent(dict):
+    """
+    Lightweight element-like adapter for cached events. Supports the elem.get(key) access used by
+    the event handlers, missing attributes return None.
+    """
+    tag = "event"
+
+    @property
+    def attrib(self):
+        return self
+
+
+def write_event_cache(elems: Iterable, path: str) -> Iterator:
+    """
+    Pass through xml event elements, writing their attributes to a parquet cache as a side effect.
+    The cache is written to a temporary file and only moved to path once all events have been
+    consumed, so partially consumed streams never leave a (truncated) cache behind.
+    :param elems: iterable of xml event elements
+    :param path: cache file path string
+    :return: generator of the original xml event elements
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = pq.ParquetWriter(tmp_path, EVENT_SCHEMA)
+    complete = False
+    rows = []
+    try:
+        for elem in elems:
+            rows.append(dict(elem.attrib))
+            if len(rows) == EVENT_BATCH_SIZE:
+                writer.write_table(event_table(rows))
+                rows = []
+            yield elem
+        if rows:
+            writer.write_table(event_table(rows))
+        complete = True
+    finally:
+        writer.close()
+        if complete:
+            os.replace(tmp_path, path)
+            logger.info(f"Written events cache to {path}")
+        else:
+            os.remove(tmp_path)
+
+
+def event_table(rows: list) -> pa.Table:
+    """
+    Build arrow table of events from a list of event attribute dictionaries.
+    :param rows: list of event attribute dictionaries
+    :return: pyarrow.Table
+    """
+    columns = [pa.array([float(row.pop("time")) for row in rows], type=pa.float64())]
+    for column in EVENT_ID_COLUMNS:
+        values = pa.array([row.pop(column, None) for row in rows], type=pa.string())
+        columns.append(values.dictionary_encode())
+    columns.append(pa.array([list(row.items()) for row in rows], type=EVENT_SCHEMA.field("attributes").type))
+    return pa.Table.from_arrays(columns, schema=EVENT_SCHEMA)
+
+
+def read_event_cache(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[CachedEvent]:
+    """
+    Stream events from a parquet cache as element-like objects, in their original order.
+    :param path: cache file path string
+    :param start: first event (row) to read
+    :param stop: Optional end event (row), exclusive, defaults to all remaining events
+    :return: generator of CachedEvent
+    """
+    logger.info(f"Reading events from cache {path}")
+    source = pq.ParquetFile(path)
+    if stop is None:
+        stop = source.metadata.num_rows
+
+    # only read the row groups overlapping the requested rows
+    row_groups = []
+    position = None
+    offset = 0
+    for i in range(source.num_row_groups):
+        num_rows = source.metadata.row_group(i).num_rows
+        if offset < stop and offset + num_rows > start:
+            row_groups.append(i)
+            if position is None:
+                position = offset
+        offset += num_rows
+    if not row_groups:
+        return
+
+    for batch in source.iter_batches(batch_size=EVENT_BATCH_SIZE, row_groups=row_groups):
+        lower = max(start - position, 0)
+        upper = min(stop - position, batch.num_rows)
+        position += batch.num_rows
+        if lower >= upper:
+            continue
+        if lower > 0 or upper < batch.num_rows:
+            batch = batch.slice(lower, upper - lower)
+        columns = [batch.column(name).to_pylist() for name in ["time"] + EVENT_ID_COLUMNS]
+        attributes = batch.column("attributes").to_pylist()
+        for values, others in zip(zip(*columns), attributes):
+            event = CachedEvent(others)
+            for name, value in zip(["time"] + EVENT_ID_COLUMNS, values):
+                if value is not None:
+                    event[name] = value
+            yield event
+
+
+def plan_event_partitions(path: str, partitions: int, period: float) -> Optional[List[Tuple[int, int]]]:
+    """
+    Split the events in a parquet cache into (up to) a number of contiguous row ranges of roughly
+    equal size. Ranges are cut at multiples of the given time period so that no time period (or
+    event time) is split between ranges. Only the time column is read.
+    Returns None if the events are not in time order.
+    :param path: cache file path string
+    :param partitions: target number of ranges
+    :param period: time period (seconds) that range boundaries are aligned to
+    :return: Optional list of (start, stop) row ranges, stop exclusive
+    """
+    source = pq.ParquetFile(path)
+    counts = np.zeros(0, dtype=np.int64)
+    last = 0.0
+    for batch in source.iter_batches(batch_size=EVENT_BATCH_SIZE, columns=["time"]):
+        times = batch.column(0).to_numpy()
+        if not len(times):
+            continue
+        if times[0] < last or (np.diff(times) < 0).any():
+            return None
+        last = times[-1]
+        batch_counts = np.bincount(np.floor(times / period).astype(np.int64))
+        if len(batch_counts) > len(counts):
+            counts = np.pad(counts, (0, len(batch_counts) - len(counts)))
+        counts[:len(batch_counts)] += batch_counts
+
+    # offsets[i] is the first row of period i
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    total = int(offsets[-1])
+    boundaries = sorted({
+        int(offsets[np.searchsorted(offsets, total * k / partitions)]) for k in range(1, partitions)
+    })
+    starts = [0] + boundaries
+    stops = boundaries + [total]
+    return [(start, stop) for start, stop in zip(starts, stops) if start < stop]
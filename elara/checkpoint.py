@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import pickle
+import time
+from typing import Optional, Tuple
+
+from elara import cache
+from elara.factory import BackgroundWriting, TableChunkWriting
+
+logger = logging.getLogger(__name__)
+
+# file name of the events checkpoint, in the output directory
+CHECKPOINT_NAME = ".events_checkpoint.pkl"
+# values that are pickled by value, rather than referenced as shared objects
+SCALARS = (str, bytes, int, float, bool, complex)
+# number of events between checks of the time since the last checkpoint
+CLOCK_EVENTS = 1000
+
+
+def shared_objects(roots: dict) -> dict:
+    """
+    Index the objects reachable from the given roots (eg the config and the input resources) by a
+    stable key (their path from the roots), descending into containers and elara objects. These are
+    rebuilt (identically) on resume, so they are referenced by key, rather than pickled with the
+    handlers.
+    :param roots: dict of root objects, keyed by name
+    :return: dict of {id(object): (key, object)}
+    """
+    shared = {}
+    stack = list(roots.items())
+    while stack:
+        key, obj = stack.pop()
+        if id(obj) in shared:
+            continue
+        shared[id(obj)] = (key, obj)
+        if isinstance(obj, dict):
+            children = obj.items()
+        elif isinstance(obj, (list, tuple)):
+            children = enumerate(obj)
+        elif type(obj).__module__.startswith("elara") and hasattr(obj, "__dict__"):
+            children = vars(obj).items()
+        else:
+            continue
+        for name, child in children:
+            if child is not None and not isinstance(child, SCALARS):
+                stack.append((f"{key}/{name!r}", child))
+    return shared
+
+
+class CheckpointPickler(pickle.Pickler):
+    """
+    Pickler referencing shared objects (see shared_objects()) by key.
+    """
+
+    def __init__(self, file, shared: dict) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj) -> Optional[str]:
+        entry = self.shared.get(id(obj))
+        if entry is not None and entry[1] is obj:
+            return entry[0]
+        return None
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+    """
+    Unpickler resolving references to shared objects (see shared_objects()) by key.
+    """
+
+    def __init__(self, file, shared: dict) -> None:
+        super().__init__(file)
+        self.objects = {key: obj for key, obj in shared.values()}
+
+    def persistent_load(self, key: str):
+        if key not in self.objects:
+            raise pickle.UnpicklingError(f"Checkpoint references unknown object {key}")
+        return self.objects[key]
+
+
+def chunk_writers(handler) -> list:
+    """
+    Get the chunk writers of a handler.
+    :param handler: Tool
+    :return: list of chunk writers
+    """
+    return [value for value in vars(handler).values() if isinstance(value, BackgroundWriting)]
+
+
+def resumable(handlers: dict) -> bool:
+    """
+    Check that all chunk writers of the handlers write csv files, which can be truncated back to a
+    checkpoint. Columnar (parquet, feather and arrow) files are only complete once closed.
+    :param handlers: dict of handlers
+    :return: bool
+    """
+    for name, handler in handlers.items():
+        for writer in chunk_writers(handler):
+            if not isinstance(writer, TableChunkWriting) or writer.file_format != "csv":
+                logger.warning(f"{name} writes {writer.path} as a columnar file, which can't be checkpointed")
+                return False
+    return True
+
+
+def checkpoint_key(handlers: dict) -> str:
+    """
+    Build a key of the handlers and their results, see cache.result_fingerprint(), so that
+    checkpoints are only resumed by the same handlers, with the same options and inputs.
+    :param handlers: dict of handlers
+    :return: hex digest string
+    """
+    parts = [f"{name}={cache.result_fingerprint(handler)}" for name, handler in handlers.items()]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def write_checkpoint(path: str, key: str, count: int, handlers: dict, shared: dict) -> None:
+    """
+    Write a checkpoint of the handlers after a number of events. Chunk writers first write all
+    handed over chunks and record the size of their written files. The checkpoint is written to
+    a temporary file first and moved into place when complete.
+    :param path: checkpoint file path string
+    :param key: checkpoint key, see checkpoint_key()
+    :param count: number of events processed
+    :param handlers: dict of handlers
+    :param shared: shared objects, see shared_objects()
+    :return: None
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((key, count), f, protocol=pickle.HIGHEST_PROTOCOL)
+        CheckpointPickler(f, shared).dump(handlers)
+    os.replace(tmp_path, path)
+    logger.info(f"Checkpointed handlers after {count} events to {path}")
+
+
+def read_checkpoint(path: str, key: str, shared: dict) -> Optional[Tuple[int, dict]]:
+    """
+    Read a checkpoint of the handlers, if one exists for the given key. Files written by chunk
+    writers after the checkpoint are truncated back to their checkpointed size.
+    :param path: checkpoint file path string
+    :param key: checkpoint key, see checkpoint_key()
+    :param shared: shared objects, see shared_objects()
+    :return: Optional (number of events processed, dict of handlers)
+    """
+    if not os.path.exists(path):
+        logger.warning(f"No checkpoint found at {path}, processing all events")
+        return None
+    with open(path, "rb") as f:
+        checkpointed_key, count = pickle.load(f)
+        if checkpointed_key != key:
+            logger.warning(f"Checkpoint at {path} is for other handlers or inputs, processing all events")
+            return None
+        handlers = CheckpointUnpickler(f, shared).load()
+    for handler in handlers.values():
+        for writer in chunk_writers(handler):
+            writer.rewind()
+    logger.info(f"Resuming handlers from checkpoint after {count} events")
+    return count, handlers
+
+
+class Checkpointer:
+    """
+    Write checkpoints of handlers every number of events and/or minutes, see write_checkpoint().
+    Called with the number of events processed after each event.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            key: str,
+            handlers: dict,
+            shared: dict,
+            events: Optional[int] = None,
+            minutes: Optional[float] = None,
+            start: int = 0,
+    ) -> None:
+        """
+        :param path: checkpoint file path string
+        :param key: checkpoint key, see checkpoint_key()
+        :param handlers: dict of handlers
+        :param shared: shared objects, see shared_objects()
+        :param events: Optional number of events between checkpoints
+        :param minutes: Optional number of minutes between checkpoints
+        :param start: number of events already processed, eg when resuming
+        """
+        self.path = path
+        self.key = key
+        self.handlers = handlers
+        self.shared = shared
+        self.events = events
+        self.seconds = minutes * 60 if minutes else None
+        self.reset(start)
+
+    def reset(self, count: int) -> None:
+        self.next_count = count + self.events if self.events else None
+        self.deadline = time.monotonic() + self.seconds if self.seconds else None
+
+    def __call__(self, count: int) -> None:
+        if self.next_count is not None and count >= self.next_count:
+            self.write(count)
+        elif self.deadline is not None and not count % CLOCK_EVENTS and time.monotonic() >= self.deadline:
+            self.write(count)
+
+    def write(self, count: int) -> None:
+        write_checkpoint(self.path, self.key, count, self.handlers, self.shared)
+        self.reset(count)
@@ -1,7 +1,7 @@
 import json
 import os.path
 import toml
-from elara.factory import WorkStation, Tool
+from elara.factory import WorkStation, Tool, OUTPUT_FORMATS, GEOMETRY_FORMATS, SPATIAL_FORMATS
 import logging
 from elara import ConfigError
 
@@ -47,6 +47,7 @@ class Config:
         self.version = None
         self.using_experienced_plans = None
         self.logging = None
+        self.workers = None
         self.event_handlers = None
         self.plan_handlers = None
         self.input_plan_handlers = None
@@ -54,6 +55,14 @@ class Config:
         self.benchmarks = None
         self.output_path = None
         self.contract = None
+        self.cache_path = None
+        self.cache_results = None
+        self.output_format = None
+        self.geometry_format = None
+        self.spatial_format = None
+        self.checkpoint_events = None
+        self.checkpoint_minutes = None
+        self.resume = False
 
         if path:
             self.load_toml(path)
@@ -105,11 +114,13 @@ class Config:
         self.logger.debug(f'Version = {self.version}')
         self.logger.debug(f'Using experienced plans = {self.using_experienced_plans}')
         self.logger.debug(f'Verbosity/logging = {self.logging}')
+        self.logger.debug(f'Workers = {self.workers}')
         self.logger.debug(f'Required Event Handlers = {self.event_handlers}')
         self.logger.debug(f'Required Plan Handlers = {self.plan_handlers}')
         self.logger.debug(f'Required Post Processors = {self.post_processors}')
         self.logger.debug(f'Required Benchmarks = {self.benchmarks}')
         self.logger.debug(f'Contract = {self.contract}')
+        self.logger.debug(f'Cache path = {self.cache_path}')
         self.check_handler_renamed()
 
     def load_toml(self, path):
@@ -149,6 +160,9 @@ you may either or both the keys using HANDLER--NAME, for example:
         self.logging = self.valid_verbosity(
             self.settings["scenario"].get("verbose", False)
         )
+        self.workers = self.valid_workers(
+            self.settings["scenario"].get("workers", 1)
+        )
 
         # Factory requirements
         self.logger.debug(f'Loading factory build requirements')
@@ -165,6 +179,27 @@ you may either or both the keys using HANDLER--NAME, for example:
         self.contract = self.valid_bool(
             self.settings["outputs"].get("contract", False)
         )
+        self.cache_path = self.settings["outputs"].get("cache_path")
+        self.cache_results = self.valid_bool(
+            self.settings["outputs"].get("cache_results", False)
+        )
+        if self.cache_results and not self.cache_path:
+            raise ConfigError("Result caching (cache_results) requires a configured cache_path")
+        self.output_format = self.valid_output_format(
+            self.settings["outputs"].get("format", "csv")
+        )
+        self.geometry_format = self.valid_geometry_format(
+            self.settings["outputs"].get("geometry", "joined")
+        )
+        self.spatial_format = self.valid_spatial_format(
+            self.settings["outputs"].get("spatial", "geojson")
+        )
+        self.checkpoint_events = self.valid_checkpoint_interval(
+            self.settings["outputs"].get("checkpoint_events"), "checkpoint_events"
+        )
+        self.checkpoint_minutes = self.valid_checkpoint_interval(
+            self.settings["outputs"].get("checkpoint_minutes"), "checkpoint_minutes"
+        )
 
     """
     Property methods used for config dependant requirements.
@@ -314,6 +349,78 @@ you may either or both the keys using HANDLER--NAME, for example:
             )
         return int(inp)
 
+    @staticmethod
+    def valid_workers(inp):
+        """
+        Raise exception if specified number of worker processes is not a positive integer.
+        :param inp: Number of workers
+        :return: Number of workers (int)
+        """
+        try:
+            valid = not isinstance(inp, bool) and int(inp) == inp and inp >= 1
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ConfigError(
+                f"Configured workers ({inp}) not valid (please use a positive integer)"
+            )
+        return int(inp)
+
+    @staticmethod
+    def valid_output_format(inp):
+        """
+        Raise exception if specified output file format is not supported.
+        :param inp: Output file format
+        :return: Output file format (str)
+        """
+        if inp not in OUTPUT_FORMATS:
+            raise ConfigError(
+                f"Configured output format ({inp}) not valid (please use one of {OUTPUT_FORMATS})"
+            )
+        return inp
+
+    @staticmethod
+    def valid_geometry_format(inp):
+        """
+        Raise exception if specified geometry output is not supported.
+        :param inp: Geometry output, 'joined' or a geometry file format
+        :return: Geometry output (str)
+        """
+        if inp not in GEOMETRY_FORMATS:
+            raise ConfigError(
+                f"Configured geometry output ({inp}) not valid (please use one of {GEOMETRY_FORMATS})"
+            )
+        return inp
+
+    @staticmethod
+    def valid_spatial_format(inp):
+        """
+        Raise exception if specified spatial output format is not supported.
+        :param inp: Spatial output format
+        :return: Spatial output format (str)
+        """
+        if inp not in SPATIAL_FORMATS:
+            raise ConfigError(
+                f"Configured spatial output format ({inp}) not valid (please use one of {SPATIAL_FORMATS})"
+            )
+        return inp
+
+    @staticmethod
+    def valid_checkpoint_interval(inp, field_name):
+        """
+        Raise exception if specified checkpoint interval is not a positive number.
+        :param inp: Number of events or minutes between checkpoints, or None
+        :param field_name: Field name to use in exception if interval is not valid
+        :return: Pass through interval if valid
+        """
+        if inp is None:
+            return None
+        if isinstance(inp, bool) or not isinstance(inp, (int, float)) or inp <= 0:
+            raise ConfigError(
+                f"Configured {field_name} ({inp}) not valid (please use a positive number)"
+            )
+        return inp
+
     @staticmethod
     def valid_path(path, field_name):
         """
@@ -466,6 +573,10 @@ you may either or both the keys using HANDLER--NAME, for example:
         self.settings['outputs']['path'] = os.path.join(root, self.settings['outputs']['path'])
         self.output_path = self.settings['outputs']['path']
 
+        if self.cache_path:
+            self.settings['outputs']['cache_path'] = os.path.join(root, self.settings['outputs']['cache_path'])
+            self.cache_path = self.settings['outputs']['cache_path']
+
         for handler, options in self.settings.get("benchmarks", {}).items():
             if 'benchmark_data_path' in options:
                 self.settings['benchmarks'][handler]['benchmark_data_path'] = os.path.join(root, options['benchmark_data_path'])
@@ -1,5 +1,8 @@
 import logging
 import os
+import shutil
+import tempfile
+from array import array
 from math import floor
 from typing import Optional, Tuple, Union
 
@@ -7,10 +10,348 @@ import geopandas as gpd
 import networkx as nx
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from pyproj import Transformer
 from shapely.geometry import LineString
 
-from elara.factory import Tool, WorkStation
+from elara import cache
+from elara import checkpoint
+from elara import parallel
+from elara.factory import Tool, WorkStation, write_spatial
+from elara.registry import IdIndex, IdRegistry
+
+TABLE_BUFFER_SIZE = 65536
+
+
+class TableBuffer:
+    """
+    Buffer of weighted increments to a dense (3d) results table. Increments are kept as flat
+    indices and weights and added to the table in batches with np.add.at, which is much cheaper
+    per event than incrementing the table one (scalar indexed) cell at a time. np.add.at adds
+    repeated indices in order, so tables are identical to those built one cell at a time.
+    """
+
+    def __init__(self, table: np.ndarray, size: int = TABLE_BUFFER_SIZE) -> None:
+        self.table = table
+        self.size = size
+        self.x_stride = table.shape[1] * table.shape[2]
+        self.y_stride = table.shape[2]
+        self.indices = array("q")
+        self.weights = array("d")
+
+    def add(self, x: int, y: int, z: int, weight: float = 1.0) -> None:
+        """
+        Buffer an increment of table cell [x, y, z].
+        :param x: first (element) index
+        :param y: second (attribute class) index
+        :param z: third (time period) index
+        :param weight: increment
+        """
+        self.indices.append(x * self.x_stride + y * self.y_stride + z)
+        self.weights.append(weight)
+        if len(self.indices) >= self.size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Add buffered increments to the table.
+        """
+        if not self.indices:
+            return
+        np.add.at(
+            self.table,
+            np.unravel_index(np.frombuffer(self.indices, dtype=np.int64), self.table.shape),
+            np.frombuffer(self.weights, dtype=np.float64)
+        )
+        del self.indices[:]
+        del self.weights[:]
+
+
+class BufferedTable:
+    """
+    Descriptor for a dense results table that is incremented through a TableBuffer, available as
+    the '<name>_buffer' attribute of the handler. Reading the table first adds any buffered
+    increments, so the buffering is invisible outside of .process_event(), eg to .finalise(),
+    .merge() or tests. Setting the table starts a new buffer (for 3d arrays).
+    """
+
+    def __set_name__(self, owner, name) -> None:
+        self.name = name
+        self.buffer_name = f"{name}_buffer"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        buffer = instance.__dict__.get(self.buffer_name)
+        if buffer is not None:
+            buffer.flush()
+        return instance.__dict__.get(self.name)
+
+    def __set__(self, instance, value) -> None:
+        instance.__dict__[self.name] = value
+        buffered = isinstance(value, np.ndarray) and value.ndim == 3
+        instance.__dict__[self.buffer_name] = TableBuffer(value) if buffered else None
+
+    def __delete__(self, instance) -> None:
+        del instance.__dict__[self.name]
+        instance.__dict__.pop(self.buffer_name, None)
+
+
+class PairTable:
+    """
+    Sparse accumulator for origin-destination results tables of (logical) shape
+    (elements, elements, classes, periods). Only observed (origin, destination) pairs are kept, as
+    rows of a dense (pairs, classes, periods) table, so memory is proportional to the number of
+    observed pairs rather than the square of the number of elements. Increments are batched, see
+    TableBuffer.
+    """
+
+    def __init__(self, shape: tuple, capacity: int = 1024) -> None:
+        self.shape = shape
+        self.pairs = IdIndex()
+        self.table = np.zeros((capacity, shape[2], shape[3]))
+        self.buffer = TableBuffer(self.table)
+
+    def add(self, o: int, d: int, y: int, z: int, weight: float = 1.0) -> None:
+        """
+        Add an increment to cell [o, d, y, z].
+        :param o: origin element index
+        :param d: destination element index
+        :param y: attribute class index
+        :param z: time period index
+        :param weight: increment
+        """
+        row = self.pairs.indices.get((o, d))
+        if row is None:
+            row = self.add_pair(o, d)
+        self.buffer.add(row, y, z, weight)
+
+    def add_pair(self, o: int, d: int) -> int:
+        """
+        Add a row for a newly observed pair, doubling the table size if full.
+        :param o: origin element index
+        :param d: destination element index
+        :return: row index
+        """
+        if len(self.pairs) == len(self.table):
+            self.buffer.flush()
+            self.table = np.concatenate([self.table, np.zeros_like(self.table)])
+            self.buffer = TableBuffer(self.table)
+        return self.pairs.intern((o, d))
+
+    def rows(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return the observed pairs and their counts, in order of first observation.
+        :return: (origin indices, destination indices, (pairs, classes, periods) counts view)
+        """
+        self.buffer.flush()
+        pairs = np.array(self.pairs.ids, dtype=np.int64).reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1], self.table[:len(self.pairs)]
+
+    def toarray(self) -> np.ndarray:
+        """
+        Return the dense table, only intended for small tables (eg testing).
+        :return: np.ndarray
+        """
+        origins, destinations, counts = self.rows()
+        dense = np.zeros(self.shape)
+        dense[origins, destinations] = counts
+        return dense
+
+
+class EventEngine:
+    """
+    Base class for event engines. An engine holds event state shared by several handlers, so that it
+    is tracked once per run: handlers that declare the engine (EventHandlerTool.engine_class) are
+    subscribed to a single shared engine (see with_engines()), which consumes their events in their
+    place and hands them derived records. Engines follow the event routing and parallel processing
+    protocols of handlers (.event_types, .tracker_attributes etc.), but have no results of their own.
+    """
+
+    # name of the engine amongst the handlers, must not clash with handler names
+    name = None
+    event_types = []
+    partition_results = []
+    tracker_attributes = []
+    tracker_key = "vehicle"
+    tracker_reads = []
+    tracker_sets = []
+
+    def __init__(self, ids: IdRegistry, consumers: list) -> None:
+        """
+        :param ids: shared id registry
+        :param consumers: list of subscribed handlers
+        """
+        self.ids = ids
+        self.consumers = consumers
+
+    def merge(self, results: dict) -> None:
+        pass
+
+    def vehicle_mode_code(self, vehicle_id: str) -> int:
+        """
+        Given a vehicle's ID, return its registry mode code, unregistered vehicles are assumed to be cars.
+        :param vehicle_id: Vehicle ID string
+        :return: mode code int
+        """
+        index = self.ids.vehicles.indices.get(vehicle_id)
+        if index is None:
+            return self.ids.default_mode_code
+        return self.ids.vehicle_modes.item(index)
+
+
+class LinkTraversals(EventEngine):
+    """
+    Pairs link entry ('entered link' or 'vehicle enters traffic') and link exit ('left link' or
+    'vehicle leaves traffic') events per vehicle, and hands each completed traversal to the
+    .process_traversal() method of the subscribed handlers as:
+        (vehicle id, link id, entry time, exit time, vehicle mode code, start, end)
+    where start flags traversals entered via 'vehicle enters traffic' (the start of a trip) and end
+    flags traversals exited via 'vehicle leaves traffic' (the end of a trip). Times are floats.
+    """
+
+    name = "_link_traversals"
+    event_types = ["vehicle enters traffic", "entered link", "left link", "vehicle leaves traffic"]
+    tracker_attributes = ["entries"]
+
+    def __init__(self, ids: IdRegistry, consumers: list) -> None:
+        super().__init__(ids, consumers)
+        self.entries = {}  # {vehicle: (link, entry time, start)}
+        self.process_traversals = [consumer.process_traversal for consumer in consumers]
+
+        if any(consumer.tracker_attributes for consumer in consumers):
+            # consumers carry state over trips, which are only known to be complete from a trip start
+            self.tracker_sets = ["vehicle enters traffic", "vehicle leaves traffic"]
+            self.tracker_reads = ["entered link", "left link", "vehicle leaves traffic"]
+        else:
+            # consumers only use single traversals
+            self.tracker_sets = self.event_types
+            self.tracker_reads = ["left link"]
+
+    def process_event(self, elem) -> None:
+        """
+        Track link entries and hand completed traversals to subscribed handlers.
+        :param elem: Event XML element
+        """
+        event_type = elem.get("type")
+        vehicle = elem.get("vehicle")
+
+        if event_type == "entered link":
+            self.entries[vehicle] = (elem.get("link"), float(elem.get("time")), False)
+
+        elif event_type == "vehicle enters traffic":
+            self.entries[vehicle] = (elem.get("link"), float(elem.get("time")), True)
+
+        elif event_type == "left link" or event_type == "vehicle leaves traffic":
+            entry = self.entries.pop(vehicle, None)
+            if entry is None:
+                return None
+            link, t_in, start = entry
+            mode_code = self.vehicle_mode_code(vehicle)
+
+            end = event_type == "vehicle leaves traffic"
+            t_out = float(elem.get("time"))
+            for process_traversal in self.process_traversals:
+                process_traversal(vehicle, link, t_in, t_out, mode_code, start, end)
+
+
+class TransitOccupancy(EventEngine):
+    """
+    Tracks the current stop of each vehicle, and the occupancy of transit vehicles by person
+    attribute class (excluding PT drivers), from 'PersonEntersVehicle', 'PersonLeavesVehicle' and
+    'VehicleArrivesAtFacility' events. Hands records to the subscribed handlers, as implemented:
+        .process_boarding(agent id, vehicle id, vehicle mode code, current stop id, time)
+        .process_alighting(agent id, vehicle id, vehicle mode code, current stop id, time)
+        .process_link_load(vehicle id, vehicle mode code, link id, time, occupancy)
+        .process_stop_load(vehicle id, vehicle mode code, previous stop id, stop id, time, occupancy)
+    Link loads are handed on 'left link' and 'vehicle leaves traffic', stop (segment) loads on
+    arrival at a stop after an earlier stop. Occupancy is a dict of {attribute class: count}, for
+    the handler .groupby_person_attribute, and is only tracked for vehicles of the modes of handlers
+    using loads. Boarding and alighting times are event time strings, load times are floats.
+    """
+
+    name = "_transit_occupancy"
+    event_types = [
+        "PersonEntersVehicle",
+        "PersonLeavesVehicle",
+        "VehicleArrivesAtFacility",
+        "left link",
+        "vehicle leaves traffic",
+    ]
+    # consumers do not support parallel processing
+    partition_results = None
+
+    def __init__(self, ids: IdRegistry, consumers: list) -> None:
+        super().__init__(ids, consumers)
+        self.stops = {}  # {veh_id: last_stop}
+
+        self.boardings = [c.process_boarding for c in consumers if hasattr(c, "process_boarding")]
+        self.alightings = [c.process_alighting for c in consumers if hasattr(c, "process_alighting")]
+        self.link_loads = [
+            (c.process_link_load, c.groupby_person_attribute) for c in consumers if hasattr(c, "process_link_load")
+        ]
+        self.stop_loads = [
+            (c.process_stop_load, c.groupby_person_attribute) for c in consumers if hasattr(c, "process_stop_load")
+        ]
+
+        # {attribute key: {veh_id: {attribute_class: COUNT}}}
+        self.occupancy = {key: {} for _, key in self.link_loads + self.stop_loads}
+        self.mode_codes = {
+            self.ids.modes.get(c.mode) for c in consumers
+            if hasattr(c, "process_link_load") or hasattr(c, "process_stop_load")
+        }
+
+    def process_event(self, elem) -> None:
+        """
+        Update vehicle stops and occupancy, and hand records to subscribed handlers.
+        :param elem: Event XML element
+        """
+        event_type = elem.get("type")
+        veh_id = elem.get("vehicle")
+
+        if event_type == "PersonEntersVehicle" or event_type == "PersonLeavesVehicle":
+            agent_id = elem.get("person")
+            mode_code = self.vehicle_mode_code(veh_id)
+            enters = event_type == "PersonEntersVehicle"
+
+            # Filter out PT drivers from transit volume statistics
+            if agent_id[:2] != "pt" and mode_code in self.mode_codes:
+                attributes = self.ids.attributes.get(agent_id, {})
+                for key, occupancy in self.occupancy.items():
+                    attribute_class = attributes.get(key)
+                    if enters:
+                        classes = occupancy.setdefault(veh_id, {})
+                        classes[attribute_class] = classes.get(attribute_class, 0) + 1
+                    else:
+                        classes = occupancy.get(veh_id)
+                        if classes and classes.get(attribute_class):
+                            classes[attribute_class] -= 1
+
+            stop_id = self.stops.get(veh_id)
+            time = elem.get("time")
+            for process in self.boardings if enters else self.alightings:
+                process(agent_id, veh_id, mode_code, stop_id, time)
+
+        elif event_type == "VehicleArrivesAtFacility":
+            stop_id = elem.get("facility")
+            prev_stop_id = self.stops.get(veh_id)
+            self.stops[veh_id] = stop_id
+
+            if prev_stop_id is not None and self.stop_loads:
+                mode_code = self.vehicle_mode_code(veh_id)
+                if mode_code in self.mode_codes:
+                    time = float(elem.get("time"))
+                    for process, key in self.stop_loads:
+                        process(veh_id, mode_code, prev_stop_id, stop_id, time, self.occupancy[key].get(veh_id, {}))
+
+        elif event_type == "left link" or event_type == "vehicle leaves traffic":
+            if self.link_loads:
+                mode_code = self.vehicle_mode_code(veh_id)
+                if mode_code in self.mode_codes:
+                    time = float(elem.get("time"))
+                    link = elem.get("link")
+                    for process, key in self.link_loads:
+                        process(veh_id, mode_code, link, time, self.occupancy[key].get(veh_id, {}))
 
 
 class EventHandlerTool(Tool):
@@ -21,6 +362,30 @@ class EventHandlerTool(Tool):
     result_dfs = dict()
     options_enabled = True
 
+    # event types consumed by .process_event(), used by the workstation to route events,
+    # None = all events are handed to the handler
+    event_types = None
+
+    # parallel processing, see EventHandlerWorkStation.process_events_parallel and Tool.partition_results
+    # names of dict attributes of state carried between events, keyed by the .tracker_key event attribute
+    tracker_attributes = []
+    tracker_key = "vehicle"
+    # event types that read (or update) carried state, and event types that set (or clear) it
+    tracker_reads = []
+    tracker_sets = []
+
+    # shared id registry, see elara.registry.IdRegistry
+    ids = None
+    # registry code of the handler mode and attribute class index of each registered vehicle,
+    # see .build_vehicle_codes()
+    mode_code = None
+    vehicle_classes = None
+
+    # shared engine consumed by the handler in place of events, see EventEngine and with_engines(),
+    # and the handler's own engine, used when events are handed to the handler directly
+    engine_class = None
+    engine = None
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         self.logger = logging.getLogger(__name__)
         super().__init__(config=config, mode=mode, groupby_person_attribute=groupby_person_attribute, **kwargs)
@@ -30,6 +395,9 @@ class EventHandlerTool(Tool):
     def build(self, resources: dict, write_path=None) -> None:
 
         super().build(resources, write_path)
+        self.ids = IdRegistry.shared(resources)
+        if self.engine_class is not None:
+            self.engine = self.engine_class(self.ids, [self])
 
     @staticmethod
     def generate_elem_ids(elems_in: Union[list, gpd.GeoDataFrame]) -> Tuple[list, dict]:
@@ -50,10 +418,7 @@ class EventHandlerTool(Tool):
         :param vehicle_id: Vehicle ID string
         :return: Vehicle mode type string
         """
-        if vehicle_id in self.resources["transit_schedule"].veh_to_mode_map.keys():
-            return self.resources["transit_schedule"].veh_to_mode_map[vehicle_id]
-        else:
-            return "car"
+        return self.ids.vehicle_mode(vehicle_id)
 
     def vehicle_route(self, vehicle_id: str) -> str:
         """
@@ -61,10 +426,7 @@ class EventHandlerTool(Tool):
         :param vehicle_id: Vehicle ID string
         :return: ID of the parent route
         """
-        if vehicle_id in self.resources["transit_schedule"].veh_to_route_map.keys():
-            return self.resources["transit_schedule"].veh_to_route_map.get(vehicle_id)
-        else:
-            return "unknown_route"
+        return self.ids.vehicle_route(vehicle_id)
 
     def vehicle_capacity(self, vehicle_id: str) -> float:
         """
@@ -72,12 +434,39 @@ class EventHandlerTool(Tool):
         :param vehicle_id: Vehicle ID string
         :return: Vehicle capacity float
         """
-        if vehicle_id in self.resources["transit_vehicles"].veh_id_veh_type_map.keys():
-            veh_type = self.resources["transit_vehicles"].veh_id_veh_type_map[vehicle_id]
-            veh_capacity = self.resources["transit_vehicles"].veh_type_capacity_map[veh_type]
-            return veh_capacity
-        else:
-            return 5.0
+        return self.ids.vehicle_capacity(vehicle_id)
+
+    def build_vehicle_codes(self) -> None:
+        """
+        Set the registry code of the handler mode and the attribute class index of each registered
+        vehicle, for use by .vehicle_codes(). Requires .class_indices.
+        :return: None
+        """
+        self.mode_code = self.ids.modes.get(self.mode)
+        self.vehicle_classes = self.ids.vehicle_classes(self.groupby_person_attribute, self.class_indices)
+
+    def vehicle_codes(self, vehicle_id: str) -> Tuple[Optional[int], int]:
+        """
+        Given a vehicle's ID, return its mode code and attribute class index, with a single lookup.
+        Vehicles that are not registered are assumed to be cars, without attribute class.
+        :param vehicle_id: Vehicle ID string
+        :return: (mode code, attribute class index) tuple
+        """
+        index = self.ids.vehicles.indices.get(vehicle_id)
+        if index is None:
+            return self.ids.default_mode_code, self.class_indices[None]
+        return self.ids.vehicle_modes.item(index), self.vehicle_classes.item(index)
+
+    def elem_table(self) -> Union[pd.DataFrame, gpd.GeoDataFrame]:
+        """
+        Get the element (link or stop) data that results are joined to. When geometries are
+        written separately (see Config.geometry_format), only the element ids, so that results are
+        id keyed tables.
+        :return: elements (geo)dataframe
+        """
+        if self.separate_geometry:
+            return pd.DataFrame(index=self.elem_gdf.index)
+        return self.elem_gdf
 
     def remove_empty_rows(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -148,6 +537,7 @@ class VehiclePassengerGraph(EventHandlerTool):
         "transit_vehicles",
         "attributes",
     ]
+    event_types = ["PersonEntersVehicle"]
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
@@ -231,6 +621,8 @@ class StopPassengerWaiting(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = ["waitingForPt", "PersonEntersVehicle", "VehicleDepartsAtFacility", "actstart"]
+    engine_class = TransitOccupancy
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
@@ -283,18 +675,8 @@ class StopPassengerWaiting(EventHandlerTool):
             return None
 
         if event_type == "PersonEntersVehicle":
-            agent_id = elem.get("person")
-            veh_ident = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_ident)
-
-            if veh_mode == "car":  # can ignore cars
-                return None
-
-            # update veh occupancy
-            if not self.veh_waiting_occupancy.get(veh_ident):
-                self.veh_waiting_occupancy[veh_ident] = [agent_id]
-            else:
-                self.veh_waiting_occupancy[veh_ident].append(agent_id)
+            # boardings are handed on by the handler's TransitOccupancy engine, see .process_boarding()
+            self.engine.process_event(elem)
 
         if event_type == "VehicleDepartsAtFacility":
             veh_ident = elem.get("vehicle")
@@ -356,6 +738,24 @@ class StopPassengerWaiting(EventHandlerTool):
             agent_id = elem.get("person")
             self.agent_status.pop(agent_id, None)  # agent has finished transit - remove record
 
+    def process_boarding(self, agent_id, veh_ident, mode_code, stop_id, time) -> None:
+        """
+        Add a boarding agent to the vehicle waiting occupancy.
+        :param agent_id: agent id
+        :param veh_ident: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: current vehicle stop id, not used
+        :param time: event time string
+        """
+        if self.ids.modes.ids[mode_code] == "car":  # can ignore cars
+            return None
+
+        # update veh occupancy
+        if not self.veh_waiting_occupancy.get(veh_ident):
+            self.veh_waiting_occupancy[veh_ident] = [agent_id]
+        else:
+            self.veh_waiting_occupancy[veh_ident].append(agent_id)
+
     def finalise(self):
         del self.agent_status
         del self.veh_waiting_occupancy
@@ -373,6 +773,11 @@ class LinkVehicleCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = ["vehicle enters traffic", "entered link"]
+    partition_results = ["counts"]
+
+    # results tables, incremented in batches, see TableBuffer
+    counts = BufferedTable()
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
@@ -423,7 +828,11 @@ class LinkVehicleCounts(EventHandlerTool):
             self.logger.debug(f"Selecting links for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[links, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "links", None if links is None else self.mode, self.elem_gdf
+        )
+
+        self.build_vehicle_codes()
 
         # Initialise volume count table
         self.counts = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
@@ -436,17 +845,13 @@ class LinkVehicleCounts(EventHandlerTool):
         """
         event_type = elem.get("type")
         if (event_type == "vehicle enters traffic") or (event_type == "entered link"):
-            ident = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(ident)
-            if veh_mode == self.mode:
-                # look for attribute_class, if not found assume pt and use mode
-                attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
+            # attribute class index, if not found assume pt and use None class
+            mode_code, y = self.vehicle_codes(elem.get("vehicle"))
+            if mode_code == self.mode_code:
                 link = elem.get("link")
                 time = float(elem.get("time"))
-                x, y, z = table_position(
-                    self.elem_indices, self.class_indices, self.config.time_periods, link, attribute_class, time
-                )
-                self.counts[x, y, z] += 1
+                x, z = table_index(self.elem_indices, self.config.time_periods, link, time)
+                self.counts_buffer.add(x, y, z)
 
     def finalise(self) -> None:
         """
@@ -475,7 +880,7 @@ class LinkVehicleCounts(EventHandlerTool):
             counts_df = counts_df.reset_index().set_index("elem")
 
             key = f"{self.name}_{self.groupby_person_attribute}"
-            counts_df = self.elem_gdf.join(counts_df, how="left")
+            counts_df = self.elem_table().join(counts_df, how="left")
             counts_df.index = counts_df.index.set_names(["link_id"])
             counts_df.reset_index(inplace=True)
 
@@ -493,7 +898,7 @@ class LinkVehicleCounts(EventHandlerTool):
 
         key = f"{self.name}"
 
-        totals_df = self.elem_gdf.join(totals_df, how="left")
+        totals_df = self.elem_table().join(totals_df, how="left")
         totals_df.index = totals_df.index.set_names(["link_id"])
         totals_df.reset_index(inplace=True)
         self.result_dfs[key] = totals_df
@@ -511,8 +916,13 @@ class LinkVehicleCapacity(EventHandlerTool):
         "transit_vehicles",
         "attributes",
     ]
+    event_types = ["vehicle enters traffic", "entered link"]
+    partition_results = ["counts"]
     invalid_modes = ["car"]
 
+    # results tables, incremented in batches, see TableBuffer
+    counts = BufferedTable()
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
         Initiate class, creates results placeholders.
@@ -566,7 +976,11 @@ modes. Elara will continue with all links found in network.
             self.logger.debug(f"Selecting links for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[links, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "links", None if links is None else self.mode, self.elem_gdf
+        )
+
+        self.build_vehicle_codes()
 
         # Initialise volume count table
         self.counts = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
@@ -580,17 +994,14 @@ modes. Elara will continue with all links found in network.
         event_type = elem.get("type")
         if (event_type == "vehicle enters traffic") or (event_type == "entered link"):
             ident = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(ident)
-            if veh_mode == self.mode:
-                # look for attribute_class, if not found assume pt and use mode
-                attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
+            # attribute class index, if not found assume pt and use None class
+            mode_code, y = self.vehicle_codes(ident)
+            if mode_code == self.mode_code:
                 link = elem.get("link")
                 time = float(elem.get("time"))
                 veh_capacity = self.vehicle_capacity(ident)
-                x, y, z = table_position(
-                    self.elem_indices, self.class_indices, self.config.time_periods, link, attribute_class, time
-                )
-                self.counts[x, y, z] += veh_capacity
+                x, z = table_index(self.elem_indices, self.config.time_periods, link, time)
+                self.counts_buffer.add(x, y, z, veh_capacity)
 
     def finalise(self) -> None:
         """
@@ -620,7 +1031,7 @@ modes. Elara will continue with all links found in network.
             counts_df = counts_df.reset_index().set_index("elem")
 
             key = f"{self.name}_{self.groupby_person_attribute}"
-            counts_df = self.elem_gdf.join(counts_df, how="left")
+            counts_df = self.elem_table().join(counts_df, how="left")
             self.result_dfs[key] = counts_df
 
         # calc sum across all recorded attribute classes
@@ -634,7 +1045,7 @@ modes. Elara will continue with all links found in network.
         del self.counts
 
         key = f"{self.name}"
-        totals_df = self.elem_gdf.join(totals_df, how="left")
+        totals_df = self.elem_table().join(totals_df, how="left")
         self.result_dfs[key] = totals_df
 
 
@@ -649,6 +1060,9 @@ class LinkVehicleSpeeds(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = LinkTraversals.event_types
+    partition_results = ["counts", "duration_sum", "duration_min", "duration_max", "duration_zero"]
+    engine_class = LinkTraversals
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
@@ -699,7 +1113,9 @@ modes. Elara will continue with all links found in network.
             self.logger.debug(f"Selecting links for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[links, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "links", None if links is None else self.mode, self.elem_gdf
+        )
 
         # Initialise volume count table
         self.counts = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
@@ -708,14 +1124,16 @@ modes. Elara will continue with all links found in network.
         self.duration_sum = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
         self.duration_min = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
         self.duration_max = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods))
+        # flags zero durations, which reset the minimum duration
+        self.duration_zero = np.zeros((len(self.elem_indices), len(self.classes), self.config.time_periods), dtype=bool)
 
-        self.link_tracker = dict()  # {(agent, event_type): start_time}
+        self.build_vehicle_codes()
 
     def process_event(self, elem) -> None:
         """
-        Iteratively aggregate 'vehicle enters traffic' and 'vehicle leaves traffic'
-        events to determine average time spent on links. Units are converted from m/s to kph
-        as a last step in the finalise method.
+        Iteratively aggregate 'entered link' and 'left link' events to determine average time
+        spent on links. Units are converted from m/s to kph as a last step in the finalise method.
+        Events are paired by the handler's LinkTraversals engine, see .process_traversal().
 
         :param elem: Event XML element
 
@@ -735,66 +1153,74 @@ modes. Elara will continue with all links found in network.
                  vehicle="nick"
                  networkMode="car"
                  relativePosition="1.0"/>
+        """
+        self.engine.process_event(elem)
+
+    def process_traversal(self, vehicle, link, start_time, end_time, mode_code, start, end) -> None:
+        """
+        Add a completed link traversal to the counts and duration tables.
 
         Because vehicles can enter or leave traffic at the downstream node
         of a link when accessing facilities, we explicity ignore or exclude
         the following patterns:
             ENTERED LINK -> VEHICLE LEAVES TRAFFIC
             VEHICLE ENTERS TRAFFIC -> LEFT LINK
-        """
-
-        event_type = elem.get("type")
-        if event_type == "entered link":
-            ident = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(ident)
+        :param vehicle: vehicle id
+        :param link: link id
+        :param start_time: link entry time
+        :param end_time: link exit time
+        :param mode_code: vehicle mode code
+        :param start: traversal entered via 'vehicle enters traffic'
+        :param end: traversal exited via 'vehicle leaves traffic'
+        """
+        if start or end:
+            return None
+        if not (mode_code == self.mode_code or self.mode == "all"):
+            return None
 
-            # check vehicle mode and add to tracker
-            if veh_mode == self.mode or self.mode == "all":
-                start_time = float(elem.get("time"))
-                self.link_tracker[ident] = (event_type, start_time)
+        # attribute class index, if not found assume pt and use None class
+        _, y = self.vehicle_codes(vehicle)
+        x, z = table_index(self.elem_indices, self.config.time_periods, link, start_time)
 
-        # remove vehicle from tracker if exiting network after entering the link
-        elif event_type == "vehicle leaves traffic":
-            ident = elem.get("vehicle")
-            self.link_tracker.pop(ident, None)
+        duration = end_time - start_time
 
-        elif event_type == "left link":
-            ident = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(ident)
-            if veh_mode == self.mode or self.mode == "all":
-                # look for attribute_class, if not found assume pt and use mode
-                attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
-                link = elem.get("link")
-                end_time = float(elem.get("time"))
-
-                # if agent ident not in link tracker, they have entered via
-                # "vehicle enters traffic event" and should be ignored.
-                if ident in self.link_tracker:
-                    start_time = self.link_tracker[ident][1]
-                    # start_event_type = self.link_tracker[ident][0]
-                    x, y, z = table_position(
-                        self.elem_indices,
-                        self.class_indices,
-                        self.config.time_periods,
-                        link,
-                        attribute_class,
-                        start_time,
-                    )
+        self.counts[x, y, z] += 1
 
-                    duration = end_time - start_time
-
-                    self.counts[x, y, z] += 1
-
-                    if duration != 0:
-                        self.duration_sum[x, y, z] += duration
+        if duration != 0:
+            self.duration_sum[x, y, z] += duration
+        else:
+            self.duration_zero[x, y, z] = True
 
-                    self.duration_max[x, y, z] = max(duration, self.duration_max[x, y, z])
+        self.duration_max[x, y, z] = max(duration, self.duration_max[x, y, z])
 
-                    # needs this condition or else the minimum duration would ever budge from zero
-                    if self.duration_min[x, y, z] == 0:
-                        self.duration_min[x, y, z] = duration
-                    else:
-                        self.duration_min[x, y, z] = min(duration, self.duration_min[x, y, z])
+        # needs this condition or else the minimum duration would ever budge from zero
+        if self.duration_min[x, y, z] == 0:
+            self.duration_min[x, y, z] = duration
+        else:
+            self.duration_min[x, y, z] = min(duration, self.duration_min[x, y, z])
+
+    def merge(self, results: dict) -> None:
+        """
+        Merge results from a later partition of the events. Minimum durations are merged as if the
+        later durations had been processed by this handler, ie a zero duration resets the minimum.
+        :param results: dict of {attribute name: value}
+        """
+        counts = results["counts"]
+        duration_min = results["duration_min"]
+        duration_zero = results["duration_zero"]
+        self.duration_min = np.where(
+            counts == 0,
+            self.duration_min,
+            np.where(
+                duration_zero | (self.duration_min == 0),
+                duration_min,
+                np.minimum(self.duration_min, duration_min),
+            )
+        )
+        self.duration_zero = self.duration_zero | duration_zero
+        self.duration_max = np.maximum(self.duration_max, results["duration_max"])
+        self.duration_sum = self.duration_sum + results["duration_sum"]
+        self.counts = self.counts + counts
 
     def finalise(self) -> None:
         """
@@ -825,7 +1251,7 @@ modes. Elara will continue with all links found in network.
             # ).fillna(0)
 
             # multiply by link distances to derive average speed
-            average_speeds = self.elem_gdf.join(average_speeds.reset_index().set_index("elem"), how="left")
+            average_speeds = self.elem_table().join(average_speeds.reset_index().set_index("elem"), how="left")
             # Time Mean Speed
             average_speeds = multiply_distance(self, average_speeds)
             # Space Mean Speed
@@ -861,20 +1287,29 @@ modes. Elara will continue with all links found in network.
             df = df.unstack(level="hour").sort_index()
             return df
 
+        def link_lengths(self, df):
+            """
+            Link lengths of the (link indexed) rows, taken from the network links, as results
+            don't include a length column when geometries are written separately.
+            """
+            return self.elem_gdf["length"].reindex(df.index).to_numpy()
+
         def divide_distance(self, df):
             """
             Multiplies time period columns (ie hour 0...23) by link length
             """
+            lengths = link_lengths(self, df)
             for i in range(self.config.time_periods):
-                df[i] = df["length"] / df[i]
+                df[i] = lengths / df[i]
             return df
 
         def multiply_distance(self, df):
             """
             Multiplies time period columns (ie hour 0...23) by link length
             """
+            lengths = link_lengths(self, df)
             for i in range(self.config.time_periods):
-                df[i] = df[i] * df["length"]
+                df[i] = df[i] * lengths
             return df
 
         if self.groupby_person_attribute:
@@ -909,7 +1344,7 @@ modes. Elara will continue with all links found in network.
             # Calc max at subpop level
             key = f"{self.name}_max_{self.groupby_person_attribute}"
             max_speeds = flatten_subpops(self, calc_max_matrices(self)[0]).reset_index().set_index("elem")
-            max_speeds = self.elem_gdf.join(max_speeds, how="left")
+            max_speeds = self.elem_table().join(max_speeds, how="left")
             max_speeds = multiply_distance(self, max_speeds)
             max_speeds.index = max_speeds.index.set_names(["link_id"])
 
@@ -921,7 +1356,7 @@ modes. Elara will continue with all links found in network.
         max_speeds = pd.DataFrame(
             data=max_speeds, index=self.elem_ids, columns=range(0, self.config.time_periods)
         ).sort_index()
-        max_speeds = self.elem_gdf.join(max_speeds, how="left")
+        max_speeds = self.elem_table().join(max_speeds, how="left")
         max_speeds = multiply_distance(self, max_speeds)
         max_speeds.index = max_speeds.index.set_names(["link_id"])
         self.result_dfs[key] = max_speeds
@@ -931,7 +1366,7 @@ modes. Elara will continue with all links found in network.
             key = f"{self.name}_min_{self.groupby_person_attribute}"
             min_matrix = calc_min_matrices(self)[0]
             min_speeds = flatten_subpops(self, min_matrix).reset_index().set_index("elem")
-            min_speeds = self.elem_gdf.join(min_speeds, how="left")
+            min_speeds = self.elem_table().join(min_speeds, how="left")
             min_speeds = multiply_distance(self, min_speeds)
             min_speeds.index = min_speeds.index.set_names(["link_id"])
             self.result_dfs[key] = min_speeds
@@ -942,7 +1377,7 @@ modes. Elara will continue with all links found in network.
         min_speeds = pd.DataFrame(
             data=min_speeds, index=self.elem_ids, columns=range(0, self.config.time_periods)
         ).sort_index()
-        min_speeds = self.elem_gdf.join(min_speeds, how="left")
+        min_speeds = self.elem_table().join(min_speeds, how="left")
         min_speeds = multiply_distance(self, min_speeds)
         min_speeds.index = min_speeds.index.set_names(["link_id"])
         self.result_dfs[key] = min_speeds
@@ -964,8 +1399,13 @@ class LinkPassengerCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = TransitOccupancy.event_types
+    engine_class = TransitOccupancy
     invalid_modes = ["car"]
 
+    # results tables, incremented in batches, see TableBuffer
+    counts = BufferedTable()
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         """
         Initiate class, creates results placeholders.
@@ -981,7 +1421,6 @@ class LinkPassengerCounts(EventHandlerTool):
         self.elem_indices = None
         self.counts = None
         self.total_counts = None
-        self.veh_occupancy = None
 
         # Initialise results storage
         self.result_dfs = dict()  # Result geodataframes ready to export
@@ -1020,14 +1459,15 @@ modes. Elara will continue with all links found in network.
             self.logger.debug(f"Selecting links for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[links, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "links", None if links is None else self.mode, self.elem_gdf
+        )
 
         # Initialise passenger count table
         self.counts = np.zeros((len(self.elem_ids), len(self.classes), self.config.time_periods))
 
-        # Initialise vehicle occupancy mapping
-        self.veh_occupancy = dict()  # vehicle_id : occupancy
         self.total_counts = None
+        self.mode_code = self.ids.modes.get(self.mode)
 
     def process_event(self, elem):
         """
@@ -1056,55 +1496,33 @@ modes. Elara will continue with all links found in network.
                  vehicle="bus4"
                  networkMode="car"
                  relativePosition="1.0"  />
-        """
-        event_type = elem.get("type")
-        if event_type == "PersonEntersVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
 
-                if self.veh_occupancy.get(veh_id, None) is None:
-                    self.veh_occupancy[veh_id] = {attribute_class: 1}
-                elif not self.veh_occupancy[veh_id].get(attribute_class, None):
-                    self.veh_occupancy[veh_id][attribute_class] = 1
-                else:
-                    self.veh_occupancy[veh_id][attribute_class] += 1
-
-        elif event_type == "PersonLeavesVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
-
-                if not self.veh_occupancy[veh_id][attribute_class]:
-                    pass
-                else:
-                    self.veh_occupancy[veh_id][attribute_class] -= 1
-                    if not self.veh_occupancy[veh_id]:
-                        self.veh_occupancy.pop(veh_id, None)
-
-        elif event_type == "left link" or event_type == "vehicle leaves traffic":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+        Vehicle occupancy is tracked by the handler's TransitOccupancy engine, see .process_link_load().
+        """
+        self.engine.process_event(elem)
 
-            if veh_mode == self.mode:
-                # Increment link passenger volumes
-                time = float(elem.get("time"))
-                link = elem.get("link")
-                occupancy_dict = self.veh_occupancy.get(veh_id, {})
+    def process_link_load(self, veh_id, mode_code, link, time, occupancy_dict) -> None:
+        """
+        Increment link passenger volumes with the occupancy of a vehicle leaving a link.
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param link: link id
+        :param time: time float
+        :param occupancy_dict: vehicle occupancy, {attribute_class: COUNT}
+        """
+        if mode_code == self.mode_code:
+            for attribute_class, occupancy in occupancy_dict.items():
+                x, y, z = table_position(
+                    self.elem_indices, self.class_indices, self.config.time_periods, link, attribute_class, time
+                )
+                self.counts_buffer.add(x, y, z, occupancy)
 
-                for attribute_class, occupancy in occupancy_dict.items():
-                    x, y, z = table_position(
-                        self.elem_indices, self.class_indices, self.config.time_periods, link, attribute_class, time
-                    )
-                    self.counts[x, y, z] += occupancy
+    @property
+    def veh_occupancy(self) -> dict:
+        """
+        Vehicle occupancy, {veh_id : {attribute_class: COUNT}}, tracked by the handler's engine.
+        """
+        return self.engine.occupancy[self.groupby_person_attribute]
 
     def finalise(self):
         """
@@ -1126,7 +1544,7 @@ modes. Elara will continue with all links found in network.
             counts_df["total"] = counts_df.sum(1)
             counts_df = counts_df.reset_index().set_index("elem")
             key = f"{self.name}_{self.groupby_person_attribute}"
-            counts_df = self.elem_gdf.join(counts_df, how="left")
+            counts_df = self.elem_table().join(counts_df, how="left")
             self.result_dfs[key] = counts_df
 
         # calc sum across all recorded attribute classes
@@ -1140,7 +1558,7 @@ modes. Elara will continue with all links found in network.
         del self.counts
 
         key = f"{self.name}"
-        totals_df = self.elem_gdf.join(totals_df, how="left")
+        totals_df = self.elem_table().join(totals_df, how="left")
         self.result_dfs[key] = totals_df
 
 
@@ -1155,8 +1573,13 @@ class RoutePassengerCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = TransitOccupancy.event_types
+    engine_class = TransitOccupancy
     invalid_modes = ["car"]
 
+    # results tables, incremented in batches, see TableBuffer
+    counts = BufferedTable()
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         """
         Initiate class, creates results placeholders.
@@ -1211,6 +1634,7 @@ modes. Elara will continue with all routes found in schedule.
         self.counts = np.zeros((len(self.elem_ids), len(self.classes), self.config.time_periods))
 
         self.route_occupancy = dict()
+        self.mode_code = self.ids.modes.get(self.mode)
 
     def process_event(self, elem):
         """
@@ -1239,57 +1663,74 @@ modes. Elara will continue with all routes found in schedule.
                  vehicle="bus4"
                  networkMode="car"
                  relativePosition="1.0"  />
+
+        Boardings, alightings and link exits are handed on by the handler's TransitOccupancy engine.
         """
-        event_type = elem.get("type")
-        if event_type == "PersonEntersVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+        self.engine.process_event(elem)
+
+    def process_boarding(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Add a passenger to the occupancy of the vehicle route.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: current vehicle stop id
+        :param time: event time string
+        """
+        # Filter out PT drivers from transit volume statistics
+        if agent_id[:2] != "pt" and mode_code == self.mode_code:
             veh_route = self.vehicle_route(veh_id)
+            attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
 
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+            if self.route_occupancy.get(veh_route, None) is None:
+                self.route_occupancy[veh_route] = {attribute_class: 1}
+            elif not self.route_occupancy[veh_route].get(attribute_class, None):
+                self.route_occupancy[veh_route][attribute_class] = 1
+            else:
+                self.route_occupancy[veh_route][attribute_class] += 1
 
-                if self.route_occupancy.get(veh_route, None) is None:
-                    self.route_occupancy[veh_route] = {attribute_class: 1}
-                elif not self.route_occupancy[veh_route].get(attribute_class, None):
-                    self.route_occupancy[veh_route][attribute_class] = 1
-                else:
-                    self.route_occupancy[veh_route][attribute_class] += 1
-        elif event_type == "PersonLeavesVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+    def process_alighting(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Remove a passenger from the occupancy of the vehicle route.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: current vehicle stop id
+        :param time: event time string
+        """
+        # Filter out PT drivers from transit volume statistics
+        if agent_id[:2] != "pt" and mode_code == self.mode_code:
             veh_route = self.vehicle_route(veh_id)
+            attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
 
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+            if self.route_occupancy[veh_route][attribute_class]:
+                self.route_occupancy[veh_route][attribute_class] -= 1
+                if not self.route_occupancy[veh_route]:
+                    self.route_occupancy.pop(veh_route, None)
 
-                if self.route_occupancy[veh_route][attribute_class]:
-                    self.route_occupancy[veh_route][attribute_class] -= 1
-                    if not self.route_occupancy[veh_route]:
-                        self.route_occupancy.pop(veh_route, None)
-        elif event_type == "left link" or event_type == "vehicle leaves traffic":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+    def process_link_load(self, veh_id, mode_code, link, time, occupancy_dict) -> None:
+        """
+        Increment route passenger volumes with the route occupancy, when a route vehicle leaves a link.
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param link: link id
+        :param time: time float
+        :param occupancy_dict: vehicle occupancy, not used
+        """
+        if mode_code == self.mode_code:
             veh_route = self.vehicle_route(veh_id)
+            occupancy_dict = self.route_occupancy.get(veh_route, {})
 
-            if veh_mode == self.mode:
-                time = float(elem.get("time"))
-                occupancy_dict = self.route_occupancy.get(veh_route, {})
-
-                for attribute_class, occupancy in occupancy_dict.items():
-                    x, y, z = table_position(
-                        self.elem_indices,
-                        self.class_indices,
-                        self.config.time_periods,
-                        veh_route,
-                        attribute_class,
-                        time,
-                    )
-                    self.counts[x, y, z] += occupancy
+            for attribute_class, occupancy in occupancy_dict.items():
+                x, y, z = table_position(
+                    self.elem_indices,
+                    self.class_indices,
+                    self.config.time_periods,
+                    veh_route,
+                    attribute_class,
+                    time,
+                )
+                self.counts_buffer.add(x, y, z, occupancy)
 
     def finalise(self):
         """
@@ -1339,8 +1780,14 @@ class StopPassengerCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = ["waitingForPt"] + TransitOccupancy.event_types
+    engine_class = TransitOccupancy
     invalid_modes = ["car"]
 
+    # results tables, incremented in batches, see TableBuffer
+    boardings = BufferedTable()
+    alightings = BufferedTable()
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         """
         Initiate class, creates results placeholders.
@@ -1396,7 +1843,9 @@ class StopPassengerCounts(EventHandlerTool):
             self.logger.debug(f"Filtering stops for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[viable_stops, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "stops", None if viable_stops is None else self.mode, self.elem_gdf
+        )
 
         # Initialise results tables
         self.boardings = np.zeros((len(self.elem_indices), len(self.class_indices), self.config.time_periods))
@@ -1404,11 +1853,13 @@ class StopPassengerCounts(EventHandlerTool):
 
         # Initialise agent status mapping
         self.agent_status = dict()  # agent_id : [origin_stop, destination_stop]
+        self.mode_code = self.ids.modes.get(self.mode)
 
     def process_event(self, elem):
         """
         Iteratively aggregate 'waitingForPt', 'PersonEntersVehicle' and
         'PersonLeavesVehicle' events to determine stop boardings and alightings.
+        Boardings and alightings are handed on by the handler's TransitOccupancy engine.
         :param elem: Event XML element
         """
         event_type = elem.get("type")
@@ -1419,46 +1870,57 @@ class StopPassengerCounts(EventHandlerTool):
             destination_stop = elem.get("destinationStop")
             self.agent_status[agent_id] = [origin_stop, destination_stop]
 
-        elif event_type == "PersonEntersVehicle":
-            veh_mode = self.vehicle_mode(elem.get("vehicle"))
-
-            if veh_mode == self.mode:
-                agent_id = elem.get("person")
-
-                if self.agent_status.get(agent_id, None) is not None:
-                    time = float(elem.get("time"))
-                    attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
-                    origin_stop = self.agent_status[agent_id][0]
-                    x, y, z = table_position(
-                        self.elem_indices,
-                        self.class_indices,
-                        self.config.time_periods,
-                        origin_stop,
-                        attribute_class,
-                        time,
-                    )
-                    self.boardings[x, y, z] += 1
-
-        elif event_type == "PersonLeavesVehicle":
-            veh_mode = self.vehicle_mode(elem.get("vehicle"))
+        else:
+            self.engine.process_event(elem)
 
-            if veh_mode == self.mode:
-                agent_id = elem.get("person")
+    def process_boarding(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Add a boarding at the agent origin stop.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: current vehicle stop id, not used
+        :param time: event time string
+        """
+        if mode_code == self.mode_code:
+            if self.agent_status.get(agent_id, None) is not None:
+                time = float(time)
+                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+                origin_stop = self.agent_status[agent_id][0]
+                x, y, z = table_position(
+                    self.elem_indices,
+                    self.class_indices,
+                    self.config.time_periods,
+                    origin_stop,
+                    attribute_class,
+                    time,
+                )
+                self.boardings_buffer.add(x, y, z)
 
-                if self.agent_status.get(agent_id, None) is not None:
-                    time = float(elem.get("time"))
-                    attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
-                    destination_stop = self.agent_status[agent_id][1]
-                    x, y, z = table_position(
-                        self.elem_indices,
-                        self.class_indices,
-                        self.config.time_periods,
-                        destination_stop,
-                        attribute_class,
-                        time,
-                    )
-                    self.alightings[x, y, z] += 1
-                    self.agent_status.pop(agent_id, None)
+    def process_alighting(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Add an alighting at the agent destination stop.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: current vehicle stop id, not used
+        :param time: event time string
+        """
+        if mode_code == self.mode_code:
+            if self.agent_status.get(agent_id, None) is not None:
+                time = float(time)
+                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+                destination_stop = self.agent_status[agent_id][1]
+                x, y, z = table_position(
+                    self.elem_indices,
+                    self.class_indices,
+                    self.config.time_periods,
+                    destination_stop,
+                    attribute_class,
+                    time,
+                )
+                self.alightings_buffer.add(x, y, z)
+                self.agent_status.pop(agent_id, None)
 
     def finalise(self):
         """
@@ -1487,7 +1949,7 @@ class StopPassengerCounts(EventHandlerTool):
 
                 # Create volume counts output
                 key = f"{self.name}_{direction}_{self.groupby_person_attribute}"
-                counts_df = self.elem_gdf.join(counts_df, how="left")
+                counts_df = self.elem_table().join(counts_df, how="left")
                 self.result_dfs[key] = counts_df
 
             # calc sum across all recorded attribute classes
@@ -1501,7 +1963,7 @@ class StopPassengerCounts(EventHandlerTool):
             del data
 
             key = f"{self.name}_{direction}"
-            totals_df = self.elem_gdf.join(totals_df, how="left")
+            totals_df = self.elem_table().join(totals_df, how="left")
             self.result_dfs[key] = totals_df
 
 
@@ -1516,6 +1978,8 @@ class StopToStopPassengerCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = TransitOccupancy.event_types
+    engine_class = TransitOccupancy
     invalid_modes = ["car"]
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
@@ -1532,7 +1996,6 @@ class StopToStopPassengerCounts(EventHandlerTool):
         self.elem_ids = None
         self.elem_indices = None
         self.counts = None
-        self.veh_occupancy = None
 
         # Initialise results storage
         self.result_dfs = dict()  # Result geodataframes ready to export
@@ -1571,16 +2034,15 @@ modes. Elara will continue with all stops found in schedule.
             self.logger.debug(f"Filtering stops for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[viable_stops, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "stops", None if viable_stops is None else self.mode, self.elem_gdf
+        )
 
-        # Initialise results tablescd
-        self.counts = np.zeros(
+        # Initialise sparse results table, only observed stop pairs are stored
+        self.counts = PairTable(
             (len(self.elem_indices), len(self.elem_indices), len(self.class_indices), self.config.time_periods)
         )
-
-        # Initialise agent status mapping
-        self.veh_occupancy = dict()  # {veh_id : {attribute_class: COUNT}}
-        self.veh_tracker = dict()  # {veh_id: last_stop}
+        self.mode_code = self.ids.modes.get(self.mode)
 
     def process_event(self, elem):
         """
@@ -1603,64 +2065,49 @@ modes. Elara will continue with all stops found in schedule.
                 vehicle="bus1"
                 facility="home_stop_out"
                 delay="Infinity"/>
-        """
-        event_type = elem.get("type")
 
-        if event_type == "PersonEntersVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
-
-                if self.veh_occupancy.get(veh_id, None) is None:
-                    self.veh_occupancy[veh_id] = {attribute_class: 1}
-                elif not self.veh_occupancy[veh_id].get(attribute_class, None):
-                    self.veh_occupancy[veh_id][attribute_class] = 1
-                else:
-                    self.veh_occupancy[veh_id][attribute_class] += 1
-
-        elif event_type == "PersonLeavesVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
-
-                if self.veh_occupancy[veh_id][attribute_class]:
-                    self.veh_occupancy[veh_id][attribute_class] -= 1
-                    if not self.veh_occupancy[veh_id]:
-                        self.veh_occupancy.pop(veh_id, None)
-
-        elif event_type == "VehicleArrivesAtFacility":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+        Vehicle occupancy and stops are tracked by the handler's TransitOccupancy engine, see
+        .process_stop_load().
+        """
+        self.engine.process_event(elem)
+
+    def process_stop_load(self, veh_id, mode_code, prev_stop_id, stop_id, time, occupancy_dict) -> None:
+        """
+        Increment stop to stop passenger volumes with the occupancy of a vehicle arriving at a stop.
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param prev_stop_id: previous stop id
+        :param stop_id: stop id
+        :param time: time float
+        :param occupancy_dict: vehicle occupancy, {attribute_class: COUNT}
+        """
+        if mode_code == self.mode_code:
+            for attribute_class, occupancy in occupancy_dict.items():
+                o, d, y, z = table_position_4d(
+                    self.elem_indices,
+                    self.elem_indices,
+                    self.class_indices,
+                    self.config.time_periods,
+                    prev_stop_id,
+                    stop_id,
+                    attribute_class,
+                    time,
+                )
+                self.counts.add(o, d, y, z, occupancy)
 
-            if veh_mode == self.mode:
-                stop_id = elem.get("facility")
-                prev_stop_id = self.veh_tracker.get(veh_id, None)
-                self.veh_tracker[veh_id] = stop_id
+    @property
+    def veh_occupancy(self) -> dict:
+        """
+        Vehicle occupancy, {veh_id : {attribute_class: COUNT}}, tracked by the handler's engine.
+        """
+        return self.engine.occupancy[self.groupby_person_attribute]
 
-                if prev_stop_id is not None:
-                    time = float(elem.get("time"))
-                    occupancy_dict = self.veh_occupancy.get(veh_id, {})
-
-                    for attribute_class, occupancy in occupancy_dict.items():
-                        o, d, y, z = table_position_4d(
-                            self.elem_indices,
-                            self.elem_indices,
-                            self.class_indices,
-                            self.config.time_periods,
-                            prev_stop_id,
-                            stop_id,
-                            attribute_class,
-                            time,
-                        )
-                        self.counts[o, d, y, z] += occupancy
+    @property
+    def veh_tracker(self) -> dict:
+        """
+        Last stop of each vehicle, {veh_id: last_stop}, tracked by the handler's engine.
+        """
+        return self.engine.stops
 
     def finalise(self):
         """
@@ -1669,25 +2116,36 @@ modes. Elara will continue with all stops found in schedule.
         sample size and create dataframes.
         """
         # TODO this is a mess. requires some forcing to string hacks for None. The pd ops are forcing None to np.nan
-        del self.veh_occupancy
 
-        # Scale final counts
-        self.counts *= 1.0 / self.config.scale_factor
+        # Scale final counts of observed stop pairs
+        origins, destinations, counts = self.counts.rows()
+        counts *= 1.0 / self.config.scale_factor
 
-        names = ["origin", "destination", str(self.groupby_person_attribute), "hour"]
+        names = ["origin", "destination", str(self.groupby_person_attribute)]
         self.classes = [str(c) for c in self.classes]
-        indexes = [self.elem_ids, self.elem_ids, self.classes, range(self.config.time_periods)]
-        index = pd.MultiIndex.from_product(indexes, names=names)
-        counts_df = pd.DataFrame(self.counts.flatten(), index=index)[0]
+        elem_ids = np.array(self.elem_ids, dtype=object)
+        index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(elem_ids[origins], len(self.classes)),
+                np.repeat(elem_ids[destinations], len(self.classes)),
+                np.tile(np.array(self.classes, dtype=object), len(origins)),
+            ],
+            names=names
+        )
+        counts_df = pd.DataFrame(
+            counts.reshape(-1, self.config.time_periods),
+            index=index,
+            columns=pd.Index(range(self.config.time_periods), name="hour")
+        )
 
         del self.counts
 
-        counts_df = counts_df.unstack(level="hour").sort_index()
+        counts_df = counts_df.sort_index()
 
         # Join stop data and build geometry
         for n in ("origin", "destination"):
             counts_df = counts_df.reset_index().set_index(n)
-            stop_info = self.elem_gdf.copy()
+            stop_info = self.elem_table().copy()
             stop_info.columns = [f"{n}_{c}" for c in stop_info.columns]
             counts_df = counts_df.join(stop_info, how="left")
 
@@ -1696,12 +2154,13 @@ modes. Elara will continue with all stops found in schedule.
         counts_df = counts_df.reset_index().set_index(["origin", "destination", str(self.groupby_person_attribute)])
         counts_df["total"] = counts_df.sum(1)
 
-        counts_df["geometry"] = [
-            LineString([o, d]) for o, d in zip(counts_df.origin_geometry, counts_df.destination_geometry)
-        ]
-        counts_df.drop("origin_geometry", axis=1, inplace=True)
-        counts_df.drop("destination_geometry", axis=1, inplace=True)
-        counts_df = gpd.GeoDataFrame(counts_df, geometry="geometry")
+        if not self.separate_geometry:
+            counts_df["geometry"] = [
+                LineString([o, d]) for o, d in zip(counts_df.origin_geometry, counts_df.destination_geometry)
+            ]
+            counts_df.drop("origin_geometry", axis=1, inplace=True)
+            counts_df.drop("destination_geometry", axis=1, inplace=True)
+            counts_df = gpd.GeoDataFrame(counts_df, geometry="geometry")
 
         if self.groupby_person_attribute:
             key = f"{self.name}_{self.groupby_person_attribute}"
@@ -1721,21 +2180,21 @@ modes. Elara will continue with all stops found in schedule.
         # Join stop data and build geometry
         for n in ("origin", "destination"):
             totals_df = totals_df.reset_index().set_index(n)
-            stop_info = self.elem_gdf.copy()
+            stop_info = self.elem_table().copy()
             stop_info.columns = [f"{n}_{c}" for c in stop_info.columns]
             totals_df = totals_df.join(stop_info, how="left")
             totals_df.index.name = n
 
         totals_df = totals_df.reset_index().set_index(["origin", "destination"])
 
-        totals_df["geometry"] = [
-            LineString([o, d]) for o, d in zip(totals_df.origin_geometry, totals_df.destination_geometry)
-        ]
-        totals_df.drop("origin_geometry", axis=1, inplace=True)
-        totals_df.drop("destination_geometry", axis=1, inplace=True)
-        totals_df = gpd.GeoDataFrame(totals_df, geometry="geometry")
+        if not self.separate_geometry:
+            totals_df["geometry"] = [
+                LineString([o, d]) for o, d in zip(totals_df.origin_geometry, totals_df.destination_geometry)
+            ]
+            totals_df.drop("origin_geometry", axis=1, inplace=True)
+            totals_df.drop("destination_geometry", axis=1, inplace=True)
+            totals_df = gpd.GeoDataFrame(totals_df, geometry="geometry")
 
-        totals_df = gpd.GeoDataFrame(totals_df, geometry="geometry")
         key = f"{self.name}"
         self.result_dfs[key] = totals_df
 
@@ -1751,6 +2210,8 @@ class VehicleStopToStopPassengerCounts(EventHandlerTool):
         "transit_schedule",
         "attributes",
     ]
+    event_types = TransitOccupancy.event_types
+    engine_class = TransitOccupancy
     invalid_modes = ["car"]
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
@@ -1767,7 +2228,6 @@ class VehicleStopToStopPassengerCounts(EventHandlerTool):
         self.elem_ids = None
         self.elem_indices = None
         self.counts = None
-        self.veh_occupancy = None
 
         # Initialise results storage
         self.result_dfs = dict()  # Result geodataframes ready to export
@@ -1813,15 +2273,15 @@ modes. Elara will continue with all stops found in schedule.
             self.logger.debug(f"Filtering stops for mode:{self.mode}.")
             self.elem_gdf = self.elem_gdf.loc[viable_stops, :]
 
-        self.elem_ids, self.elem_indices = self.generate_elem_ids(self.elem_gdf)
+        self.elem_ids, self.elem_indices = self.ids.selection(
+            "stops", None if viable_stops is None else self.mode, self.elem_gdf
+        )
 
-        # Initialise results dictionary
-        self.counts = dict()  # passenger counts
+        # Initialise results dictionary, keyed by interned ids
+        self.stop_pairs = IdIndex()  # (from_stop, to_stop) pairs
+        self.counts = dict()  # passenger counts {(stop pair, vehicle, attribute class, hour): COUNT}
         self.veh_counts = dict()  # vehicle counts
-
-        # Initialise agent status mapping
-        self.veh_occupancy = dict()  # {veh_id : {attribute_class: COUNT}}
-        self.veh_tracker = dict()  # {veh_id: last_stop}
+        self.mode_code = self.ids.modes.get(self.mode)
 
     def process_event(self, elem):
         """
@@ -1844,62 +2304,63 @@ modes. Elara will continue with all stops found in schedule.
                 vehicle="bus1"
                 facility="home_stop_out"
                 delay="Infinity"/>
-        """
-        event_type = elem.get("type")
 
-        if event_type == "PersonEntersVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+        Vehicle occupancy and stops are tracked by the handler's TransitOccupancy engine, see
+        .process_stop_load().
+        """
+        self.engine.process_event(elem)
 
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+    def process_stop_load(self, veh_id, mode_code, prev_stop_id, stop_id, time, occupancy_dict) -> None:
+        """
+        Increment stop to stop passenger and vehicle volumes with the occupancy of a vehicle
+        arriving at a stop.
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param prev_stop_id: previous stop id
+        :param stop_id: stop id
+        :param time: time float
+        :param occupancy_dict: vehicle occupancy, {attribute_class: COUNT}
+        """
+        if mode_code == self.mode_code:
+            hour = floor(time / (86400.0 / self.config.time_periods)) % self.config.time_periods
+            pair = self.stop_pairs.intern((prev_stop_id, stop_id))
+            vehicle = self.ids.vehicles.indices[veh_id]
 
-                if self.veh_occupancy.get(veh_id, None) is None:
-                    self.veh_occupancy[veh_id] = {attribute_class: 1}
-                elif not self.veh_occupancy[veh_id].get(attribute_class, None):
-                    self.veh_occupancy[veh_id][attribute_class] = 1
+            for attribute_class, occupancy in occupancy_dict.items():
+                midx = (pair, vehicle, self.class_indices[attribute_class], hour)
+                if self.counts.get(midx) is None:
+                    self.counts[midx] = occupancy
+                    self.veh_counts[midx] = 1
                 else:
-                    self.veh_occupancy[veh_id][attribute_class] += 1
-
-        elif event_type == "PersonLeavesVehicle":
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-
-            # Filter out PT drivers from transit volume statistics
-            if agent_id[:2] != "pt" and veh_mode == self.mode:
-                attribute_class = self.attributes.get(agent_id, {}).get(self.groupby_person_attribute, None)
+                    # self.logger.warning(f'Vehicle {veh_id} arrives at stop {stop_id} more than once.')
+                    self.counts[midx] += occupancy
+                    self.veh_counts[midx] += 1
 
-                if self.veh_occupancy[veh_id][attribute_class]:
-                    self.veh_occupancy[veh_id][attribute_class] -= 1
-                    if not self.veh_occupancy[veh_id]:
-                        self.veh_occupancy.pop(veh_id, None)
-
-        elif event_type == "VehicleArrivesAtFacility":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
+    @property
+    def veh_occupancy(self) -> dict:
+        """
+        Vehicle occupancy, {veh_id : {attribute_class: COUNT}}, tracked by the handler's engine.
+        """
+        return self.engine.occupancy[self.groupby_person_attribute]
 
-            if veh_mode == self.mode:
-                stop_id = elem.get("facility")
-                prev_stop_id = self.veh_tracker.get(veh_id, None)
-                self.veh_tracker[veh_id] = stop_id
+    @property
+    def veh_tracker(self) -> dict:
+        """
+        Last stop of each vehicle, {veh_id: last_stop}, tracked by the handler's engine.
+        """
+        return self.engine.stops
 
-                if prev_stop_id is not None:
-                    time = float(elem.get("time"))
-                    hour = floor(time / (86400.0 / self.config.time_periods)) % self.config.time_periods
-                    occupancy_dict = self.veh_occupancy.get(veh_id, {})
-
-                    for attribute_class, occupancy in occupancy_dict.items():
-                        midx = (prev_stop_id, stop_id, veh_id, attribute_class, hour)
-                        if self.counts.get(midx) is None:
-                            self.counts[midx] = occupancy
-                            self.veh_counts[midx] = 1
-                        else:
-                            # self.logger.warning(f'Vehicle {veh_id} arrives at stop {stop_id} more than once.')
-                            self.counts[midx] += occupancy
-                            self.veh_counts[midx] += 1
+    def decode(self, counts: dict) -> dict:
+        """
+        Re-key counts from interned ids to (from_stop, to_stop, veh_id, attribute_class, hour).
+        :param counts: dict of counts keyed by (stop pair, vehicle, attribute class, hour) indices
+        :return: dict
+        """
+        classes = list(self.class_indices)
+        return {
+            (*self.stop_pairs.ids[pair], self.ids.vehicles.ids[vehicle], classes[y], hour): count
+            for (pair, vehicle, y, hour), count in counts.items()
+        }
 
     def finalise(self):
         """
@@ -1908,7 +2369,6 @@ modes. Elara will continue with all stops found in schedule.
         sample size and create dataframes.
         """
         # TODO this is a mess. requires some forcing to string hacks for None. The pd ops are forcing None to np.nan
-        del self.veh_occupancy
 
         # Check if counts dictionary exists
         if not self.counts:
@@ -1917,9 +2377,9 @@ modes. Elara will continue with all stops found in schedule.
 
         names = ["from_stop", "to_stop", "veh_id", str(self.groupby_person_attribute)]
 
-        counts_df = pd.Series(self.counts)
+        counts_df = pd.Series(self.decode(self.counts))
         # include vehicle counts (in case a vehicle arrives at a stop more than once)
-        counts_df = pd.concat([counts_df, pd.Series(self.veh_counts)], axis=1)
+        counts_df = pd.concat([counts_df, pd.Series(self.decode(self.veh_counts))], axis=1)
 
         counts_df.index.names = names + ["to_stop_arrival_hour"]
         counts_df.columns = ["pax_counts", "veh_counts"]
@@ -1935,7 +2395,7 @@ modes. Elara will continue with all stops found in schedule.
         # Join stop data and build geometry
         for n in ("from_stop", "to_stop"):
             counts_df = counts_df.reset_index().set_index(n)
-            stop_info = self.elem_gdf.copy()
+            stop_info = self.elem_table().copy()
             stop_info.columns = [f"{n}_{c}" for c in stop_info.columns]
             counts_df = counts_df.join(stop_info, how="left")
 
@@ -1945,12 +2405,13 @@ modes. Elara will continue with all stops found in schedule.
         counts_df["route"] = counts_df.index.get_level_values("veh_id").map(self.veh_route)
         counts_df["total"] = counts_df.sum(1)
 
-        counts_df["geometry"] = [
-            LineString([o, d]) for o, d in zip(counts_df.from_stop_geometry, counts_df.to_stop_geometry)
-        ]
-        counts_df.drop("from_stop_geometry", axis=1, inplace=True)
-        counts_df.drop("to_stop_geometry", axis=1, inplace=True)
-        counts_df = gpd.GeoDataFrame(counts_df, geometry="geometry")
+        if not self.separate_geometry:
+            counts_df["geometry"] = [
+                LineString([o, d]) for o, d in zip(counts_df.from_stop_geometry, counts_df.to_stop_geometry)
+            ]
+            counts_df.drop("from_stop_geometry", axis=1, inplace=True)
+            counts_df.drop("to_stop_geometry", axis=1, inplace=True)
+            counts_df = gpd.GeoDataFrame(counts_df, geometry="geometry")
 
         #################
         # temp: unit tests currently require all hours of the day as columns
@@ -1970,17 +2431,18 @@ modes. Elara will continue with all stops found in schedule.
         # Join stop data and build geometry
         for n in ("from_stop", "to_stop"):
             totals_df = totals_df.reset_index().set_index(n)
-            stop_info = self.elem_gdf.copy()
+            stop_info = self.elem_table().copy()
             stop_info.columns = [f"{n}_{c}" for c in stop_info.columns]
             totals_df = totals_df.join(stop_info, how="left")
             totals_df.index.name = n
 
-        totals_df["geometry"] = [
-            LineString([o, d]) for o, d in zip(totals_df.from_stop_geometry, totals_df.to_stop_geometry)
-        ]
-        totals_df.drop("from_stop_geometry", axis=1, inplace=True)
-        totals_df.drop("to_stop_geometry", axis=1, inplace=True)
-        totals_df = gpd.GeoDataFrame(totals_df, geometry="geometry")
+        if not self.separate_geometry:
+            totals_df["geometry"] = [
+                LineString([o, d]) for o, d in zip(totals_df.from_stop_geometry, totals_df.to_stop_geometry)
+            ]
+            totals_df.drop("from_stop_geometry", axis=1, inplace=True)
+            totals_df.drop("to_stop_geometry", axis=1, inplace=True)
+            totals_df = gpd.GeoDataFrame(totals_df, geometry="geometry")
 
         key = f"{self.name}"
         self.result_dfs[key] = totals_df
@@ -1992,6 +2454,16 @@ class VehicleDepartureLog(EventHandlerTool):
     """
 
     requirements = ["events", "transit_schedule"]
+    event_types = ["VehicleDepartsAtFacility"]
+    partition_results = []
+    log_schema = [
+        ("veh_id", object),
+        ("veh_mode", object),
+        ("veh_route", object),
+        ("stop_id", object),
+        ("departure_time", np.int64),
+        ("delay", np.int64),
+    ]
 
     def __init__(self, config, mode="all", **kwargs):
         super().__init__(config, mode, **kwargs)
@@ -2009,8 +2481,8 @@ class VehicleDepartureLog(EventHandlerTool):
 
         pt_csv_name = f"{self.name}.csv"
 
-        self.vehicle_departure_log = self.start_csv_chunk_writer(
-            pt_csv_name, write_path=write_path, compression=self.compression
+        self.vehicle_departure_log = self.start_columnar_chunk_writer(
+            pt_csv_name, self.log_schema, write_path=write_path, compression=self.compression
         )
 
     def process_event(self, elem) -> None:
@@ -2030,18 +2502,7 @@ class VehicleDepartureLog(EventHandlerTool):
 
             if veh_mode == self.mode or self.mode == "all":  # None = all modes
 
-                pt_departures = [
-                    {
-                        "veh_id": veh_id,
-                        "veh_mode": veh_mode,
-                        "veh_route": veh_route,
-                        "stop_id": stop_id,
-                        "departure_time": departure_time,
-                        "delay": delay,
-                    }
-                ]
-
-                self.vehicle_departure_log.add(pt_departures)
+                self.vehicle_departure_log.append((veh_id, veh_mode, veh_route, stop_id, departure_time, delay))
 
         return None
 
@@ -2055,6 +2516,17 @@ class VehiclePassengerLog(EventHandlerTool):
     """
 
     requirements = ["events", "transit_schedule"]
+    event_types = TransitOccupancy.event_types
+    engine_class = TransitOccupancy
+    log_schema = [
+        ("agent_id", object),
+        ("event_type", object),
+        ("veh_id", object),
+        ("stop_id", object),
+        ("time", object),
+        ("veh_mode", object),
+        ("veh_route", object),
+    ]
 
     def __init__(self, config, mode="all", **kwargs):
         super().__init__(config, mode, **kwargs)
@@ -2070,51 +2542,50 @@ class VehiclePassengerLog(EventHandlerTool):
         super().build(resources, write_path=write_path)
 
         pt_csv_name = f"{self.name}.csv"
-        self.veh_tracker = dict()  # {veh_id: last_stop}
 
-        self.vehicle_passenger_log = self.start_csv_chunk_writer(
-            pt_csv_name, write_path=write_path, compression=self.compression
+        self.vehicle_passenger_log = self.start_columnar_chunk_writer(
+            pt_csv_name, self.log_schema, write_path=write_path, compression=self.compression
         )
 
     def process_event(self, elem) -> None:
         """
+        Boardings and alightings, with the last vehicle stop, are handed on by the handler's
+        TransitOccupancy engine.
         :param elem: Event XML element
         """
-        event_type = elem.get("type")
+        self.engine.process_event(elem)
 
-        # keep track of the last vehicle stop
-        if event_type == "VehicleArrivesAtFacility":
-            veh_id = elem.get("vehicle")
-            # veh_mode = self.vehicle_mode(veh_id)
-            stop_id = elem.get("facility")
-            self.veh_tracker[veh_id] = stop_id
+    def process_boarding(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Add a boarding to the log.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: last vehicle stop id
+        :param time: event time string
+        """
+        self.log(agent_id, "PersonEntersVehicle", veh_id, mode_code, stop_id, time)
 
-        # add boardings/alightings to the log
-        if event_type in ["PersonEntersVehicle", "PersonLeavesVehicle"]:
-            agent_id = elem.get("person")
-            veh_id = elem.get("vehicle")
-            veh_route = self.vehicle_route(veh_id)
-            event_time = elem.get("time")
-            veh_mode = self.vehicle_mode(veh_id)
-            stop_id = self.veh_tracker.get(veh_id, None)
+    def process_alighting(self, agent_id, veh_id, mode_code, stop_id, time) -> None:
+        """
+        Add an alighting to the log.
+        :param agent_id: agent id
+        :param veh_id: vehicle id
+        :param mode_code: vehicle mode code
+        :param stop_id: last vehicle stop id
+        :param time: event time string
+        """
+        self.log(agent_id, "PersonLeavesVehicle", veh_id, mode_code, stop_id, time)
 
-            if veh_mode == self.mode or self.mode == "all":
-                if agent_id[:2] != "pt":  # Filter out PT drivers from transit volume statistics
-
-                    boardings = [
-                        {
-                            "agent_id": agent_id,
-                            "event_type": event_type,
-                            "veh_id": veh_id,
-                            "stop_id": stop_id,
-                            "time": event_time,
-                            "veh_mode": veh_mode,
-                            "veh_route": veh_route,
-                        }
-                    ]
-                    self.vehicle_passenger_log.add(boardings)
+    def log(self, agent_id, event_type, veh_id, mode_code, stop_id, event_time) -> None:
+        veh_mode = self.ids.modes.ids[mode_code]
 
-        return None
+        if veh_mode == self.mode or self.mode == "all":
+            if agent_id[:2] != "pt":  # Filter out PT drivers from transit volume statistics
+
+                self.vehicle_passenger_log.append(
+                    (agent_id, event_type, veh_id, stop_id, event_time, veh_mode, self.vehicle_route(veh_id))
+                )
 
     def finalise(self):
         self.vehicle_passenger_log.finish()
@@ -2126,6 +2597,16 @@ class VehicleLinkLog(EventHandlerTool):
     """
 
     requirements = ["events", "transit_schedule"]
+    event_types = LinkTraversals.event_types
+    partition_results = []
+    engine_class = LinkTraversals
+    log_schema = [
+        ("veh_id", object),
+        ("veh_mode", object),
+        ("link_id", object),
+        ("entry_time", np.int64),
+        ("exit_time", np.int64),
+    ]
 
     def __init__(self, config, mode=None, **kwargs):
         super().__init__(config, mode, **kwargs)
@@ -2143,52 +2624,36 @@ class VehicleLinkLog(EventHandlerTool):
 
         file_name = f"{self.name}.csv"
 
-        self.vehicle_link_log = self.start_csv_chunk_writer(
-            file_name, write_path=write_path, compression=self.compression
+        self.vehicle_link_log = self.start_columnar_chunk_writer(
+            file_name, self.log_schema, write_path=write_path, compression=self.compression
         )
 
-        # Only add to chunk writer when entry + exit complete
-        self.event_staging = {}
-
     def process_event(self, elem) -> None:
         """
         Events are closed only when a vehicle enters then exits a link
-        Events are staged on entry, then added to chunk writer when closed
+        Events are paired by the handler's LinkTraversals engine, see .process_traversal()
         :param elem: Event XML element
         """
-        event_type = elem.get("type")
-
-        if event_type == "entered link":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-            link_id = elem.get("link")
-            entry_time = int(float(elem.get("time")))
-
-            if veh_mode == self.mode or self.mode == "all":
-                entry = {
-                    "veh_id": veh_id,
-                    "veh_mode": self.vehicle_mode(veh_id),
-                    "link_id": link_id,
-                    "entry_time": entry_time,
-                }
-
-                self.event_staging[veh_id] = entry
-
-        if event_type == "left link":
-            veh_id = elem.get("vehicle")
+        self.engine.process_event(elem)
 
-            entry = self.event_staging.pop(veh_id, None)
-
-            if entry is not None:
-                entry["exit_time"] = int(float(elem.get("time")))
-                self.vehicle_link_log.add([entry])
-
-        if event_type == "vehicle leaves traffic":  # exit via leaves traffic event
-            veh_id = elem.get("vehicle")
-            # remove staged event. None = veh enters/leaves traffic on same link
-            self.event_staging.pop(veh_id, None)
+    def process_traversal(self, veh_id, link_id, entry_time, exit_time, mode_code, start, end) -> None:
+        """
+        Add a completed link traversal to the chunk writer. Traversals entered or exited via
+        'vehicle enters traffic' or 'vehicle leaves traffic' are ignored.
+        :param veh_id: vehicle id
+        :param link_id: link id
+        :param entry_time: link entry time
+        :param exit_time: link exit time
+        :param mode_code: vehicle mode code
+        :param start: traversal entered via 'vehicle enters traffic'
+        :param end: traversal exited via 'vehicle leaves traffic'
+        """
+        if start or end:
+            return None
 
-        return None
+        veh_mode = self.ids.modes.ids[mode_code]
+        if veh_mode == self.mode or self.mode == "all":
+            self.vehicle_link_log.append((veh_id, veh_mode, link_id, int(entry_time), int(exit_time)))
 
     def finalise(self):
         self.vehicle_link_log.finish()
@@ -2201,6 +2666,9 @@ class AgentTollsLog(EventHandlerTool):
     """
 
     requirements = ["events", "attributes"]
+    event_types = ["personMoney"]
+    # the summary is rebuilt from the log (see .add_rows()) to preserve the order of summation
+    partition_results = ["tolled_pt"]
 
     def __init__(self, config, mode=None, groupby_person_attribute=None, **kwargs):
         super().__init__(config, mode, **kwargs)
@@ -2269,19 +2737,37 @@ class AgentTollsLog(EventHandlerTool):
 
                 # Add to ChunkWriter and update summary dictionaries
                 self.agent_tolls_log.add(toll_event)
+                self.update_summary(agent_id, toll_amount, attrib)
 
-                existing_record = self.toll_log_summary.get(agent_id)
+        return None
 
-                if existing_record is not None:
-                    existing_record["toll_total"] += toll_amount
-                    existing_record["tolls_incurred"] += 1
-                else:
-                    self.toll_log_summary[agent_id] = {"toll_total": toll_amount, "tolls_incurred": 1}
+    def update_summary(self, agent_id: str, toll_amount: float, attrib=None) -> None:
+        """
+        Add a toll to the agent's summary record.
+        :param agent_id: agent ID string
+        :param toll_amount: toll paid
+        :param attrib: Optional agent attribute class
+        """
+        existing_record = self.toll_log_summary.get(agent_id)
 
-                    if attrib is not None:
-                        self.toll_log_summary[agent_id]["class"] = attrib
+        if existing_record is not None:
+            existing_record["toll_total"] += toll_amount
+            existing_record["tolls_incurred"] += 1
+        else:
+            self.toll_log_summary[agent_id] = {"toll_total": toll_amount, "tolls_incurred": 1}
 
-        return None
+            if attrib is not None:
+                self.toll_log_summary[agent_id]["class"] = attrib
+
+    def add_rows(self, attribute: str, lines: list) -> None:
+        """
+        Add lines written by a replica of this handler to the log and update summaries.
+        :param attribute: chunk writer attribute name
+        :param lines: list of dicts
+        """
+        super().add_rows(attribute, lines)
+        for line in lines:
+            self.update_summary(line["agent_id"], line["toll_amount"], line.get("class"))
 
     def finalise(self):
 
@@ -2321,6 +2807,11 @@ class VehicleLinksAnimate(EventHandlerTool):
     """
 
     requirements = ["events", "transit_schedule", "network"]
+    event_types = LinkTraversals.event_types
+    partition_results = []
+    engine_class = LinkTraversals
+    # carried over trips, see LinkTraversals
+    tracker_attributes = ["vehicles", "traces", "timestamps"]
     cmap = {
         "car": [200, 200, 200],
         "bus": [255, 40, 40],
@@ -2331,6 +2822,14 @@ class VehicleLinksAnimate(EventHandlerTool):
         "metro": [153, 51, 255],
     }
     start_time = 1649116800  # 22/04/05
+    # arrow schema of vehicle trips, ids and modes are dictionary encoded
+    trip_schema = pa.schema([
+        ("veh_mode", pa.dictionary(pa.int32(), pa.string())),
+        ("color", pa.list_(pa.uint8(), 3)),
+        ("path", pa.list_(pa.list_(pa.float32(), 2))),
+        ("timestamps", pa.list_(pa.int32())),
+        ("vid", pa.dictionary(pa.int32(), pa.string())),
+    ])
 
     def __init__(self, config, mode=None, **kwargs):
         super().__init__(config, mode, **kwargs)
@@ -2349,7 +2848,9 @@ class VehicleLinksAnimate(EventHandlerTool):
 
         file_name = f"{self.name}.arrow"
 
-        self.vehicle_trips = self.start_arrow_chunk_writer(file_name, write_path=write_path)
+        self.vehicle_trips = self.start_arrow_chunk_writer(
+            file_name, write_path=write_path, schema=self.trip_schema
+        )
 
         self.vehicles = {}
         self.traces = {}
@@ -2357,40 +2858,37 @@ class VehicleLinksAnimate(EventHandlerTool):
 
     def process_event(self, elem) -> None:
         """
-        Events are closed only when a vehicle enters then exits a link
-        Events are staged on entry, then added to chunk writer when closed
+        Trips are closed only when a vehicle enters then leaves traffic
+        Events are paired by the handler's LinkTraversals engine, see .process_traversal()
         :param elem: Event XML element
         """
-        event_type = elem.get("type")
-
-        if event_type == "vehicle enters traffic":
-            veh_id = elem.get("vehicle")
-            veh_mode = self.vehicle_mode(veh_id)
-            link_id = elem.get("link")
-            time = int(float(elem.get("time")))
+        self.engine.process_event(elem)
 
+    def process_traversal(self, veh_id, link_id, entry_time, exit_time, mode_code, start, end) -> None:
+        """
+        Trips are started by a traversal entered via 'vehicle enters traffic', staged with the exit
+        of each traversal, then added to chunk writer when closed by a traversal exited via
+        'vehicle leaves traffic'.
+        :param veh_id: vehicle id
+        :param link_id: link id
+        :param entry_time: link entry time
+        :param exit_time: link exit time
+        :param mode_code: vehicle mode code
+        :param start: traversal entered via 'vehicle enters traffic'
+        :param end: traversal exited via 'vehicle leaves traffic'
+        """
+        if start:
+            veh_mode = self.ids.modes.ids[mode_code]
             if veh_mode == self.mode or self.mode == "all":
                 self.vehicles[veh_id] = {"veh_mode": veh_mode, "color": self.get_color(veh_mode)}
                 self.traces[veh_id] = [self.get_entry_coords(link_id)]
-                self.timestamps[veh_id] = [self.get_timestamp(time)]
-
-        if event_type == "left link":
-            veh_id = elem.get("vehicle")
-            if veh_id in self.vehicles:
-                link_id = elem.get("link")
-                time = int(float(elem.get("time")))
-                self.traces[veh_id].append(self.get_exit_coords(link_id))
-                self.timestamps[veh_id].append(self.get_timestamp(time))
-
-        if event_type == "vehicle leaves traffic":
-            veh_id = elem.get("vehicle")
-            if veh_id in self.vehicles:
-                link_id = elem.get("link")
-                time = int(float(elem.get("time")))
+                self.timestamps[veh_id] = [self.get_timestamp(int(entry_time))]
 
-                self.traces[veh_id].append(self.get_exit_coords(link_id))
-                self.timestamps[veh_id].append(self.get_timestamp(time))
+        if veh_id in self.vehicles:
+            self.traces[veh_id].append(self.get_exit_coords(link_id))
+            self.timestamps[veh_id].append(self.get_timestamp(int(exit_time)))
 
+            if end:
                 vehicle_trip = self.vehicles.pop(veh_id, {})
                 vehicle_trip["path"] = self.traces.pop(veh_id, [])
                 vehicle_trip["timestamps"] = self.timestamps.pop(veh_id, [])
@@ -2398,8 +2896,6 @@ class VehicleLinksAnimate(EventHandlerTool):
                 vehicle_trip["vid"] = veh_id
                 self.vehicle_trips.add([vehicle_trip])
 
-        return None
-
     def finalise(self):
         self.vehicle_trips.finish()
 
@@ -2424,6 +2920,11 @@ class EventHandlerWorkStation(WorkStation):
     Work Station for holding and building Event Handlers.
     """
 
+    concurrent_build = True
+    # events are the longest build, so get spare workers first
+    parallel_build = 2
+    cache_results = True
+
     tools = {
         "link_vehicle_speeds": LinkVehicleSpeeds,
         "link_vehicle_counts": LinkVehicleCounts,
@@ -2446,6 +2947,184 @@ class EventHandlerWorkStation(WorkStation):
         super().__init__(config)
         self.logger = logging.getLogger(__name__)
 
+    def build_dispatch_table(self, handlers: Optional[dict] = None) -> Tuple[dict, list]:
+        """
+        Build a lookup of event type to the .process_event methods of the handlers that consume
+        that type (as declared by handler .event_types). Handlers that do not declare their
+        event types are handed every event. Handler order is preserved. Handlers that consume a
+        shared engine are reached through the engine, see with_engines().
+        :param handlers: Optional dict of handlers, defaults to all handlers (.resources)
+        :return: (dict of {event type: [process_event methods]}, list of catch all methods)
+        """
+        dispatch, catch_all = dispatch_table(with_engines(self.resources if handlers is None else handlers))
+        dispatch = {
+            event_type: [handler.process_event for _, handler in named] for event_type, named in dispatch.items()
+        }
+        catch_all = [handler.process_event for _, handler in catch_all]
+        self.logger.debug(f"Event dispatch table: { {k: len(v) for k, v in dispatch.items()} }")
+        return dispatch, catch_all
+
+    def process_events(
+            self,
+            elems,
+            handlers: Optional[dict] = None,
+            start: int = 0,
+            checkpointer: Optional[checkpoint.Checkpointer] = None,
+    ) -> None:
+        """
+        Hand events to the handlers that consume them, in order.
+        :param elems: iterable of events
+        :param handlers: Optional dict of handlers, defaults to all handlers (.resources)
+        :param start: number of events already processed, eg when resuming from a checkpoint
+        :param checkpointer: Optional Checkpointer, called after each event
+        :return: None
+        """
+        base = 1
+        while base <= start:
+            base *= 2
+
+        dispatch, catch_all = self.build_dispatch_table(handlers)
+
+        for i, event in enumerate(elems, start):
+
+            if not (i + 1) % base:
+                self.logger.info(f"parsed {i + 1} events")
+                base *= 2
+
+            for process_event in dispatch.get(event.get("type"), catch_all):
+                process_event(event)
+
+            if checkpointer is not None:
+                checkpointer(i + 1)
+
+    @property
+    def checkpointing(self) -> bool:
+        """
+        Check if events are checkpointed or resumed from a checkpoint.
+        :return: bool
+        """
+        return bool(self.config.checkpoint_events or self.config.checkpoint_minutes or self.config.resume)
+
+    def checkpoint_path(self, write_path=None) -> str:
+        return os.path.join(write_path or self.config.output_path, checkpoint.CHECKPOINT_NAME)
+
+    def process_events_checkpointed(self, events, write_path=None) -> None:
+        """
+        Process events, checkpointing the handlers every configured number of events
+        (config.checkpoint_events) and/or minutes (config.checkpoint_minutes), see checkpoint.py.
+        When resuming (config.resume), handlers are first restored from the last checkpoint and
+        events continue from the first event after the checkpoint.
+        :param events: built Events input tool
+        :param write_path: Optional output path overwrite
+        :return: None
+        """
+        path = self.checkpoint_path(write_path)
+        shared = checkpoint.shared_objects({"config": self.config, "resources": self.supplier_resources})
+        key = checkpoint.checkpoint_key(self.resources)
+
+        start = 0
+        if self.config.resume:
+            restored = checkpoint.read_checkpoint(path, key, shared)
+            if restored is not None:
+                start, handlers = restored
+                self.resources.update(handlers)
+                events.skip(start)
+
+        checkpointer = None
+        if self.config.checkpoint_events or self.config.checkpoint_minutes:
+            if checkpoint.resumable(self.resources):
+                checkpointer = checkpoint.Checkpointer(
+                    path, key, self.resources, shared,
+                    events=self.config.checkpoint_events,
+                    minutes=self.config.checkpoint_minutes,
+                    start=start,
+                )
+            else:
+                self.logger.warning("Handlers write columnar chunk outputs, continuing without checkpoints")
+
+        self.process_events(events.elems, start=start, checkpointer=checkpointer)
+
+    def process_events_parallel(self, events, write_path=None) -> None:
+        """
+        Process events using worker processes. Events are split into contiguous time partitions
+        (aligned to time periods), each processed by replicas of the parallel capable handlers.
+        Replica results are merged back, in partition order, so that outputs match serial processing:
+        chunk writer lines are passed on, accumulated results are merged (handler.merge()) and
+        carried state (handler.tracker_attributes) is stitched. Events that use carried state from
+        an earlier partition are deferred and handed to the original handler on merge.
+        Handlers that do not support parallel processing process all events in the main process,
+        while the workers are busy.
+        :param events: built Events input tool
+        :param write_path: Optional output path overwrite
+        :return: None
+        """
+        global _partition_handlers
+
+        parallel_handlers = {name: h for name, h in self.resources.items() if h.partition_results is not None}
+        serial_handlers = {name: h for name, h in self.resources.items() if h.partition_results is None}
+        if serial_handlers:
+            self.logger.info(f"Handlers processed in main process: {list(serial_handlers)}")
+        if not parallel_handlers:
+            self.logger.warning("No handlers support parallel processing, continuing without workers")
+            return self.process_events(events.elems)
+
+        tmp_dir = tempfile.mkdtemp(prefix="elara-")
+        try:
+            events_path = events.columnar_path(tmp_dir)
+            partitions = cache.plan_event_partitions(
+                events_path, self.config.workers, 86400.0 / self.config.time_periods
+            )
+            if partitions is None:
+                self.logger.warning("Events are not in time order, continuing without workers")
+                return self.process_events(cache.read_event_cache(events_path))
+            self.logger.info(f"Processing {len(partitions)} event partitions with {self.config.workers} workers")
+
+            _partition_handlers = parallel_handlers
+            pool = parallel.fork_pool(min(self.config.workers, len(partitions)))
+            if pool is None:
+                return self.process_events(cache.read_event_cache(events_path))
+
+            with pool:
+                tasks = [
+                    (index, start, stop, events_path, tmp_dir, write_path)
+                    for index, (start, stop) in enumerate(partitions)
+                ]
+                partition_paths = pool.imap(process_event_partition, tasks)
+                if serial_handlers:
+                    self.process_events(cache.read_event_cache(events_path), serial_handlers)
+                # shared engines of the main process, for deferred events and carried state
+                merged_handlers = with_engines(parallel_handlers)
+                for index, (spool_path, results_path) in enumerate(partition_paths):
+                    self.logger.info(f"Merging event partition {index}")
+                    self.merge_partition(merged_handlers, spool_path, results_path)
+        finally:
+            _partition_handlers = None
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def merge_partition(self, handlers: dict, spool_path: str, results_path: str) -> None:
+        """
+        Merge the outputs of a partition worker into the handlers.
+        :param handlers: dict of handlers processed by the worker
+        :param spool_path: worker spool file path string
+        :param results_path: worker results file path string
+        :return: None
+        """
+        parallel.replay_spool(spool_path, handlers)
+        partition_results = parallel.read_results(results_path)
+        os.remove(spool_path)
+        os.remove(results_path)
+
+        for name, results in partition_results.items():
+            handler = handlers[name]
+            handler.merge(results["results"])
+            for attribute, partition_tracker in results["trackers"].items():
+                tracker = getattr(handler, attribute)
+                for key in results["determined"]:
+                    if key in partition_tracker:
+                        tracker[key] = partition_tracker[key]
+                    else:
+                        tracker.pop(key, None)
+
     def build(self, write_path=None) -> None:
         """
         Build all required handlers, then finalise and save results.
@@ -2463,16 +3142,15 @@ class EventHandlerWorkStation(WorkStation):
         # iterate through events
         events = self.supplier_resources["events"]
         self.logger.info("***Commencing Event Iteration***")
-        base = 1
-
-        for i, event in enumerate(events.elems):
-
-            if not (i + 1) % base:
-                self.logger.info(f"parsed {i + 1} events")
-                base *= 2
 
-            for handler in self.resources.values():
-                handler.process_event(event)
+        if self.config.workers > 1:
+            if self.checkpointing:
+                self.logger.warning("Events are not checkpointed when processed with workers")
+            self.process_events_parallel(events, write_path=write_path)
+        elif self.checkpointing:
+            self.process_events_checkpointed(events, write_path=write_path)
+        else:
+            self.process_events(events.elems)
 
         self.logger.info("*** Completed Event Iteration ***")
 
@@ -2498,12 +3176,173 @@ class EventHandlerWorkStation(WorkStation):
                     csv_name = "{}.csv".format(name)
                     geojson_name = "{}.geojson".format(name)
 
-                    self.write_csv(df, csv_name, write_path=write_path, compression=handler.compression)
+                    handler.record_output(
+                        self.write_csv(df, csv_name, write_path=write_path, compression=handler.compression)
+                    )
                     if isinstance(df, gpd.GeoDataFrame):
-                        self.write_geojson(df, geojson_name, write_path=write_path)
+                        handler.record_output(self.write_geojson(df, geojson_name, write_path=write_path))
 
                     del df
 
+        if self.separate_geometry:
+            self.write_elem_geometries(write_path=write_path)
+
+        # results are complete, a later run can't resume from the checkpoint
+        path = self.checkpoint_path(write_path)
+        if self.checkpointing and os.path.exists(path):
+            os.remove(path)
+
+    def write_elem_geometries(self, write_path=None) -> None:
+        """
+        Write network link and transit stop geometries once, for the id keyed results of the
+        handlers (see EventHandlerTool.elem_table()).
+        :param write_path: Optional output path overwrite
+        :return: None
+        """
+        paths = []
+        network = self.supplier_resources.get("network")
+        if getattr(network, "link_gdf", None) is not None:
+            paths.append(self.write_geometry(network.link_gdf, "network_links", "link_id", write_path=write_path))
+
+        transit_schedule = self.supplier_resources.get("transit_schedule")
+        if getattr(transit_schedule, "stop_gdf", None) is not None:
+            paths.append(self.write_geometry(transit_schedule.stop_gdf, "transit_stops", "stop_id", write_path=write_path))
+
+        # results are keyed to the geometries, so these are restored with any cached result
+        for handler in self.resources.values():
+            for path in paths:
+                handler.record_output(path)
+
+
+def with_engines(handlers: dict) -> dict:
+    """
+    Subscribe handlers that consume an engine (.engine_class) to a single shared engine per engine
+    class, added to the handlers under the engine .name.
+    :param handlers: dict of handlers
+    :return: dict of handlers and shared engines
+    """
+    consumers = {}
+    for handler in handlers.values():
+        if handler.engine_class is not None:
+            consumers.setdefault(handler.engine_class, []).append(handler)
+    if not consumers:
+        return handlers
+
+    handlers = dict(handlers)
+    for engine_class, subscribed in consumers.items():
+        engine = subscribed[0].engine
+        # keep an engine already shared by the same handlers, eg restored from a checkpoint
+        if engine is None or engine.consumers != subscribed:
+            engine = engine_class(subscribed[0].ids, subscribed)
+        for handler in subscribed:
+            handler.engine = engine
+        handlers[engine_class.name] = engine
+    return handlers
+
+
+def dispatch_table(handlers: dict) -> Tuple[dict, list]:
+    """
+    Build a lookup of event type to the (name, handler) pairs of the handlers that consume that
+    type. Handlers that do not declare their event types consume every event. Handlers that
+    consume a shared engine (see with_engines()) are left out for the event types of the engine,
+    which are handed to the engine instead.
+    :param handlers: dict of handlers (and shared engines)
+    :return: (dict of {event type: [(name, handler)]}, list of catch all (name, handler))
+    """
+    catch_all = [(name, handler) for name, handler in handlers.items() if handler.event_types is None]
+    event_types = set()
+    for handler in handlers.values():
+        if handler.event_types is not None:
+            event_types.update(handler.event_types)
+
+    dispatch = {}
+    for event_type in event_types:
+        dispatch[event_type] = [
+            (name, handler)
+            for name, handler in handlers.items()
+            if handler.event_types is None
+            or (event_type in handler.event_types and not consumed_by_engine(handler, event_type))
+        ]
+    return dispatch, catch_all
+
+
+def consumed_by_engine(handler, event_type: str) -> bool:
+    """
+    Check if a handler consumes events of the given type through a shared engine.
+    :param handler: handler (or engine)
+    :param event_type: event type string
+    :return: bool
+    """
+    engine_class = getattr(handler, "engine_class", None)
+    return engine_class is not None and event_type in engine_class.event_types
+
+
+# handlers to replicate in partition workers, set before forking workers
+_partition_handlers = None
+
+
+def process_event_partition(task: tuple) -> Tuple[str, str]:
+    """
+    Worker process: process a partition (row range) of the events with replicas of the parallel
+    capable handlers. Lines written by replicas and events that use state carried from an earlier
+    partition (.tracker_reads for keys not yet set in this partition) are spooled, in order,
+    for the main process. Accumulated results and carried state are written to a results file.
+    :param task: (partition index, start row, stop row, events path, tmp directory, write_path)
+    :return: (spool path, results path)
+    """
+    index, start, stop, events_path, tmp_dir, write_path = task
+    logger = logging.getLogger(__name__)
+    logger.info(f"Processing event partition {index}: events {start} to {stop}")
+
+    spool_path = os.path.join(tmp_dir, f"partition-{index}.spool")
+    results_path = os.path.join(tmp_dir, f"partition-{index}.pkl")
+    spool = parallel.Spool(spool_path)
+    replicas = with_engines({
+        name: parallel.replicate(handler, spool, name, write_path=write_path)
+        for name, handler in _partition_handlers.items()
+    })
+    dispatch, catch_all = dispatch_table(replicas)
+
+    # the first partition has no earlier state to depend on
+    defer = index > 0
+    determined = {name: set() for name in replicas}
+    # handlers consuming a shared engine carry state for the keys determined by the engine
+    for name, replica in replicas.items():
+        if getattr(replica, "engine_class", None) is not None:
+            determined[name] = determined[replica.engine_class.name]
+
+    for event in cache.read_event_cache(events_path, start, stop):
+        event_type = event.get("type")
+        for name, replica in dispatch.get(event_type, catch_all):
+            if defer and replica.tracker_attributes:
+                key = event.get(replica.tracker_key)
+                if key not in determined[name]:
+                    if event_type in replica.tracker_sets:
+                        determined[name].add(key)
+                    if event_type in replica.tracker_reads:
+                        spool.add((parallel.EVENT, name, event))
+                        continue
+            replica.process_event(event)
+    spool.close()
+
+    partition_results = {}
+    for name, replica in replicas.items():
+        trackers = {attribute: getattr(replica, attribute) for attribute in replica.tracker_attributes}
+        if not defer:
+            determined[name] = set().union(*trackers.values())
+        partition_results[name] = {
+            "results": {attribute: getattr(replica, attribute) for attribute in replica.partition_results},
+            "trackers": {
+                attribute: {key: tracker[key] for key in determined[name] if key in tracker}
+                for attribute, tracker in trackers.items()
+            },
+            "determined": determined[name],
+        }
+    parallel.write_results(results_path, partition_results)
+
+    logger.info(f"Completed event partition {index}")
+    return spool_path, results_path
+
 
 def table_position(elem_indices, class_indices, periods, elem_id, attribute_class, time):
     """
@@ -2522,6 +3361,21 @@ def table_position(elem_indices, class_indices, periods, elem_id, attribute_clas
     return x, y, z
 
 
+def table_index(elem_indices, periods, elem_id, time):
+    """
+    Calculate the element and time period coordinates of the result table from a given element ID
+    and timestamp, for handlers that look up the attribute class index separately.
+    :param elem_indices: Element index list
+    :param periods: Number of time periods across the day
+    :param elem_id: Element ID string
+    :param time: Timestamp of event
+    :return: (x, z) tuple to index results table
+    """
+    x = elem_indices[elem_id]
+    z = floor(time / (86400.0 / periods)) % periods
+    return x, z
+
+
 def table_position_4d(
     origin_elem_indices, destination_elem_indices, class_indices, periods, o_id, d_id, attribute_class, time
 ):
@@ -2548,9 +3402,8 @@ def table_position_4d(
 
 def export_geojson(gdf, path):
     """
-    Given a geodataframe, export geojson representation to specified path.
+    Given a geodataframe, export geojson representation to specified path, in row chunks.
     :param gdf: Input geodataframe
     :param path: Output path
     """
-    with open(path, "w") as file:
-        file.write(gdf.to_json())
+    write_spatial(gdf, path)
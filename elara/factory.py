@@ -1,16 +1,28 @@
 from typing import Dict, List, Union, Optional
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
 import os
 import json
 import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.connection
+import queue
+import threading
+import traceback
+from functools import partial
+from itertools import chain
 from matplotlib.figure import Figure
 import warnings
 with warnings.catch_warnings():
     warnings.simplefilter('ignore')
     from fuzzywuzzy import process
 
+from elara import cache
 from elara.helpers import camel_to_snake
 
 
@@ -42,6 +54,16 @@ class Tool:
 
     resources = {}
 
+    # paths of output files written by (or for) the tool, see .record_output()
+    outputs = None
+    # result cache directory path of the tool, if result caching is enabled, see WorkStation.engage()
+    result_cache = None
+
+    # names of result attributes accumulated by the tool, that can be merged (.merge()) from replicas
+    # of the tool processing other partitions of the inputs in worker processes,
+    # None = the tool does not support parallel processing
+    partition_results = None
+
     def __init__(
             self, config,
             mode: Union[None, str] = 'all',
@@ -139,6 +161,23 @@ class Tool:
         self.logger.debug(f'Resources handed to {self.__str__()} = {resource}')
         self.resources = resource
 
+    def merge(self, results: dict) -> None:
+        """
+        Merge the results accumulated by a replica of this tool, from a later partition of the
+        inputs, into this tool. Results are summed (or concatenated) by default.
+        :param results: dict of {attribute name: value}, for each of .partition_results
+        """
+        for attribute, value in results.items():
+            setattr(self, attribute, getattr(self, attribute) + value)
+
+    def add_rows(self, attribute: str, lines: list) -> None:
+        """
+        Add lines written by a replica of this tool to the named chunk writer.
+        :param attribute: chunk writer attribute name
+        :param lines: list of lines (dicts or tuples, as taken by the chunk writer)
+        """
+        getattr(self, attribute).add(lines)
+
     def _validate_mode(self, mode: str) -> str:
         """
         Validate option based on .valid_modes and .invalid_mode if not None.
@@ -165,32 +204,120 @@ class Tool:
             raise ValueError(f'Unsupported compression method: {compression} at tool: {self}')
         return compression
 
-    def start_csv_chunk_writer(self, csv_name: str, write_path=None, compression=None):
+    @property
+    def output_format(self) -> str:
+        """
+        Configured file format of tabular outputs, defaults to csv.
+        """
+        return getattr(self.config, "output_format", None) or "csv"
+
+    @property
+    def geometry_format(self) -> str:
+        """
+        Configured output of spatial results, defaults to joined (geometries joined to results).
+        """
+        return getattr(self.config, "geometry_format", None) or "joined"
+
+    @property
+    def spatial_format(self) -> str:
+        """
+        Configured file format of spatial results, defaults to geojson.
+        """
+        return getattr(self.config, "spatial_format", None) or "geojson"
+
+    @property
+    def separate_geometry(self) -> bool:
+        """
+        True if link and stop geometries are written once, separately from (id keyed) results.
+        """
+        return self.geometry_format != "joined"
+
+    def record_output(self, path: str) -> str:
+        """
+        Record an output file written by (or for) the tool, so that it can be cached.
+        :param path: output file path
+        :return: path
+        """
+        if self.outputs is None:
+            self.outputs = []
+        self.outputs.append(path)
+        return path
+
+    def start_csv_chunk_writer(
+            self,
+            csv_name: str,
+            write_path=None,
+            compression=None,
+            formatters=None,
+            file_format=None,
+            numeric=None
+    ):
         """
         Return a simple csv ChunkWriter, default to config path if write_path (used for testing)
         not given.
+        :param formatters: Optional dict of column formatters, see CSVChunkWriter
+        :param file_format: Optional file format, defaults to the configured output format
+        :param numeric: Optional list of numeric columns, stored as floats in columnar files
         """
+        file_format = file_format or self.output_format
         if write_path:
             path = os.path.join(write_path, csv_name)
         else:
             path = os.path.join(self.config.output_path, csv_name)
 
-        if compression is not None:
-            path = path_compressed(path, compression)
+        return CSVChunkWriter(
+            self.record_output(output_name(path, file_format, compression)),
+            columnar_compression(compression, file_format),
+            formatters=formatters,
+            file_format=file_format,
+            numeric=numeric,
+        )
+
+    def start_columnar_chunk_writer(
+            self,
+            file_name: str,
+            schema: list,
+            write_path=None,
+            compression=None,
+            formatters=None,
+            file_format=None
+    ):
+        """
+        Return a columnar ChunkWriter, default to config path if write_path (used for testing)
+        not given.
+        :param file_name: output file name, the extension is replaced for columnar output
+        :param schema: list of (column name, dtype) tuples, see ColumnarChunkWriter
+        :param compression: Optional compression method
+        :param formatters: Optional dict of column formatters
+        :param file_format: Optional file format, defaults to the configured output format
+        """
+        file_format = file_format or self.output_format
+        if write_path:
+            path = os.path.join(write_path, file_name)
+        else:
+            path = os.path.join(self.config.output_path, file_name)
+
+        if not (file_format == "parquet" and compression in PARQUET_COMPRESSIONS):
+            compression = columnar_compression(compression, file_format)
 
-        return CSVChunkWriter(path, compression)
+        return ColumnarChunkWriter(
+            self.record_output(output_name(path, file_format, compression)),
+            schema, compression=compression, formatters=formatters, file_format=file_format
+        )
 
-    def start_arrow_chunk_writer(self, file_name: str, write_path=None):
+    def start_arrow_chunk_writer(self, file_name: str, write_path=None, schema=None):
         """
         Return a simple arrow ChunkWriter, default to config path if write_path (used for testing)
         not given.
+        :param schema: optional pa.Schema of written columns, inferred from the first chunk if not
+        given
         """
         if write_path:
             path = os.path.join(write_path, file_name)
         else:
             path = os.path.join(self.config.output_path, file_name)
 
-        return ArrowChunkWriter(path)
+        return ArrowChunkWriter(self.record_output(path), schema=schema)
 
     def write_csv(
             self,
@@ -200,10 +327,10 @@ class Tool:
             write_path=None
     ):
         """
-        Simple write to csv, default to config path if write_path (used for testing) not given.
+        Simple write to csv, or to the configured output format (the csv extension is replaced),
+        default to config path if write_path (used for testing) not given.
         """
-        if compression:
-            csv_name = path_compressed(csv_name, compression)
+        csv_name = output_name(csv_name, self.output_format, compression)
 
         if write_path:
             csv_path = os.path.join(write_path, csv_name)
@@ -213,14 +340,34 @@ class Tool:
             self.logger.debug(f'writing to {csv_path}')
 
         # File exports
-        if isinstance(write_object, gpd.GeoDataFrame):
-            write_object.drop("geometry", axis=1).to_csv(csv_path, header=True)
+        write_table(
+            write_object, csv_path, self.output_format, columnar_compression(compression, self.output_format)
+        )
+        self.record_output(csv_path)
 
-        elif isinstance(write_object, (pd.DataFrame, pd.Series)):
-            write_object.to_csv(csv_path, header=True)
+    def read_csv(self, csv_name: str, **kwargs) -> pd.DataFrame:
+        """
+        Read a tabular output of another tool from the config path, in the configured output
+        format, see read_table().
+        :param csv_name: csv file name of the output
+        :return: pd.DataFrame
+        """
+        path = os.path.join(self.config.output_path, output_name(csv_name, self.output_format))
+        self.logger.debug(f'reading from {path}')
+        return read_table(path, self.output_format, **kwargs)
 
-        else:
-            raise TypeError(f"don't know how to write object of type {type(write_object)} to csv")
+    def read_geometry(self, name: str) -> gpd.GeoDataFrame:
+        """
+        Read element geometries written separately from results (see WorkStation.write_geometry)
+        from the config path.
+        :param name: geometry output name, eg 'network_links'
+        :return: gpd.GeoDataFrame
+        """
+        path = os.path.join(self.config.output_path, geometry_name(name, self.geometry_format))
+        self.logger.debug(f'reading from {path}')
+        if self.geometry_format == "geoparquet":
+            return gpd.read_parquet(path)
+        return gpd.read_file(path)
 
     def write_geojson(
             self,
@@ -229,8 +376,11 @@ class Tool:
             write_path=None
     ):
         """
-        Simple write to geojson, default to config path if write_path (used for testing) not given.
+        Write to geojson (or FlatGeobuf, see Config.spatial_format) in row chunks, so that the
+        whole feature collection is never held in memory, default to config path if write_path
+        (used for testing) not given.
         """
+        name = spatial_name(name, self.spatial_format)
 
         if write_path:
             path = os.path.join(write_path, name)
@@ -241,8 +391,8 @@ class Tool:
 
         # File exports
         if isinstance(write_object, gpd.GeoDataFrame):
-            with open(path, "w") as file:
-                file.write(write_object.to_json())
+            write_spatial(write_object, path, self.spatial_format)
+            self.record_output(path)
 
         else:
             raise TypeError(
@@ -270,6 +420,7 @@ class Tool:
         if isinstance(write_object, dict):
             with open(path, 'w') as outfile:
                 json.dump(write_object, outfile)
+            self.record_output(path)
 
         else:
             raise TypeError(
@@ -296,6 +447,7 @@ class Tool:
         # File exports
         if isinstance(write_object, Figure):
             write_object.savefig(path)
+            self.record_output(path)
 
         else:
             raise TypeError(
@@ -310,9 +462,20 @@ class WorkStation:
     Values:
         .depth: int, depth of workstation in longest path search, used for ordering graph operation.
         .tools: dict, of available tools.
+        .concurrent_build: bool, for if the workstation can be built in a forked process,
+        concurrently with other workstations (see build_dag()). Only for workstations whose
+        managers don't use their built resources, ie that pass on results as output files.
+        .parallel_build: int, for if the workstation processes its inputs with worker processes
+        (see Config.workers), when built concurrently spare workers are shared between these
+        workstations, higher values first (see share_workers()).
+        .cache_results: bool, for if tool outputs are cached and restored on later runs, when
+        result caching is enabled (see Config.cache_results).
     """
     depth = 0
     tools = {}
+    concurrent_build = False
+    parallel_build = 0
+    cache_results = False
 
     def __init__(self, config) -> None:
         """
@@ -326,6 +489,7 @@ class WorkStation:
         self.managers = None
         self.suppliers = None
         self.supplier_resources = {}
+        self.cached_resources = {}
         self.logger = logging.getLogger(__name__)
 
     # def __str__(self):
@@ -339,6 +503,34 @@ class WorkStation:
         class_name = self.__class__.__name__.split('.')[-1]
         return camel_to_snake(class_name)
 
+    @property
+    def output_format(self) -> str:
+        """
+        Configured file format of tabular outputs, defaults to csv.
+        """
+        return getattr(self.config, "output_format", None) or "csv"
+
+    @property
+    def geometry_format(self) -> str:
+        """
+        Configured output of spatial results, defaults to joined (geometries joined to results).
+        """
+        return getattr(self.config, "geometry_format", None) or "joined"
+
+    @property
+    def spatial_format(self) -> str:
+        """
+        Configured file format of spatial results, defaults to geojson.
+        """
+        return getattr(self.config, "spatial_format", None) or "geojson"
+
+    @property
+    def separate_geometry(self) -> bool:
+        """
+        True if link and stop geometries are written once, separately from (id keyed) results.
+        """
+        return self.geometry_format != "joined"
+
     def connect(
             self,
             managers: Union[None, list],
@@ -429,14 +621,17 @@ class WorkStation:
                                         groupby_person_attribute=groupby_person_attribute,
                                         **optional_args
                                         )
-
                                     tool_requirements = self.resources[key].get_requirements()
+                                    if self.find_cached_results(key):
+                                        tool_requirements = self.cached_requirements(tool_requirements)
                                     all_requirements.append(tool_requirements)
                         else:
                             # init
                             key = str(tool_name)
                             self.resources[key] = tool(self.config)
                             tool_requirements = self.resources[key].get_requirements()
+                            if self.find_cached_results(key):
+                                tool_requirements = self.cached_requirements(tool_requirements)
                             all_requirements.append(tool_requirements)
 
             self.requirements = complex_combine_reqs(all_requirements)
@@ -454,6 +649,64 @@ class WorkStation:
                                     if req == name and not tool.options_enabled:
                                         self.requirements[name] = []
 
+    def find_cached_results(self, key: str) -> bool:
+        """
+        If result caching is enabled, set the result cache path of the tool at key in .resources.
+        If its results are cached, the tool is moved to .cached_resources, so that it isn't built
+        (see cached_requirements()).
+        :param key: tool key in .resources
+        :return: bool, True if the tool results are cached
+        """
+        if not (self.cache_results and getattr(self.config, "cache_results", False)):
+            return False
+        tool = self.resources[key]
+        tool.result_cache = cache.result_cache_path(tool)
+        if not os.path.isdir(tool.result_cache):
+            return False
+        self.logger.debug(f'Found cached results for {tool} at {tool.result_cache}')
+        self.cached_resources[key] = self.resources.pop(key)
+        return True
+
+    def cached_requirements(self, requirements: Union[None, Dict[str, list]]) -> Union[None, Dict[str, list]]:
+        """
+        Filter the requirements of a tool with cached results to those met by suppliers that also
+        cache results, so that these (intermediate) results are restored too, but inputs that are
+        only needed to build the tool are not.
+        :param requirements: tool requirements
+        :return: filtered requirements
+        """
+        if not requirements:
+            return requirements
+        cached_tools = set()
+        for supplier in self.suppliers or []:
+            if supplier.cache_results and supplier.tools:
+                cached_tools.update(supplier.tools)
+        return {
+            requirement: options for requirement, options in requirements.items()
+            if requirement.split("--")[0] in cached_tools
+        }
+
+    def restore_cached_results(self, write_path=None) -> None:
+        """
+        Copy the cached outputs of tools in .cached_resources to the output path.
+        :param write_path: Optional output path overwrite
+        :return: None
+        """
+        for tool in self.cached_resources.values():
+            output_path = write_path or self.config.output_path
+            self.logger.info(f'Restoring {tool} results from cache')
+            tool.outputs = cache.read_result_files(tool.result_cache, output_path)
+
+    def store_results(self) -> None:
+        """
+        Copy the outputs of built tools to the result cache, if result caching is enabled.
+        :return: None
+        """
+        for tool in self.resources.values():
+            if getattr(tool, "result_cache", None) is not None and not os.path.exists(tool.result_cache):
+                self.logger.debug(f'Caching {tool} results to {tool.result_cache}')
+                cache.write_result_files(tool.result_cache, tool.outputs or [])
+
     def validate_suppliers(self) -> None:
         """
         Collects available tools from supplier workstations. Raises ValueError if suppliers have
@@ -566,11 +819,11 @@ class WorkStation:
             compression = None,
     ):
         """
-        Simple write to csv, default to config path if write_path (used for testing) not given.
+        Simple write to csv, or to the configured output format (the csv extension is replaced),
+        default to config path if write_path (used for testing) not given.
+        :return: path of the written file
         """
-
-        if compression:
-            csv_name = path_compressed(csv_name, compression)
+        csv_name = output_name(csv_name, self.output_format, compression)
 
         if write_path:
             csv_path = os.path.join(write_path, csv_name)
@@ -580,14 +833,45 @@ class WorkStation:
             self.logger.debug(f'writing to {csv_path}')
 
         # File exports
-        if isinstance(write_object, gpd.GeoDataFrame):
-            write_object.drop("geometry", axis=1).to_csv(csv_path, header=True)
+        write_table(
+            write_object, csv_path, self.output_format, columnar_compression(compression, self.output_format)
+        )
+        return csv_path
 
-        elif isinstance(write_object, (pd.DataFrame, pd.Series)):
-            write_object.to_csv(csv_path, header=True)
+    def write_geometry(
+            self,
+            write_object: gpd.GeoDataFrame,
+            name: str,
+            id_name: str,
+            write_path=None
+    ):
+        """
+        Write element geometries once, separately from results, as GeoParquet or FlatGeobuf (see
+        Config.geometry_format), with the element index as an id column. Default to config path if
+        write_path (used for testing) not given.
+        :param write_object: elements geodataframe, indexed by element id
+        :param name: output name, eg 'network_links'
+        :param id_name: name of the id column, eg 'link_id'
+        :return: path of the written file
+        """
+        name = geometry_name(name, self.geometry_format)
+
+        if write_path:
+            path = os.path.join(write_path, name)
+            self.logger.warning(f'path overwritten to {write_path}')
+        else:
+            path = os.path.join(self.config.output_path, name)
+            self.logger.debug(f'writing to {path}')
 
+        write_object = write_object.rename_axis(id_name).reset_index()
+        if self.geometry_format == "geoparquet":
+            write_object.to_parquet(path)
+        elif self.geometry_format == "flatgeobuf":
+            # without spatial index, to keep the element order
+            write_object.to_file(path, driver="FlatGeobuf", SPATIAL_INDEX="NO")
         else:
-            raise TypeError(f"don't know how to write object of type {type(write_object)} to csv")
+            raise ValueError(f"Unsupported geometry output format: {self.geometry_format}")
+        return path
 
     def write_geojson(
             self,
@@ -596,8 +880,12 @@ class WorkStation:
             write_path=None
     ):
         """
-        Simple write to geojson, default to config path if write_path (used for testing) not given.
+        Write to geojson (or FlatGeobuf, see Config.spatial_format) in row chunks, so that the
+        whole feature collection is never held in memory, default to config path if write_path
+        (used for testing) not given.
+        :return: path of the written file
         """
+        name = spatial_name(name, self.spatial_format)
 
         if write_path:
             path = os.path.join(write_path, name)
@@ -607,8 +895,8 @@ class WorkStation:
             self.logger.debug(f'writing to {path}')
         # File exports
         if isinstance(write_object, gpd.GeoDataFrame):
-            with open(path, "w") as file:
-                file.write(write_object.to_json())
+            write_spatial(write_object, path, self.spatial_format)
+            return path
 
         else:
             raise TypeError(
@@ -643,15 +931,224 @@ class WorkStation:
             )
 
 
-class CSVChunkWriter:
+# maximum number of chunks queued for a writer thread, adding chunks blocks while the queue is full
+WRITE_QUEUE_SIZE = 4
+
+
+class WriterThread:
+    """
+    Background thread writing the chunks of a chunk writer, in order, so that chunk formatting,
+    compression and disk I/O overlap with event and plan parsing. Chunks are handed over through a
+    bounded queue (backpressure).
+    """
+
+    def __init__(self, name: str) -> None:
+        self.queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            if self.error is None:  # skip remaining writes after a failure
+                try:
+                    task()
+                except Exception as error:
+                    self.error = error
+
+    def submit(self, task) -> None:
+        """
+        Queue a write, blocking while the queue is full.
+        :param task: callable
+        :return: None
+        """
+        self.check()
+        self.queue.put(task)
+
+    def join(self) -> None:
+        """
+        Wait for all queued writes, then stop the thread.
+        :return: None
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.check()
+
+    def check(self) -> None:
+        """
+        Raise the exception of a failed write, if any, in the calling thread.
+        """
+        if self.error is not None:
+            raise self.error
+
+
+class BackgroundWriting:
+    """
+    Chunk writer mixin, handing writes to a WriterThread, started on first write.
+    """
+
+    path = None
+    writer_thread = None
+    # size (bytes) of the written file when the writer was pickled, see .__getstate__()
+    position = None
+
+    def submit(self, task, *args) -> None:
+        if self.writer_thread is None:
+            self.writer_thread = WriterThread(name=f"writer-{os.path.basename(str(self.path))}")
+        self.writer_thread.submit(partial(task, *args))
+
+    def drain(self) -> None:
+        """
+        Wait for all chunks handed to the writer thread to be written.
+        """
+        if self.writer_thread is not None:
+            self.writer_thread.join()
+            self.writer_thread = None
+
+    def __getstate__(self) -> dict:
+        """
+        Pickle (checkpoint) the writer once all handed over chunks are written, recording the size
+        of the written file, see .rewind().
+        """
+        self.drain()
+        state = self.__dict__.copy()
+        state.pop("writer_thread", None)
+        state["position"] = os.path.getsize(self.path) if os.path.exists(self.path) else None
+        return state
+
+    def rewind(self) -> None:
+        """
+        Truncate the written file of an unpickled (checkpointed) writer back to its size when
+        pickled, dropping anything written since.
+        """
+        if self.position is not None and os.path.exists(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(self.position)
+
+
+# output file formats of tabular results and logs, see Config.output_format
+OUTPUT_FORMATS = ["csv", "parquet", "feather"]
+# outputs of spatial results, geometries joined to results (geojson), or link and stop geometries
+# written once, separately from id keyed results, see Config.geometry_format
+GEOMETRY_FORMATS = ["joined", "geoparquet", "flatgeobuf"]
+GEOMETRY_EXTENSIONS = {"geoparquet": "parquet", "flatgeobuf": "fgb"}
+# file formats of spatial (geometry joined) results
+SPATIAL_FORMATS = ["geojson", "flatgeobuf"]
+SPATIAL_EXTENSIONS = {"geojson": "geojson", "flatgeobuf": "fgb"}
+# rows of spatial results serialised at a time
+SPATIAL_CHUNKSIZE = 10000
+PARQUET_COMPRESSIONS = ["snappy", "gzip", "brotli", "lz4", "zstd"]
+
+
+class TableChunkWriting(BackgroundWriting):
+    """
+    Chunk writer mixin, writing chunks (dataframes) to csv, as parquet row groups or as feather
+    (arrow ipc file) record batches. The arrow schema is taken from the first chunk, with object
+    columns as strings. Columns without values in the first chunk are typed by the first chunk
+    with values, see .widen().
+    """
+
+    compression = None
+    file_format = "csv"
+    writer = None
+    schema = None
+    # names of columns without values in all chunks written so far
+    null_columns = ()
+    # names of columns of numbers (eg raw attribute strings), stored as floats in columnar files
+    numeric = ()
+
+    def write_frame(self, chunk_df: pd.DataFrame, idx: int) -> None:
+        """
+        Write a chunk to disk.
+        :param chunk_df: pd.DataFrame
+        :param idx: index of first line
+        :return: None
+        """
+        if self.file_format == "csv":
+            if not idx:
+                chunk_df.to_csv(self.path, compression=self.compression)
+            else:
+                chunk_df.to_csv(self.path, header=None, mode="a", compression=self.compression)
+            return
+
+        if not all(isinstance(column, str) for column in chunk_df.columns):
+            chunk_df = chunk_df.set_axis([str(column) for column in chunk_df.columns], axis=1)
+        numeric = [column for column in self.numeric if column in chunk_df.columns]
+        if numeric:
+            # as parsed from csv files
+            chunk_df = chunk_df.astype({column: float for column in numeric})
+        if self.writer is None:
+            self.schema = chunk_schema(chunk_df)
+            self.null_columns = set(null_columns(chunk_df))
+            self.open_writer()
+        elif self.null_columns:
+            self.widen(chunk_df)
+        self.writer.write_table(pa.Table.from_pandas(chunk_df, schema=self.schema, preserve_index=False))
+
+    def open_writer(self) -> None:
+        if self.file_format == "parquet":
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression or "snappy")
+        else:
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def widen(self, chunk_df: pd.DataFrame) -> None:
+        """
+        Type columns without values in all chunks written so far by the values of a later chunk.
+        If these are not strings, the written file is rewritten with the widened schema (the
+        written values of these columns are all null, so they can be cast to any type).
+        :param chunk_df: pd.DataFrame
+        :return: None
+        """
+        chunk_fields = pa.Schema.from_pandas(chunk_df, preserve_index=False)
+        typed = self.null_columns.intersection(chunk_fields.names) - set(null_columns(chunk_df))
+        if not typed:
+            return
+        self.null_columns -= typed
+        schema = self.schema
+        for name in typed:
+            schema = schema.set(schema.get_field_index(name), chunk_fields.field(name).remove_metadata())
+        if schema.equals(self.schema):
+            return
+
+        self.logger.debug(f'Widening schema of {self.path} for columns {sorted(typed)}')
+        self.writer.close()
+        if self.file_format == "parquet":
+            written = pq.read_table(self.path)
+        else:
+            with pa.OSFile(self.path) as source:
+                written = pa.ipc.open_file(source).read_all()
+        self.schema = schema
+        self.open_writer()
+        self.writer.write_table(written.cast(schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+class CSVChunkWriter(TableChunkWriting):
     """
     Extend a list of lines (dicts) that are saved to drive once they reach a certain length.
+    Optional formatters (dict of column name to function of a pd.Series) are applied to whole
+    chunks as they are written, eg to format times only at write time.
+    Chunks are written by a background thread, .finish() waits for all writes. Despite the name,
+    chunks can also be written to parquet or feather (file_format), optional numeric columns (eg
+    of raw attribute strings, written to csv as given) are then stored as floats.
     """
 
-    def __init__(self, path, compression = None, chunksize=1000) -> None:
+    def __init__(
+            self, path, compression = None, chunksize=1000, formatters=None, file_format="csv", numeric=None
+    ) -> None:
+        validate_chunk_format(file_format, compression)
         self.path = path
         self.compression = compression
         self.chunksize = chunksize
+        self.formatters = formatters or {}
+        self.file_format = file_format
+        self.numeric = numeric or ()
 
         self.chunk = []
         self.idx = 0
@@ -672,34 +1169,187 @@ class CSVChunkWriter:
 
     def write(self) -> None:
         """
-        Convert chunk to dataframe and write to disk.
+        Hand chunk to the writer thread.
         :return: None
         """
-        chunk_df = pd.DataFrame(self.chunk, index=range(self.idx, self.idx + len(self.chunk)))
-        if not self.idx:
-            chunk_df.to_csv(self.path, compression=self.compression)
-            self.idx += len(self.chunk)
-        else:
-            chunk_df.to_csv(self.path, header=None, mode="a", compression=self.compression)
-            self.idx += len(self.chunk)
-        del chunk_df
+        self.submit(self.write_chunk, self.chunk, self.idx)
+        self.idx += len(self.chunk)
         self.chunk = []
 
+    def write_chunk(self, chunk: list, idx: int) -> None:
+        """
+        Convert chunk to dataframe and write to disk.
+        :param chunk: list of dicts
+        :param idx: index of first line
+        :return: None
+        """
+        if not chunk and self.writer is not None:
+            return
+        chunk_df = pd.DataFrame(chunk, index=range(idx, idx + len(chunk)))
+        for column, formatter in self.formatters.items():
+            if column in chunk_df.columns:
+                chunk_df[column] = formatter(chunk_df[column])
+        self.write_frame(chunk_df, idx)
+
     def finish(self) -> None:
         self.write()
+        self.drain()
+        self.close()
         self.logger.info(f'Chunkwriter finished for {self.path}')
 
     def __len__(self):
         return self.idx + len(self.chunk)
 
-class ArrowChunkWriter:
+# approximate size (bytes) of the column buffers of a ColumnarChunkWriter
+CHUNK_BYTES = 16 * 2 ** 20
+# assumed size (bytes) of values in object (eg string) columns, used to size buffers
+OBJECT_BYTES = 64
+
+
+class ColumnarChunkWriter(TableChunkWriting):
+    """
+    Chunk writer with typed column buffers, preallocated from a declared schema (list of
+    (column name, dtype) tuples). Lines are plain tuples, in schema order. Buffers are sized
+    by bytes (chunk_bytes) and written to csv (optionally compressed), parquet or feather when
+    full. Optional formatters (dict of column name to function of a pd.Series) are applied to whole
+    chunks as they are written.
+    Full buffers are written by a background thread, .finish() waits for all writes.
+    """
+
+    def __init__(
+            self,
+            path,
+            schema: list,
+            compression=None,
+            chunk_bytes=CHUNK_BYTES,
+            formatters=None,
+            file_format="csv"
+    ) -> None:
+        validate_chunk_format(file_format, compression)
+
+        self.path = path
+        self.compression = compression
+        self.formatters = formatters or {}
+        self.file_format = file_format
+
+        self.columns = [column for column, _ in schema]
+        self.dtypes = [np.dtype(dtype) for _, dtype in schema]
+        row_bytes = sum(OBJECT_BYTES if dtype.kind == "O" else dtype.itemsize for dtype in self.dtypes)
+        self.chunksize = max(1, chunk_bytes // row_bytes)
+        self.buffers = self.new_buffers()
+
+        self.size = 0
+        self.idx = 0
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.debug(f'Chunkwriter initiated for {path}, with size {self.chunksize} lines')
+
+    def new_buffers(self) -> list:
+        return [np.empty(self.chunksize, dtype=dtype) for dtype in self.dtypes]
+
+    def append(self, line: tuple) -> None:
+        """
+        Add a line (tuple) to the column buffers, if the buffers are full, then write to disk.
+        :param line: tuple of values, in schema order
+        :return: None
+        """
+        size = self.size
+        for buffer, value in zip(self.buffers, line):
+            buffer[size] = value
+        self.size = size + 1
+        if self.size == self.chunksize:
+            self.write()
+
+    def add(self, lines: list) -> None:
+        """
+        Add a list of lines (tuples).
+        :param lines: list of tuples
+        :return: None
+        """
+        for line in lines:
+            self.append(line)
+
+    @property
+    def chunk(self) -> list:
+        """
+        Lines (dicts) not yet written to disk.
+        :return: list of dicts
+        """
+        columns = [buffer[:self.size].tolist() for buffer in self.buffers]
+        return [dict(zip(self.columns, line)) for line in zip(*columns)]
+
+    def write(self) -> None:
+        """
+        Hand buffers to the writer thread, continuing with new buffers.
+        :return: None
+        """
+        self.submit(self.write_buffers, self.buffers, self.size, self.idx)
+        self.buffers = self.new_buffers()
+        self.idx += self.size
+        self.size = 0
+
+    def write_buffers(self, buffers: list, size: int, idx: int) -> None:
+        """
+        Convert buffers to dataframe and write to disk.
+        :param buffers: list of column buffers
+        :param size: number of lines in buffers
+        :param idx: index of first line
+        :return: None
+        """
+        chunk_df = pd.DataFrame(
+            {column: buffer[:size] for column, buffer in zip(self.columns, buffers)},
+            index=range(idx, idx + size),
+            columns=self.columns,
+        )
+        for column, formatter in self.formatters.items():
+            chunk_df[column] = formatter(chunk_df[column])
+
+        self.write_frame(chunk_df, idx)
+
+    def finish(self) -> None:
+        if self.size or not self.idx:
+            self.write()
+        self.drain()
+        self.close()
+        self.logger.info(f'Chunkwriter finished for {self.path}')
+
+    def __len__(self):
+        return self.idx + self.size
+
+
+def arrow_array(values: list, data_type: pa.DataType) -> pa.Array:
+    """
+    Build an arrow array of the given type from a list of python values. List and fixed size
+    list values are flattened, so that nested coordinates and timestamps are converted in bulk.
+    :param values: list of values
+    :param data_type: pa.DataType
+    :return: pa.Array
+    """
+    if pa.types.is_list(data_type):
+        offsets = np.zeros(len(values) + 1, dtype=np.int32)
+        np.cumsum(np.fromiter(map(len, values), dtype=np.int32, count=len(values)), out=offsets[1:])
+        flat = arrow_array(list(chain.from_iterable(values)), data_type.value_type)
+        return pa.ListArray.from_arrays(pa.array(offsets), flat)
+    if pa.types.is_fixed_size_list(data_type):
+        dtype = data_type.value_type.to_pandas_dtype()
+        flat = np.array(values, dtype=dtype).reshape(-1)
+        return pa.FixedSizeListArray.from_arrays(pa.array(flat, type=data_type.value_type), data_type.list_size)
+    return pa.array(values, type=data_type)
+
+
+class ArrowChunkWriter(BackgroundWriting):
     """
     Extend a list of lines (dicts) that are saved to drive once they reach a certain length.
+    Chunks are written as record batches to an arrow ipc stream. Columns are built directly
+    from the lines, with the types of the given arrow schema, eg to dictionary encode ids and to
+    use narrow types, or inferred from the first chunk.
+    Chunks are written by a background thread, .finish() waits for all writes.
     """
 
-    def __init__(self, path, chunksize=1000) -> None:
+    def __init__(self, path, chunksize=1000, schema: Optional[pa.Schema] = None) -> None:
         self.path = path
         self.chunksize = chunksize
+        self.schema = schema
         self.writer = None
 
         self.chunk = []
@@ -722,21 +1372,34 @@ class ArrowChunkWriter:
 
     def write(self) -> None:
         """
-        Convert chunk to dataframe and write to arrow.
+        Hand chunk to the writer thread.
         """
-        table = pa.Table.from_pandas(pd.DataFrame(self.chunk))  # TODO loose the pandas intermediate
-        if not self.idx:
-            self.writer = pa.ipc.RecordBatchStreamWriter(self.path, table.schema)
-            self.writer.write(table)
-            self.idx += len(self.chunk)
-        else:
-            self.writer.write(table)
-            self.idx += len(self.chunk)
-        del table
+        self.submit(self.write_chunk, self.chunk)
+        self.idx += len(self.chunk)
         self.chunk = []
 
+    def write_chunk(self, chunk: list) -> None:
+        """
+        Convert chunk to a record batch and write to arrow.
+        :param chunk: list of dicts
+        """
+        if not chunk and self.writer is not None:
+            return
+        if self.schema is None:
+            batch = pa.RecordBatch.from_pylist(chunk)
+            self.schema = batch.schema
+        else:
+            batch = pa.RecordBatch.from_arrays(
+                [arrow_array([line[field.name] for line in chunk], field.type) for field in self.schema],
+                schema=self.schema
+            )
+        if self.writer is None:
+            self.writer = pa.ipc.RecordBatchStreamWriter(self.path, self.schema)
+        self.writer.write_batch(batch)
+
     def finish(self) -> None:
         self.write()
+        self.drain()
         self.logger.info(f'Chunkwriter finished for {self.path}')
         self.writer.close()
 
@@ -768,7 +1431,10 @@ def build(start_node: WorkStation, write_path=None) -> list:
     """
     assemble_dag(start_node=start_node)
     queue = initiate_dag(start_node=start_node)
-    return build_dag(queue=queue, write_path=write_path)
+    try:
+        return build_dag(queue=queue, write_path=write_path)
+    finally:
+        RESULTS.clear()
 
 
 def dry_run_build(start_node: WorkStation, write_path=None) -> None:
@@ -818,21 +1484,243 @@ def initiate_dag(start_node: WorkStation) -> list:
     logger.info(f'All Workstations Initiated and Validated')
     return queue
 
+def build_station(station: WorkStation, write_path=None) -> None:
+    """
+    Build a workstation, restoring cached tool results first and caching the results of built
+    tools. Workstations with all their tool results cached are not built.
+    :param station: workstation
+    :param write_path: Optional output path overwrite
+    :return: None
+    """
+    station.restore_cached_results(write_path=write_path)
+    if station.cached_resources and not station.resources:
+        station.logger.info(f'All {station} results restored from cache, skipping build')
+        return None
+    station.build(write_path=write_path)
+    station.store_results()
+
+
 def build_dag(queue, write_path=None) -> list:
     # stage 3:
     logger = logging.getLogger(__name__)
     logger.info(f'Initiating Build')
     return_queue = queue[::-1]
+
+    workers = getattr(return_queue[0].config, "workers", None) or 1
+    if workers > 1 and any(station.concurrent_build for station in return_queue):
+        context = fork_context()
+        if context is not None:
+            visited = build_dag_concurrently(return_queue, workers, context, write_path=write_path)
+            # return full sequence for testing
+            return queue + visited
+
     visited = []
     while return_queue:
         current = return_queue.pop(0)
-        current.build(write_path=write_path)
+        build_station(current, write_path=write_path)
         visited.append(current)
 
     # return full sequence for testing
     return queue + visited
 
 
+def fork_context():
+    """
+    Return the fork multiprocessing context, so that forked workstation builds share the state of
+    the main process, such as built supplier resources, without pickling.
+    Returns None if fork is not supported on this platform.
+    :return: multiprocessing context or None
+    """
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        logging.getLogger(__name__).warning(
+            "Concurrent builds require the fork start method, which is not available"
+        )
+        return None
+
+
+class LogPipe:
+    """
+    Queue (for a logging QueueHandler) sending log records of a forked build to the main process
+    through a pipe connection.
+    """
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        self.connection.send(("log", record))
+
+
+def build_forked(station: WorkStation, connection, workers: int, write_path=None) -> None:
+    """
+    Build a workstation in a forked process. Log records are sent to the main process as they are
+    logged, followed by the traceback of any build error. The workstation uses the given number of
+    workers (for its own worker processes), its share of the workers of the main process.
+    :param station: workstation to build
+    :param connection: pipe connection to the main process
+    :param workers: number of workers available to the build
+    :param write_path: Optional output path overwrite
+    :return: None
+    """
+    logging.getLogger().handlers = [logging.handlers.QueueHandler(LogPipe(connection))]
+    station.config.workers = workers
+    logging.getLogger(__name__).info(f'Building {station} concurrently with {workers} workers')
+    error = None
+    try:
+        build_station(station, write_path=write_path)
+    except BaseException:
+        error = traceback.format_exc()
+    connection.send(("done", error))
+    connection.close()
+
+
+def share_workers(stations: list, workers: int) -> dict:
+    """
+    Share workers between workstations built concurrently. Each workstation gets one worker,
+    spare workers are shared, one at a time, between workstations that process their inputs with
+    worker processes (see WorkStation.parallel_build), higher values first.
+    :param stations: list of workstations, in build order
+    :param workers: number of workers to share
+    :return: dict of {workstation: number of workers}
+    """
+    shares = {station: 1 for station in stations}
+    parallel = sorted(
+        [station for station in stations if station.parallel_build],
+        key=lambda station: -station.parallel_build
+    )
+    spare = workers - len(stations)
+    while parallel and spare > 0:
+        for station in parallel[:spare]:
+            shares[station] += 1
+        spare -= len(parallel)
+    return shares
+
+
+def build_dag_concurrently(order: list, workers: int, context, write_path=None) -> list:
+    """
+    Build workstations, starting concurrent workstations (see WorkStation.concurrent_build) in
+    forked processes, at most workers at a time, as soon as their suppliers are built. So that
+    run time is bounded by the longest path through the graph, rather than the sum of all builds.
+    Other workstations are built in the main process, in build order. The workers not used by
+    running builds are shared between the concurrent builds started together, for their own
+    worker processes, see share_workers().
+    Log records of forked builds are re-emitted so that logs are ordered as for a sequential build:
+    records of the first unfinished workstation (in build order) are emitted as they arrive,
+    records of later workstations are held back until all earlier workstations are finished.
+    :param order: list of workstations, in (sequential) build order
+    :param workers: maximum number of concurrent builds
+    :param context: multiprocessing (fork) context
+    :param write_path: Optional output path overwrite
+    :return: list, workstations in order of build completion
+    """
+    visited = []
+    pending = {}
+    errors = {}
+    logged = 0
+    running = {}
+    shares = {}
+
+    def ready(station):
+        return all(supplier in visited for supplier in station.suppliers or [])
+
+    def emit(station, record):
+        if logged < len(order) and order[logged] is station:
+            logging.getLogger(record.name).handle(record)
+        else:
+            pending.setdefault(station, []).append(record)
+
+    def advance():
+        # emit held back records, in build order, up to the first unfinished workstation
+        nonlocal logged
+        while logged < len(order):
+            station = order[logged]
+            for record in pending.pop(station, []):
+                logging.getLogger(record.name).handle(record)
+            if station not in visited:
+                break
+            logged += 1
+
+    try:
+        while len(visited) < len(order):
+
+            started = [station for station, _ in running.values()]
+            candidates = [
+                station for station in order
+                if station.concurrent_build and station not in visited and station not in started and ready(station)
+            ]
+            batch = share_workers(
+                candidates[:workers - len(running)], workers - sum(shares[station] for station in started)
+            )
+
+            for position, station in enumerate(order):
+                if station in visited or station in started or not ready(station):
+                    continue
+
+                if station.concurrent_build and len(running) < workers:
+                    shares[station] = batch[station]
+                    if station.parallel_build and shares[station] == 1:
+                        logging.getLogger(__name__).warning(
+                            f"{station} is built with 1 of {workers} workers, shared with concurrent builds, "
+                            f"so its inputs are not processed in parallel"
+                        )
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(
+                        target=build_forked, args=(station, sender, shares[station], write_path)
+                    )
+                    process.start()
+                    sender.close()
+                    running[receiver] = station, process
+                    started.append(station)
+
+                elif not station.concurrent_build and position == logged:
+                    build_station(station, write_path=write_path)
+                    visited.append(station)
+                    advance()
+                    break
+
+            else:
+                if not running:
+                    raise UserWarning(f"Unable to build remaining workstations: {order[logged:]}")
+
+                for receiver in multiprocessing.connection.wait(list(running)):
+                    station, process = running[receiver]
+                    try:
+                        kind, message = receiver.recv()
+                    except EOFError:
+                        kind, message = "exit", None
+                    if kind == "log":
+                        emit(station, message)
+                        continue
+                    if kind == "done":
+                        errors[station] = message
+                        continue
+
+                    # pipe closed, the build process has exited
+                    del running[receiver]
+                    del shares[station]
+                    receiver.close()
+                    process.join()
+                    if station not in errors or process.exitcode != 0:
+                        visited.append(station)  # emit the logs of the failed build
+                        advance()
+                        raise RuntimeError(f"Concurrent build of {station} exited with code {process.exitcode}")
+                    if errors[station] is not None:
+                        visited.append(station)
+                        advance()
+                        raise RuntimeError(f"Concurrent build of {station} failed:\n{errors[station]}")
+                    visited.append(station)
+                    advance()
+
+    finally:
+        for station, process in running.values():
+            process.terminate()
+            process.join()
+
+    return visited
+
+
 def dry_build_dag(queue, write_path=None) -> list:
     # stage 3:
     logger = logging.getLogger(__name__)
@@ -1114,5 +2002,373 @@ def path_compressed(path:str, compression:str)->str:
     return path
 
 
+def output_name(name: str, file_format: str = "csv", compression: Optional[str] = None) -> str:
+    """
+    Get the file name of a tabular output, given its csv name, for the output file format.
+    Compression suffixes are only added to csv outputs.
+    :param name: csv file name or path
+    :param file_format: output file format, one of OUTPUT_FORMATS
+    :param compression: Optional csv compression type
+    :return: str
+    """
+    if file_format != "csv":
+        return f"{os.path.splitext(name)[0]}.{file_format}"
+    if compression:
+        return path_compressed(name, compression)
+    return name
+
+
+def geometry_name(name: str, geometry_format: str) -> str:
+    """
+    Get the file name of a separately written geometry output.
+    :param name: output name, eg 'network_links'
+    :param geometry_format: one of 'geoparquet' or 'flatgeobuf'
+    :return: str
+    """
+    return f"{name}.{GEOMETRY_EXTENSIONS[geometry_format]}"
+
+
+def columnar_compression(compression: Optional[str], file_format: str) -> Optional[str]:
+    """
+    Get the compression of a tabular output for the output file format, from the (csv)
+    compression option of a tool. Parquet outputs are gzip or snappy (default) compressed, feather
+    outputs are not compressed, so that they can be memory mapped.
+    :param compression: Optional csv compression type
+    :param file_format: output file format, one of OUTPUT_FORMATS
+    :return: Optional[str]
+    """
+    if file_format == "csv":
+        return compression
+    if file_format == "parquet" and compression == "gzip":
+        return compression
+    return None
+
+
+def validate_chunk_format(file_format: str, compression: Optional[str]) -> None:
+    """
+    Raise ValueError for unsupported chunk writer file formats and compressions.
+    """
+    if file_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported chunk writer file format: {file_format}")
+    if file_format == "parquet" and compression not in [None] + PARQUET_COMPRESSIONS:
+        raise ValueError(f"Unsupported parquet compression method: {compression}")
+    if file_format == "feather" and compression is not None:
+        raise ValueError(f"Unsupported feather compression method: {compression}")
+
+
+def chunk_schema(chunk_df: pd.DataFrame) -> pa.Schema:
+    """
+    Get the arrow schema of a chunk writer from its first chunk. Columns without values are
+    typed as strings, until typed by a later chunk (see TableChunkWriting.widen()).
+    :param chunk_df: pd.DataFrame
+    :return: pa.Schema
+    """
+    fields = []
+    for field in pa.Schema.from_pandas(chunk_df, preserve_index=False).remove_metadata():
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def null_columns(chunk_df: pd.DataFrame) -> list:
+    """
+    Get the names of the (object) columns of a chunk without values, which have no arrow type.
+    :param chunk_df: pd.DataFrame
+    :return: list of column names
+    """
+    fields = pa.Schema.from_pandas(chunk_df, preserve_index=False)
+    return [field.name for field in fields if pa.types.is_null(field.type)]
+
+
+def categorical_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert string columns with repeated values (eg ids and modes) to categoricals, so that they
+    are dictionary encoded in columnar outputs and read back as categoricals.
+    :param df: pd.DataFrame
+    :return: pd.DataFrame
+    """
+    categories = [
+        column for column, series in df.items()
+        if series.dtype == object
+        and pd.api.types.infer_dtype(series, skipna=True) == "string"
+        and series.nunique() <= len(series) // 2
+    ]
+    if not categories:
+        return df
+    return df.astype({column: "category" for column in categories})
+
+
+# maximum (estimated) size in bytes of the result tables held by the ResultRegistry
+RESULT_REGISTRY_BYTES = 512 * 2 ** 20
+
+
+class ResultRegistry:
+    """
+    In-memory registry of the tabular results written during a run (see write_table()), keyed by
+    output path, so that downstream tools (eg post processors and benchmarks) read results from
+    memory rather than parsing the written files back (see read_table()). Only columnar (parquet
+    and feather) outputs are registered, as written (see columnar_frame()), which is how they are
+    read back. Csv outputs are always read from disk, as parsing infers dtypes (eg of numeric ids)
+    that downstream tools rely on. Results are only used while their output file is unchanged
+    (inode, size and modification time). The registry is process local and cleared after each
+    build(), results of tools built in forked processes are read from disk.
+    The registry holds at most max_bytes of (estimated) results: the oldest results are dropped
+    to make room for new ones and larger results are not registered, so that the result frames
+    of a run are not all kept in memory.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_REGISTRY_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.results = {}
+        self.size = 0
+
+    @staticmethod
+    def signature(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def frame_bytes(df: pd.DataFrame) -> int:
+        """
+        Estimate the size of a dataframe, object (eg string) values are assumed to take OBJECT_BYTES.
+        :param df: pd.DataFrame
+        :return: size in bytes
+        """
+        columns = [series for _, series in df.items()] + [
+            df.index.get_level_values(level) for level in range(df.index.nlevels)
+        ]
+        objects = sum(len(column) for column in columns if column.dtype == object)
+        return int(df.memory_usage(index=True).sum()) + objects * OBJECT_BYTES
+
+    def publish(self, path: str, df: pd.DataFrame) -> None:
+        """
+        Register the dataframe written to a path, dropping the oldest results if the registry
+        would exceed max_bytes. Dataframes larger than max_bytes are not registered.
+        :param path: output file path
+        :param df: pd.DataFrame, as read back from the output
+        :return: None
+        """
+        key = os.path.abspath(path)
+        self.drop(key)
+        size = self.frame_bytes(df)
+        if size > self.max_bytes:
+            return None
+        while self.results and self.size + size > self.max_bytes:
+            self.drop(next(iter(self.results)))
+        self.results[key] = (self.signature(path), df, size)
+        self.size += size
+
+    def drop(self, key: str) -> None:
+        entry = self.results.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def get(self, path: str) -> Optional[pd.DataFrame]:
+        """
+        Get a copy of the dataframe written to a path, if registered and the file is unchanged.
+        :param path: output file path
+        :return: Optional pd.DataFrame
+        """
+        key = os.path.abspath(path)
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        signature, df, _ = entry
+        if signature is None or signature != self.signature(path):
+            self.drop(key)
+            return None
+        return df.copy()
+
+    def clear(self) -> None:
+        self.results = {}
+        self.size = 0
+
+
+RESULTS = ResultRegistry()
+
+
+def columnar_frame(write_object: Union[pd.DataFrame, pd.Series]) -> pd.DataFrame:
+    """
+    Prepare a dataframe (or series) to be written to a columnar file: string columns of repeated
+    values are converted to categoricals and column names to strings.
+    :param write_object: pd.DataFrame or pd.Series
+    :return: pd.DataFrame
+    """
+    if isinstance(write_object, pd.Series):
+        write_object = write_object.to_frame()
+    df = categorical_ids(write_object)
+    if not all(isinstance(column, str) for column in df.columns):
+        df = df.set_axis([str(column) for column in df.columns], axis=1)
+    return df
+
+
+def columnar_round_trip(df: pd.DataFrame) -> bool:
+    """
+    Check that a dataframe is read back unchanged from a columnar file, ie that object columns
+    (and the index) hold strings, which are stored as such, rather than other python objects.
+    :param df: pd.DataFrame, see columnar_frame()
+    :return: bool
+    """
+    columns = [series for _, series in df.items()] + [
+        df.index.get_level_values(level) for level in range(df.index.nlevels)
+    ]
+    return all(
+        column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty")
+        for column in columns
+    )
+
+
+def write_table(
+        write_object: Union[pd.DataFrame, pd.Series],
+        path: str,
+        file_format: str = "csv",
+        compression: Optional[str] = None
+) -> None:
+    """
+    Write a dataframe (or series) to a csv, parquet or feather file, geometries are dropped.
+    Columnar (parquet and feather) outputs keep dtypes and the index, string columns of
+    repeated values are stored as categoricals, column names are stored as strings.
+    :param write_object: pd.DataFrame, gpd.GeoDataFrame or pd.Series
+    :param path: output file path
+    :param file_format: one of OUTPUT_FORMATS
+    :param compression: Optional compression, see columnar_compression()
+    :return: None
+    """
+    if isinstance(write_object, gpd.GeoDataFrame):
+        write_object = pd.DataFrame(write_object.drop("geometry", axis=1))
+
+    elif not isinstance(write_object, (pd.DataFrame, pd.Series)):
+        raise TypeError(f"don't know how to write object of type {type(write_object)} to {file_format}")
+
+    if file_format == "csv":
+        write_object.to_csv(path, header=True)
+        return
+
+    df = columnar_frame(write_object)
+    table = pa.Table.from_pandas(df)
+
+    if file_format == "parquet":
+        pq.write_table(table, path, compression=compression or "snappy")
+    elif file_format == "feather":
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        raise ValueError(f"Unsupported output file format: {file_format}")
+
+    if columnar_round_trip(df):
+        RESULTS.publish(path, df)
+
+
+def spatial_name(name: str, spatial_format: str = "geojson") -> str:
+    """
+    Get the file name of a spatial output, given its geojson name, for the spatial file format.
+    :param name: geojson name, eg 'link_vehicle_counts_car.geojson'
+    :param spatial_format: one of SPATIAL_FORMATS
+    :return: str
+    """
+    if spatial_format == "geojson":
+        return name
+    return f"{os.path.splitext(name)[0]}.{SPATIAL_EXTENSIONS[spatial_format]}"
+
+
+def write_spatial(
+        write_object: gpd.GeoDataFrame,
+        path: str,
+        spatial_format: str = "geojson",
+        chunksize: int = SPATIAL_CHUNKSIZE
+) -> None:
+    """
+    Write a geodataframe to a geojson or FlatGeobuf file, serialising chunksize rows at a time,
+    so that memory use is bounded by the chunk size rather than the size of the output.
+    Geojson output is identical to gdf.to_json(). FlatGeobuf output is spatially indexed, column
+    names are stored as strings.
+    :param write_object: gpd.GeoDataFrame
+    :param path: output file path
+    :param spatial_format: one of SPATIAL_FORMATS
+    :param chunksize: number of rows serialised at a time
+    :return: None
+    """
+    if spatial_format == "geojson":
+        with open(path, "w") as file:
+            file.write('{"type": "FeatureCollection", "features": [')
+            for start in range(0, len(write_object), chunksize):
+                chunk = write_object.iloc[start:start + chunksize]
+                features = json.dumps(list(chunk.iterfeatures(na="null")))
+                if start:
+                    file.write(", ")
+                file.write(features[1:-1])
+            file.write("]}")
+
+    elif spatial_format == "flatgeobuf":
+        import fiona
+        from geopandas.io.file import infer_schema
+
+        if not all(isinstance(column, str) for column in write_object.columns):
+            write_object = write_object.rename(columns=str)
+        crs_wkt = write_object.crs.to_wkt() if write_object.crs is not None else None
+        with fiona.open(
+                path, "w", driver="FlatGeobuf", schema=infer_schema(write_object), crs_wkt=crs_wkt
+        ) as collection:
+            for start in range(0, len(write_object), chunksize):
+                collection.writerecords(write_object.iloc[start:start + chunksize].iterfeatures())
+
+    else:
+        raise ValueError(f"Unsupported spatial output format: {spatial_format}")
+
+
+def read_table(
+        path: str,
+        file_format: str = "csv",
+        index_col=None,
+        usecols: Optional[list] = None,
+        **kwargs
+) -> pd.DataFrame:
+    """
+    Read a tabular output written by write_table() or a chunk writer. Csv files are read with
+    pd.read_csv(), columnar files are read as if they were csv files: the index is restored for
+    an index_col of 0, set from named columns for index_col names, or else returned as columns,
+    and columns without values are read as floats.
+    Other pd.read_csv() keyword arguments (eg dtype) are only used for csv files, as columnar files
+    keep their dtypes. Columnar outputs written earlier in the run are read from memory, see
+    ResultRegistry.
+    :param path: file path
+    :param file_format: one of OUTPUT_FORMATS
+    :param index_col: Optional index column (0) or column names
+    :param usecols: Optional list of columns to read
+    :return: pd.DataFrame
+    """
+    if file_format == "csv":
+        return pd.read_csv(path, index_col=index_col, usecols=usecols, **kwargs)
+
+    df = RESULTS.get(path)
+    if df is not None:
+        logging.getLogger(__name__).debug(f"reading {path} from memory")
+    elif file_format == "parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = feather.read_table(path, memory_map=True).to_pandas()
+
+    # columns without values are read as floats, as from csv files
+    empty = [column for column, series in df.items() if series.dtype == object and series.isna().all()]
+    if empty and len(df):
+        df = df.astype({column: float for column in empty})
+
+    stored_index = not isinstance(df.index, pd.RangeIndex) or df.index.name is not None
+    if index_col == 0:
+        if df.index.nlevels > 1:  # as csv, only the first level is the index
+            df = df.reset_index(level=list(range(1, df.index.nlevels)))
+        return df if usecols is None else df[[column for column in df.columns if column in usecols]]
+    if stored_index:
+        df = df.reset_index()
+    if usecols is not None:
+        df = df[[column for column in df.columns if column in usecols]]
+    if index_col is not None and index_col is not False:
+        df = df.set_index(index_col)
+    return df
+
+
 def get_closest(target, choices, limit=3, score=75) -> list:
     return [f[0] for f in process.extract(target, choices, limit=limit) if f[1] > score]
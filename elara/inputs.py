@@ -4,7 +4,10 @@ import pandas as pd
 import pyproj
 from shapely.geometry import Point, LineString
 import gzip
-from io import BytesIO
+import io
+import os
+import re
+from itertools import islice
 from math import floor
 from typing import Optional
 import logging
@@ -12,16 +15,63 @@ from collections import defaultdict
 
 from elara.factory import WorkStation, Tool
 from elara.helpers import decode_polyline_to_shapely_linestring
+from elara import cache
 
 WGS_84 = pyproj.Proj("epsg:4326")
+GZIP_MAGIC = b"\x1f\x8b"
+ELEM_BLOCK_SIZE = 1 << 26  # bytes of (decompressed) xml per block of elements handed to workers
+READ_SIZE = 1 << 24
 
 
 class InputTool(Tool):
 
+    # names of attributes that make up the built state, these are cached if a cache path is configured
+    cached_attributes = []
+
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         super().__init__(config=config, mode=mode, groupby_person_attribute=groupby_person_attribute, **kwargs)
         self.logger = logging.getLogger(__name__)
 
+    def state_cache_path(self, source_path, key=""):
+        """
+        Get the cache directory path for this tool's built state, or None if caching is not configured.
+        :param source_path: path string of the input file the state is built from
+        :param key: optional string of other build options that the state depends on, e.g. crs
+        :return: path string or None
+        """
+        if self.config.cache_path is None or not self.cached_attributes:
+            return None
+        return cache.cache_file_path(
+            self.config.cache_path, source_path, name=self.__class__.__name__, key=key
+        )
+
+    def load_cached_state(self, source_path, key="") -> bool:
+        """
+        Set built state from cache, if caching is configured and a cache exists for the source file.
+        :param source_path: path string of the input file the state is built from
+        :param key: optional string of other build options that the state depends on, e.g. crs
+        :return: bool, True if state was loaded from cache
+        """
+        path = self.state_cache_path(source_path, key)
+        if path is None or not os.path.exists(path):
+            return False
+        for name, value in cache.read_state(path).items():
+            setattr(self, name, value)
+        return True
+
+    def save_cached_state(self, source_path, key="") -> None:
+        """
+        Write built state to cache, if caching is configured.
+        :param source_path: path string of the input file the state is built from
+        :param key: optional string of other build options that the state depends on, e.g. crs
+        :return: None
+        """
+        path = self.state_cache_path(source_path, key)
+        if path is None or os.path.exists(path):
+            return None
+        self.logger.debug(f'Caching {self} state to {path}')
+        cache.write_state(path, {name: getattr(self, name) for name in self.cached_attributes})
+
     def set_and_change_crs(self, target: gdp.GeoDataFrame, set_crs=None, to_crs='epsg:4326'):
         """
         Set and change a target GeoDataFrame crs. Wrapper for geopandas .crs and .to_crs.
@@ -56,23 +106,67 @@ class Events(InputTool):
 
     requirements = ['events_path']
     elems = None
+    path = None
+    cache_file = None
 
     def build(self, resources: dict, write_path: Optional[str] = None) -> None:
         """
-        Events object constructor.
+        Events object constructor. If a cache path is configured, events are read from a columnar
+        cache of the events file, the cache is written as a side effect of the first full read.
         :param resources: GetPath resources from suppliers
         :param write_path: Optional output path overwrite
         """
         super().build(resources)
 
         path = resources['events_path'].path
+        self.path = path
 
-        self.elems = get_elems(path, "event")
+        if self.config.cache_path is None:
+            self.elems = get_elems(path, "event")
+            return None
+
+        cache_path = cache.cache_file_path(self.config.cache_path, path, ".parquet")
+        self.cache_file = cache_path
+        if os.path.exists(cache_path):
+            self.elems = cache.read_event_cache(cache_path)
+        else:
+            self.logger.info(f'No events cache found for {path}, caching events to {cache_path}')
+            self.elems = cache.write_event_cache(get_elems(path, "event"), cache_path)
+
+    def skip(self, count: int) -> None:
+        """
+        Skip the first events, eg those processed before a checkpoint. Events are read from the
+        cached copy of the events if it exists, otherwise the skipped events are still parsed
+        (but not handled).
+        :param count: number of events to skip
+        :return: None
+        """
+        if self.cache_file is not None and os.path.exists(self.cache_file):
+            self.elems = cache.read_event_cache(self.cache_file, start=count)
+        else:
+            self.elems = islice(self.elems, count, None)
+
+    def columnar_path(self, tmp_dir: str) -> str:
+        """
+        Return the path of a columnar (parquet) copy of the events, as used for random access to
+        ranges of events. The copy is written first if it does not already exist, to the configured
+        cache path, or to the given temporary directory if no cache path is configured.
+        :param tmp_dir: directory used if no cache path is configured
+        :return: parquet events file path string
+        """
+        if self.cache_file is None:
+            self.cache_file = os.path.join(tmp_dir, "events.parquet")
+        if not os.path.exists(self.cache_file):
+            self.logger.info(f'Writing columnar events to {self.cache_file}')
+            for _ in cache.write_event_cache(get_elems(self.path, "event"), self.cache_file):
+                pass
+        return self.cache_file
 
 
 class Network(InputTool):
 
     requirements = ['network_path', 'crs']
+    cached_attributes = ['node_gdf', 'link_gdf', 'mode_to_links_map']
     node_gdf = None
     link_gdf = None
 
@@ -91,18 +185,21 @@ class Network(InputTool):
         path = resources['network_path'].path
         crs = resources['crs'].path
 
-        # Extract element properties
-        self.logger.debug(f'Loading nodes')
-        nodes = [
-            self.get_node_elem(elem) for elem in get_elems(path, "node")
-        ]
-        node_lookup = {node["id"]: node for node in nodes}
+        if self.load_cached_state(path, key=crs):
+            return None
 
-        self.logger.debug(f'Loading links')
-        links = [
-            self.get_link_elem(elem, node_lookup)
-            for elem in get_elems(path, "link")
-        ]
+        # Extract element properties, nodes are declared before links
+        self.logger.debug(f'Loading nodes and links')
+        nodes = []
+        node_lookup = {}
+        links = []
+        for tag, elem in get_multi_elems(path, ["node", "link"]):
+            if tag == "node":
+                node = self.get_node_elem(elem)
+                nodes.append(node)
+                node_lookup[node["id"]] = node
+            else:
+                links.append(self.get_link_elem(elem, node_lookup))
 
         self.logger.debug(f'Building network nodes geodataframe')
         node_df = pd.DataFrame(nodes)
@@ -128,6 +225,8 @@ class Network(InputTool):
         self.logger.debug(f'Re-projecting network links geodataframe')
         self.set_and_change_crs(self.link_gdf, set_crs=crs)
 
+        self.save_cached_state(path, key=crs)
+
 
     @staticmethod
     def transform_node_elem(elem, crs):
@@ -244,6 +343,10 @@ class OSMWays(InputTool):
 
 class TransitSchedule(InputTool):
     requirements = ['transit_schedule_path', 'crs']
+    cached_attributes = [
+        'stop_gdf', 'route_to_mode_map', 'mode_to_stops_map', 'veh_to_route_map', 'mode_to_veh_map',
+        'veh_to_mode_map', 'mode_to_routes_map', 'modes'
+    ]
     stop_gdf = None
     mode_map = None
     modes = None
@@ -263,45 +366,35 @@ class TransitSchedule(InputTool):
         path = resources['transit_schedule_path'].path
         crs = resources['crs'].path
 
-        # Retrieve stop attributes
-        self.logger.debug(f'Loading transit stops')
-        stops = [
-            self.get_node_elem(elem)
-            for elem in get_elems(path, "stopFacility")
-        ]
-
-        # Generate empty geodataframes
-        stop_df = pd.DataFrame(stops)
-        stop_df.set_index("id", inplace=True)
-        stop_df.sort_index(inplace=True)
-
-        self.stop_gdf = gdp.GeoDataFrame(stop_df, geometry="geometry").sort_index()
-
-        # transform
-        self.logger.debug(f'Reprojecting stops')
-        self.set_and_change_crs(self.stop_gdf, set_crs=crs)
+        if self.load_cached_state(path, key=crs):
+            return None
 
         # TODO the following is nested to try and recover some efficiency.
         # However this "Schedule" class now has a lot of variables/mappings/etc.
         # It would probably be sensible to refactor this class into two or more
         # distinct classes such as "Schedules Routes" and "Schedules Stops" or similar.
 
-        # Generate route -> mode, mode -> stops and vehicles -> routes maps
-        self.logger.debug(f'Generating mappings.')
+        # Retrieve stop attributes and generate route -> mode, mode -> stops and vehicles -> routes maps
+        self.logger.debug(f'Loading transit stops and generating mappings.')
 
+        stops = []
         self.route_to_mode_map = {}
         self.mode_to_stops_map = defaultdict(set)
         self.veh_to_route_map = {}
         self.mode_to_veh_map = defaultdict(set)
 
-        for elem in get_elems(path, "transitRoute"):
+        for tag, elem in get_multi_elems(path, ["stopFacility", "transitRoute"]):
+            if tag == "stopFacility":
+                stops.append(self.get_node_elem(elem))
+                continue
+
             # route -> mode map
             route_id, mode = self.get_route_mode(elem)
             self.route_to_mode_map[route_id] = mode
 
             # mode -> stops map
-            stops = self.get_route_stops(elem)
-            self.mode_to_stops_map[mode].update(stops)
+            route_stops = self.get_route_stops(elem)
+            self.mode_to_stops_map[mode].update(route_stops)
 
             
             route_id, route_vehicles = self.get_route_vehicles(elem)
@@ -311,7 +404,18 @@ class TransitSchedule(InputTool):
             for vehicle_id in route_vehicles:
                 # vehicles -> routes map
                 self.veh_to_route_map[vehicle_id] = route_id
-        
+
+        # Generate empty geodataframes
+        stop_df = pd.DataFrame(stops)
+        stop_df.set_index("id", inplace=True)
+        stop_df.sort_index(inplace=True)
+
+        self.stop_gdf = gdp.GeoDataFrame(stop_df, geometry="geometry").sort_index()
+
+        # transform
+        self.logger.debug(f'Reprojecting stops')
+        self.set_and_change_crs(self.stop_gdf, set_crs=crs)
+
         # mode -> veh map
         self.veh_to_mode_map = {v: mode for mode, vs in self.mode_to_veh_map.items() for v in vs}
 
@@ -325,6 +429,8 @@ class TransitSchedule(InputTool):
         self.logger.debug(f'Transit Schedule Route modes = {self.modes}')
         self.logger.debug(f'Transit Schedule Stop modes = {list(self.mode_to_stops_map)}')
 
+        self.save_cached_state(path, key=crs)
+
 
     @staticmethod
     def get_node_elem(elem):
@@ -406,6 +512,7 @@ class TransitSchedule(InputTool):
 class TransitVehicles(InputTool):
 
     requirements = ['transit_vehicles_path']
+    cached_attributes = ['veh_type_capacity_map', 'veh_id_veh_type_map']
     veh_type_mode_map = None
     veh_type_capacity_map = None
     types = None
@@ -436,21 +543,20 @@ class TransitVehicles(InputTool):
         }
         self.logger.debug(f'veh type mode map = {self.veh_type_mode_map}')
 
-        # Vehicle type to total capacity correspondence
-        self.veh_type_capacity_map = dict(
-            [
-                self.transform_veh_type_elem(elem)
-                for elem in get_elems(path, "vehicleType")
-            ]
-        )
+        if not self.load_cached_state(path):
+            # Vehicle type to total capacity and vehicle ID to vehicle type correspondences
+            self.logger.debug('Building veh type capacity and veh id to veh type maps')
+            self.veh_type_capacity_map = {}
+            self.veh_id_veh_type_map = {}
+            for tag, elem in get_multi_elems(path, ["vehicleType", "vehicle"]):
+                if tag == "vehicleType":
+                    veh_type, capacity = self.transform_veh_type_elem(elem)
+                    self.veh_type_capacity_map[veh_type] = capacity
+                else:
+                    self.veh_id_veh_type_map[elem.get("id")] = elem.get("type")
+            self.save_cached_state(path)
         self.logger.debug(f'veh type capacity map = {self.veh_type_capacity_map}')
 
-        # Vehicle ID to vehicle type correspondence
-        self.logger.debug('Building veh id to veh type map')
-        self.veh_id_veh_type_map = {
-            elem.get("id"): elem.get("type") for elem in get_elems(path, "vehicle")
-        }
-
         self.types, self.transit_vehicle_counts = count_values(self.veh_id_veh_type_map)
         self.logger.debug(f'veh types = {self.types}')
 
@@ -477,6 +583,7 @@ class TransitVehicles(InputTool):
 class Subpopulations(InputTool):
     
     requirements = ['attributes_path']
+    cached_attributes = ['map']
     # final_attribute_map = None
     map = None
     classes = None
@@ -492,7 +599,10 @@ class Subpopulations(InputTool):
 
         path = resources['attributes_path'].path
 
-        if self.config.version == 12:
+        if self.load_cached_state(path, key=str(self.config.version)):
+            pass
+
+        elif self.config.version == 12:
             self.logger.debug("Loading attribute map from V12 plan")
             self.map = dict(
                 [
@@ -510,6 +620,8 @@ class Subpopulations(InputTool):
                 ]
             )
 
+        self.save_cached_state(path, key=str(self.config.version))
+
         self.classes, self.attribute_count_map = count_values(self.map)
         self.classes.append('not_applicable')
         # self.idents = sorted(list(self.map))
@@ -534,6 +646,7 @@ class Subpopulations(InputTool):
 class Attributes(InputTool):
     
     requirements = ['attributes_path']
+    cached_attributes = ['attributes']
     attributes = {}
     attribute_count_map = None
 
@@ -547,7 +660,10 @@ class Attributes(InputTool):
 
         path = resources['attributes_path'].path
 
-        if self.config.version == 12:
+        if self.load_cached_state(path, key=str(self.config.version)):
+            pass
+
+        elif self.config.version == 12:
             self.logger.debug("Loading attribute map from V12 plan")
             self.attributes = dict(
                 [
@@ -565,6 +681,8 @@ class Attributes(InputTool):
                 ]
             )
 
+        self.save_cached_state(path, key=str(self.config.version))
+
         self.idents = sorted(list(self.attributes))
         self.attribute_names = set([k for v in self.values() for k in v.keys()])
         # self.attributes_df = pd.DataFrame.from_dict(self.attributes, orient='index')  # todo: is this needed? - make it lazy
@@ -623,6 +741,8 @@ class Plans(InputTool):
     requirements = ['plans_path']
     plans = None
     persons = None
+    path = None
+    person_tag = None
 
     def build(self, resources: dict, write_path: Optional[str] = None):
         """
@@ -634,6 +754,7 @@ class Plans(InputTool):
 
         # call by list index so 'input_plans' can be used by InputPlans
         path = resources[self.requirements[0]].path
+        self.path = path
 
         self.plans = get_elems(path, "plan")
         # self.persons = get_elems(path, "person")
@@ -648,6 +769,26 @@ class Plans(InputTool):
             if len(elem.find('./plan').getchildren()) > 0:
                 yield elem
 
+    def person_blocks(self, block_size=ELEM_BLOCK_SIZE):
+        """
+        Split plans into blocks of whole persons, for parsing in worker processes.
+        :param block_size: approximate size (bytes) of blocks
+        :return: Generator of (header, block, footer) bytes tuples
+        """
+        return split_elems(self.path, "person", block_size)
+
+    def block_persons(self, header, block, footer):
+        """
+        Parse persons (with non-empty plans) from a block returned by .person_blocks().
+        :param header: document header bytes
+        :param block: block bytes
+        :param footer: closing root tag bytes
+        :return: Generator of person elements
+        """
+        if self.person_tag is None:
+            self.person_tag = get_tag(self.path, "person")
+        return self.filter_out_persons_with_empty_plans(parse_elem_block(header, block, footer, self.person_tag))
+
 class InputPlans(Plans):
     """
     InputTool for iterating through plans used as inputs to a MATSim simulation.
@@ -783,18 +924,13 @@ class RoadPricing(InputTool):
         path = resources['road_pricing_path'].path
 
         self.logger.debug(f"Loading road pricing from {path}")
-        self.links = dict(
-            [
-                self.get_costs(elem)
-                for elem in get_elems(path, "link")
-            ]
-        )
-        self.tollnames = dict(
-            [
-                self.get_tollnames(elem)
-                for elem in get_elems(path, "link")
-            ]
-        )
+        self.links = {}
+        self.tollnames = {}
+        for elem in get_elems(path, "link"):
+            ident, costs = self.get_costs(elem)
+            self.links[ident] = costs
+            ident, tollname = self.get_tollnames(elem)
+            self.tollnames[ident] = tollname
 
     def get_costs(self, elem):
         ident = elem.xpath("@id")[0]
@@ -835,22 +971,37 @@ class InputsWorkStation(WorkStation):
 
 def get_elems(path, tag):
     """
-    Wrapper for unzipping and dealing with xml namespaces
+    Wrapper for unzipping and dealing with xml namespaces.
+    Note that the file is only opened once the returned generator is first consumed, and is
+    decompressed as a stream, so memory use does not grow with file size.
     :param path: xml path string
     :param tag: The tag type to extract , e.g. 'link'
     :return: Generator of elements
     """
-    target = try_unzip(path)
-    tag = get_tag(target, tag)
-    target = try_unzip(path)  # need to repeat :(
-    return parse_elems(target, tag)
+    tag = get_tag(path, tag)
+    with open_xml(path) as target:
+        yield from parse_elems(target, tag)
+
+
+def get_multi_elems(path, tags):
+    """
+    Wrapper for unzipping and dealing with xml namespaces, retrieving the elements of several tags
+    in a single pass over the file, in document order.
+    :param path: xml path string
+    :param tags: The tag types to extract, e.g. ['node', 'link']
+    :return: Generator of (tag, element) tuples, tag as given (without namespace)
+    """
+    lookup = {get_tag(path, tag): tag for tag in tags}
+    with open_xml(path) as target:
+        for element in parse_elems(target, list(lookup)):
+            yield lookup[element.tag], element
 
 
 def parse_elems(target, tag):
     """
     Traverse the given XML tree, retrieving the elements of the specified tag.
-    :param target: Target xml, either BytesIO object or string path
-    :param tag: The tag type to extract , e.g. 'link'
+    :param target: Target xml, either file-like object or string path
+    :param tag: The tag type (or list of tag types) to extract , e.g. 'link'
     :return: Generator of elements
     """
     doc = etree.iterparse(target, tag=tag)
@@ -861,39 +1012,117 @@ def parse_elems(target, tag):
     del doc
 
 
-def try_unzip(path):
+def split_elems(path, tag, block_size=ELEM_BLOCK_SIZE):
     """
-    Attempts to unzip xml at given path, if fails, returns path
+    Split the (decompressed) xml at given path into blocks of whole elements of the specified tag,
+    without parsing, by searching for element start tags in the raw bytes. Each block is returned
+    with the document header (everything before the first element, including the root start tag)
+    and a closing root tag, so that it can be parsed as a document, for example by worker processes.
     :param path: xml path string
-    :return: either BytesIO object or string path
+    :param tag: The tag type to split on, e.g. 'person'
+    :param block_size: approximate size (bytes) of blocks
+    :return: Generator of (header, block, footer) bytes tuples
     """
-    try:
-        with gzip.open(path) as unzipped:
-            xml = unzipped.read()
-            target = BytesIO(xml)
-            return target
-    except OSError:
-        return path
+    start_tag = f"<{tag}".encode()
+    buffer = bytearray()
+    header = footer = None
+    with open_xml(path) as target:
+        while True:
+            data = target.read(READ_SIZE)
+            buffer += data
+
+            if header is None:
+                start = find_start_tag(buffer, start_tag)
+                if start is None:
+                    if not data:
+                        return
+                    continue
+                header = bytes(buffer[:start])
+                root = re.search(rb"<([^?!/\s>][^\s/>]*)", header)
+                footer = b"</" + root.group(1) + b">"
+                del buffer[:start]
+
+            if not data:
+                break
+
+            while len(buffer) > block_size:
+                cut = find_start_tag(buffer, start_tag, block_size)
+                if cut is None:
+                    break
+                yield header, bytes(buffer[:cut]), footer
+                del buffer[:cut]
+
+    yield header, bytes(buffer[:buffer.rfind(footer[:-1])]), footer
 
 
-def get_tag(target, tag):
+def find_start_tag(buffer, start_tag, start=0) -> Optional[int]:
+    """
+    Find the first position of an element start tag, e.g. b'<person', in a buffer.
+    :param buffer: bytes
+    :param start_tag: start tag bytes, without closing bracket or attributes
+    :param start: position to search from
+    :return: Optional position
+    """
+    position = buffer.find(start_tag, start)
+    while position >= 0:
+        following = buffer[position + len(start_tag):position + len(start_tag) + 1]
+        if following and following in b" \t\r\n/>":
+            return position
+        position = buffer.find(start_tag, position + 1)
+    return None
+
+
+def parse_elem_block(header, block, footer, tag):
+    """
+    Parse the elements from a block of xml returned by split_elems.
+    :param header: document header bytes
+    :param block: block bytes
+    :param footer: closing root tag bytes
+    :param tag: The tag type to extract, including any namespace (see get_tag)
+    :return: Generator of elements
+    """
+    yield from parse_elems(io.BytesIO(header + block + footer), tag)
+
+
+def open_xml(path):
+    """
+    Open xml at given path as a binary stream. Gzipped files (identified by their magic number)
+    are decompressed on the fly as the stream is read.
+    :param path: xml path string
+    :return: file-like object
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def get_tag(path, tag, head_size=65536):
     """
     Check for namespace declaration. If they exists return tag string
     with namespace [''] ie {namespaces['']}tag. If no namespaces declared
-    return original tag
-    TODO Not working with iterparse, generated elem also have ns which is dealt with later
+    return original tag.
+    Only the head of the file is read, namespaces are assumed to be declared on the root element.
+    :param path: xml path string
+    :param tag: The tag type to extract , e.g. 'link'
+    :param head_size: number of (decompressed) bytes to read when looking for the root element
+    :return: tag string
     """
     nsmap = {}
-    doc = etree.iterparse(target, events=('end', 'start-ns',))
-    count = 0
-    for event, element in doc:
-        count += 1
-        if event == 'start-ns':
-            nsmap[element[0]] = element[1]
-        if count == 10:  # assume namespace declared at top so can break early
-            del doc
-            break
-    if not nsmap:
+    parser = etree.XMLPullParser(events=('start', 'start-ns',))
+    with open_xml(path) as target:
+        head = target.read(head_size)
+    try:
+        parser.feed(head)
+        for event, element in parser.read_events():
+            if event == 'start-ns':
+                nsmap[element[0]] = element[1]
+            elif event == 'start':  # root element reached, all root namespaces found
+                break
+    except etree.XMLSyntaxError:
+        pass
+    if '' not in nsmap:
         return tag
     else:
         tag = '{' + nsmap[''] + '}' + tag
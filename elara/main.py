@@ -27,13 +27,17 @@ def cli():
 @click.option("--path_override", '-o', default=None, help="over-ride input path root.")
 @click.option("--root", '-r', default=None, help="over-ride all path roots.")
 @click.option("--output_directory_override", default=None, help="over-ride output directory to new path.")
-def run(config_path, dry, path_override, root, output_directory_override):
+@click.option("--workers", '-w', type=click.INT, default=None, help="over-ride number of worker processes.")
+@click.option("--resume", is_flag=True, help="resume event processing from the last checkpoint.")
+def run(config_path, dry, path_override, root, output_directory_override, workers, resume):
     """
     Run Elara using a config.
     :param config_path: Configuration file path
     :param path_override: containing directory to update for [inputs], outputs.path in toml
     :param root: add root to all paths (assumes that paths in config are relative)
     :param output_directory_override: change outputs directory
+    :param workers: number of worker processes used for event processing
+    :param resume: flag to resume event processing from the last checkpoint
     :param dry: flag to initiate a run test
     """
 
@@ -53,6 +57,12 @@ def run(config_path, dry, path_override, root, output_directory_override):
     if output_directory_override:
         config.output_directory_override(output_directory_override)
 
+    if workers is not None:
+        config.workers = config.valid_workers(workers)
+
+    if resume:
+        config.resume = True
+
     """
     Main logic:
         1) define workstations
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import pickle
+from typing import Iterator, Optional
+
+from elara.factory import Tool, CSVChunkWriter, ColumnarChunkWriter, ArrowChunkWriter
+
+logger = logging.getLogger(__name__)
+
+SPOOL_BLOCK_SIZE = 1000
+
+# spool entry kinds
+ROWS = "rows"
+EVENT = "event"
+
+
+class Spool:
+    """
+    Append only, ordered, on disk log of entries (tuples) written by a worker process and read back
+    (in the same order) by the main process. Entries are pickled in blocks.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = path
+        self.block = []
+        self.file = open(path, "wb")
+
+    def add(self, entry: tuple) -> None:
+        self.block.append(entry)
+        if len(self.block) >= SPOOL_BLOCK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.block:
+            pickle.dump(self.block, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.block = []
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+    @staticmethod
+    def read(path) -> Iterator[tuple]:
+        """
+        Read back spooled entries in the order they were added.
+        :param path: spool file path string
+        :return: generator of entries
+        """
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+
+
+class SpoolWriter:
+    """
+    Stand-in for a chunk writer in a replica tool. Lines are added to a spool so that they can be
+    passed on, in order, to the original tool's chunk writer by the main process.
+    """
+
+    def __init__(self, spool: Spool, name: str, attribute: str) -> None:
+        self.spool = spool
+        self.name = name
+        self.attribute = attribute
+        self.idx = 0
+
+    def add(self, lines: list) -> None:
+        self.spool.add((ROWS, self.name, self.attribute, lines))
+        self.idx += len(lines)
+
+    def append(self, line: tuple) -> None:
+        self.add([line])
+
+    def finish(self) -> None:
+        pass
+
+    def __len__(self):
+        return self.idx
+
+
+def replicate(tool: Tool, spool: Spool, name: str, write_path: Optional[str] = None) -> Tool:
+    """
+    Build a fresh copy of a (built) tool, using the same options and resources, with chunk writers
+    replaced by spool writers.
+    :param tool: built tool to replicate
+    :param spool: spool for chunk writer lines
+    :param name: tool name (resources key) used to identify spooled lines
+    :param write_path: Optional output path overwrite
+    :return: replica tool
+    """
+    replica = tool.__class__(
+        tool.config,
+        mode=tool.mode,
+        groupby_person_attribute=tool.groupby_person_attribute,
+        compression=tool.compression,
+        **tool.kwargs
+    )
+    replica.build(tool.resources, write_path=write_path)
+    writers = [
+        attribute for attribute, value in vars(replica).items()
+        if isinstance(value, (CSVChunkWriter, ColumnarChunkWriter, ArrowChunkWriter))
+    ]
+    for attribute in writers:
+        setattr(replica, attribute, SpoolWriter(spool, name, attribute))
+    return replica
+
+
+def replay_spool(path, tools: dict) -> None:
+    """
+    Pass spooled lines to the chunk writers of the original tools and hand spooled (deferred)
+    events to the original tools, in order.
+    :param path: spool file path string
+    :param tools: dict of original tools, keyed by name
+    :return: None
+    """
+    for entry in Spool.read(path):
+        if entry[0] == ROWS:
+            _, name, attribute, lines = entry
+            tools[name].add_rows(attribute, lines)
+        else:
+            _, name, event = entry
+            tools[name].process_event(event)
+
+
+def write_results(path, results: dict) -> None:
+    with open(path, "wb") as f:
+        pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_results(path) -> dict:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def fork_pool(processes: int):
+    """
+    Return a process pool using the fork start method, so that workers share the (read only)
+    state of the main process, such as built tools and their resources.
+    Returns None if fork is not supported on this platform.
+    :param processes: number of worker processes
+    :return: multiprocessing.Pool or None
+    """
+    try:
+        context = multiprocessing.get_context("fork")
+    except ValueError:
+        logger.warning("Parallel processing requires the fork start method, which is not available")
+        return None
+    return context.Pool(processes)
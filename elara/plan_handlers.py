@@ -1,12 +1,163 @@
 import numpy as np
 from math import floor
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import logging
 import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from functools import lru_cache
+from sys import intern
 
-from elara.factory import Tool, WorkStation
+from elara import parallel
+from elara.factory import Tool, WorkStation, write_spatial
+from elara.inputs import ELEM_BLOCK_SIZE
+
+DAY = 86400  # seconds
+# end time (seconds) of activities without an end_time attribute, ie "23:59:59"
+END_OF_DAY = DAY - 1
+
+
+class Activity:
+    """
+    Plan activity record. Times are in seconds, end_time is None if the activity has no end time.
+    Coordinates are kept as the raw attribute strings (as logged), None if not recorded.
+    """
+
+    __slots__ = ["type", "x", "y", "end_time"]
+    is_leg = False
+
+    def __init__(self, act_type: str, x: Optional[str], y: Optional[str], end_time: Optional[int]) -> None:
+        self.type = act_type
+        self.x = x
+        self.y = y
+        self.end_time = end_time
+
+
+class Leg:
+    """
+    Plan leg record. Times are in seconds (dep_time is kept as the raw string).
+    route_mode is the mode resolved from the route (through the transit schedule for MATSim v11
+    pt routes), distance is None for legs without a route (route_distance is the raw route distance
+    attribute string, as logged) and links are the link ids of network ('links' type) routes.
+    """
+
+    __slots__ = ["mode", "route_mode", "distance", "route_distance", "dep_time", "trav_time", "links"]
+    is_leg = True
+
+    def __init__(
+            self,
+            mode: str,
+            route_mode: Optional[str],
+            distance: Optional[float],
+            route_distance: Optional[str],
+            dep_time: Optional[str],
+            trav_time: Optional[int],
+            links: tuple
+    ) -> None:
+        self.mode = mode
+        self.route_mode = route_mode
+        self.distance = distance
+        self.route_distance = route_distance
+        self.dep_time = dep_time
+        self.trav_time = trav_time
+        self.links = links
+
+
+class Plan:
+    """
+    Plan record, with the raw 'selected' and 'score' attributes and activity and leg stages in order.
+    """
+
+    __slots__ = ["selection", "selected", "score", "stages"]
+
+    def __init__(self, selection: Optional[str], score: Optional[str], stages: list) -> None:
+        self.selection = selection
+        self.selected = selection != "no"
+        self.score = score
+        self.stages = stages
+
+
+class Person:
+    """
+    Person record, decoded once from a plans person element and handed to all plan handlers.
+    """
+
+    __slots__ = ["ident", "plans"]
+
+    def __init__(self, ident: str, plans: list) -> None:
+        self.ident = ident
+        self.plans = plans
+
+
+class PlanDecoder:
+    """
+    Decode person xml elements into Person records.
+    """
+
+    def __init__(self, config, resources: dict) -> None:
+        """
+        :param config: Config
+        :param resources: dict, supplier resources, the transit schedule is used (where available) to
+        resolve the modes of MATSim v11 pt routes
+        """
+        self.version = config.version
+        self.transit_schedule = resources.get("transit_schedule")
+
+    def decode(self, elem) -> Person:
+        """
+        Decode a person element.
+        :param elem: Person XML element
+        :return: Person
+        """
+        plans = []
+        for plan in elem.xpath(".//plan"):
+            stages = []
+            for stage in plan:
+                if stage.tag == "activity":
+                    stages.append(Activity(
+                        stage.get("type"),
+                        stage.get("x"),
+                        stage.get("y"),
+                        convert_time_to_seconds(stage.get("end_time")),
+                    ))
+                elif stage.tag == "leg":
+                    stages.append(self.decode_leg(stage))
+            plans.append(Plan(plan.get("selected"), plan.get("score"), stages))
+        return Person(elem.get("id"), plans)
+
+    def decode_leg(self, stage) -> Leg:
+        """
+        Decode a leg element, including its route (if any).
+        :param stage: Leg XML element
+        :return: Leg
+        """
+        mode = stage.get("mode")
+        route_mode = mode
+        distance = None
+        route_distance = None
+        links = ()
+
+        route = stage.find("route")
+        if route is not None:
+            route_distance = route.get("distance")
+            distance = float(route.get("distance", 0))
+            if self.version == 11 and mode == "pt" and self.transit_schedule is not None:
+                route_mode = self.transit_schedule.route_to_mode_map.get(route.text.split("===")[-2])
+            if route.get("type") == "links" and route.text is not None:
+                links = tuple(intern(link) for link in route.text.split(" "))
+
+        return Leg(
+            mode,
+            route_mode,
+            distance,
+            route_distance,
+            stage.get("dep_time"),
+            convert_time_to_seconds(stage.get("trav_time")),
+            links,
+        )
 
 
 class PlanHandlerTool(Tool):
@@ -15,6 +166,7 @@ class PlanHandlerTool(Tool):
     """
 
     options_enabled = True
+    plan_decoder = None
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs):
         self.logger = logging.getLogger(__name__)
@@ -23,6 +175,23 @@ class PlanHandlerTool(Tool):
     def build(self, resources: dict, write_path=None) -> None:
 
         super().build(resources, write_path)
+        self.plan_decoder = PlanDecoder(self.config, resources)
+
+    def process_plans(self, elem) -> None:
+        """
+        Decode a person element and process its plans. Workstations decode each person once and
+        hand the record to all handlers (.process_person()).
+        :param elem: Person XML element
+        """
+        self.process_person(self.plan_decoder.decode(elem))
+
+    def process_person(self, person: Person) -> None:
+        """
+        Process the plans of a decoded person. Does nothing by default, handlers override this to
+        build their results.
+        :param person: Person record
+        """
+        pass
 
     def extract_mode_from_route_elem(self, leg_mode, route_elem):
         """
@@ -109,6 +278,7 @@ class ModeShares(PlanHandlerTool):
         "output_config",
     ]
     valid_modes = ["all"]
+    partition_results = ["mode_counts"]
 
     def __init__(self, config, mode="all", groupby_person_attribute=None, **kwargs) -> None:
         """
@@ -219,32 +389,28 @@ class ModeShares(PlanHandlerTool):
 
 
 class TripModes(ModeShares):
-    def process_plans(self, elem):
+    def process_person(self, person):
         """
-        :param elem: Plan XML element
+        :param person: Person record
         """
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                ident = elem.get("id")
+                ident = person.ident
                 attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute)
 
                 end_time = None
                 trip_modes = {}
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "leg":
-                        leg_mode = stage.get("mode")
-                        route_elem = stage.xpath("route")[0]
-                        mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
-                        distance = float(route_elem.get("distance", 0))
+                    if stage.is_leg:
                         # ignore access and egress walk
-                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
-                        trip_modes[mode] = trip_modes.get(mode, 0) + distance
+                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
+                        trip_modes[mode] = trip_modes.get(mode, 0) + stage.distance
 
-                    elif stage.tag == "activity":
-                        if stage.get("type") == "pt interaction":  # ignore pt interaction activities
+                    else:
+                        if stage.type == "pt interaction":  # ignore pt interaction activities
                             continue
 
                         # only add activity modes when there has been previous activity
@@ -256,33 +422,29 @@ class TripModes(ModeShares):
                             self.mode_counts[x, y, z] += 1
 
                         # update endtime for next activity
-                        end_time = convert_time_to_seconds(stage.get("end_time"))
+                        end_time = stage.end_time
 
                         # reset modes
                         trip_modes = {}
 
 
 class PlanModes(ModeShares):
-    def process_plans(self, elem):
+    def process_person(self, person):
         """"""
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                ident = elem.get("id")
+                ident = person.ident
                 attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute)
 
                 plan_modes = {}
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "leg":
-                        leg_mode = stage.get("mode")
-                        route_elem = stage.xpath("route")[0]
-                        mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
-                        distance = float(route_elem.get("distance", 0))
+                    if stage.is_leg:
                         # ignore access and egress walk
-                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
-                        plan_modes[mode] = plan_modes.get(mode, 0) + distance
+                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
+                        plan_modes[mode] = plan_modes.get(mode, 0) + stage.distance
 
                 if plan_modes:  # stay-home agents have no legs/modes
                     mode = self.get_furthest_mode(plan_modes)
@@ -308,7 +470,7 @@ class TripActivityModes(ModeShares):
                 "You must configure 'destination_activity_filters' for the 'trip_activity_modes' tool as a list, eg '['work']."
             )
 
-    def process_plans(self, elem):
+    def process_person(self, person):
         """
         Iterate through the plans and produce counts / mode shares for trips to
         the destination activities specified in the list.
@@ -319,29 +481,25 @@ class TripActivityModes(ModeShares):
         e.g. if the destination acitivity list consists of ['work_a', work_b]
         and a plan consists of the trips [home] --> (bus,11km) --> [work_a] --> (train, 10km) --> [work_b],
         the resulting counts will see: (bus) +1 & (train) + 1.
-        :param elem: Plan XML element
+        :param person: Person record
         """
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                ident = elem.get("id")
+                ident = person.ident
                 attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute)
 
                 end_time = None
                 trip_modes = {}
 
-                for stage in plan:
-                    if stage.tag == "leg":
-                        leg_mode = stage.get("mode")
-                        route_elem = stage.xpath("route")[0]
-                        mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
-                        distance = float(route_elem.get("distance", 0))
+                for stage in plan.stages:
+                    if stage.is_leg:
                         # ignore access and egress walk
-                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
-                        trip_modes[mode] = trip_modes.get(mode, 0) + distance
+                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
+                        trip_modes[mode] = trip_modes.get(mode, 0) + stage.distance
 
-                    elif stage.tag == "activity":
-                        activity = stage.get("type")
+                    else:
+                        activity = stage.type
 
                         # only add activity modes when there has been previous activity
                         # (ie trip start time) AND the activity is in specified list
@@ -355,7 +513,7 @@ class TripActivityModes(ModeShares):
                         if not activity == "pt interaction":  # reset modes at end of trip
                             trip_modes = {}
                             # update endtime for next activity
-                            end_time = convert_time_to_seconds(stage.get("end_time"))
+                            end_time = stage.end_time
 
 
 class PlanActivityModes(ModeShares):
@@ -370,30 +528,26 @@ class PlanActivityModes(ModeShares):
                 "You must configure 'destination_activity_filters' for the 'plan_activity_modes' tool as a list, eg '['work']."
             )
 
-    def process_plans(self, elem):
+    def process_person(self, person):
         """"""
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                ident = elem.get("id")
+                ident = person.ident
                 attribute_class = self.attributes.get(ident, {}).get(self.groupby_person_attribute)
 
                 end_time = None
                 trip_modes = {}
                 plan_modes = {}
 
-                for stage in plan:
-                    if stage.tag == "leg":
-                        leg_mode = stage.get("mode")
-                        route_elem = stage.xpath("route")[0]
-                        mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
-                        distance = float(route_elem.get("distance", 0))
+                for stage in plan.stages:
+                    if stage.is_leg:
                         # ignore access and egress walk
-                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
-                        trip_modes[mode] = trip_modes.get(mode, 0) + distance
+                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
+                        trip_modes[mode] = trip_modes.get(mode, 0) + stage.distance
 
-                    elif stage.tag == "activity":
-                        activity = stage.get("type")
+                    else:
+                        activity = stage.type
 
                         # only add activity modes when there has been previous activity
                         # (ie trip start time) AND the activity is in specified list
@@ -407,7 +561,7 @@ class PlanActivityModes(ModeShares):
                         if not activity == "pt interaction":  # reset modes at end of trip
                             trip_modes = {}
                             # update endtime for next activity
-                            end_time = convert_time_to_seconds(stage.get("end_time"))
+                            end_time = stage.end_time
 
                 if plan_modes:
                     mode = self.get_furthest_mode(plan_modes)
@@ -419,6 +573,7 @@ class LegLogs(PlanHandlerTool):
 
     requirements = ["plans", "transit_schedule", "attributes"]
     valid_modes = ["all"]
+    partition_results = []
 
     # todo make it so that 'all' option not required (maybe for all plan handlers)
 
@@ -442,7 +597,6 @@ class LegLogs(PlanHandlerTool):
 
         self.mode = mode
         self.groupby_person_attribute = groupby_person_attribute
-        self.start_datetime = datetime.strptime("2020:4:1-00:00:00", "%Y:%m:%d-%H:%M:%S")
 
         self.activities_log = None
         self.legs_log = None
@@ -463,12 +617,20 @@ class LegLogs(PlanHandlerTool):
         activity_csv_name = f"{self.name}_activities.csv"
         legs_csv_name = f"{self.name}_legs.csv"
 
+        # times are logged in seconds and formatted as chunks are written
+        formatters = {"start": clock_times, "end": clock_times, "duration_s": float_seconds}
+
+        # coordinates and distances are logged as raw attribute strings
         self.activities_log = self.start_csv_chunk_writer(
-            activity_csv_name, write_path=write_path, compression=self.compression
+            activity_csv_name, write_path=write_path, compression=self.compression, formatters=formatters,
+            numeric=["x", "y"]
+        )
+        self.legs_log = self.start_csv_chunk_writer(
+            legs_csv_name, write_path=write_path, compression=self.compression, formatters=formatters,
+            numeric=["ox", "oy", "dx", "dy", "distance"]
         )
-        self.legs_log = self.start_csv_chunk_writer(legs_csv_name, write_path=write_path, compression=self.compression)
 
-    def process_plans(self, elem):
+    def process_person(self, person):
 
         """
         Build list of leg and activity logs (dicts) for each selected plan.
@@ -478,11 +640,11 @@ class LegLogs(PlanHandlerTool):
 
         :return: Tuple[List[dict]]
         """
-        ident = elem.get("id")
+        ident = person.ident
 
-        for plan in elem.xpath(".//plan"):
+        for plan in person.plans:
 
-            if plan.get("selected") != "no":
+            if plan.selected:
 
                 activities = []
                 legs = []
@@ -493,33 +655,31 @@ class LegLogs(PlanHandlerTool):
                 trip_seq_idx = 0
                 act_seq_idx = 0
 
-                arrival_dt = self.start_datetime
-                activity_end_dt = None
+                arrival = 0
+                activity_end = None
                 x = None
                 y = None
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "activity":
+                    if not stage.is_leg:
                         act_seq_idx += 1
 
-                        act_type = stage.get("type")
+                        act_type = stage.type
 
-                        if act_type != "pt interaction" or stage.get("end_time"):
-                            end_time_str = stage.get("end_time", "23:59:59")
-                            activity_end_dt = matsim_time_to_datetime(arrival_dt, end_time_str, self.logger, idx=ident)
+                        if act_type != "pt interaction" or stage.end_time is not None:
+                            end_time = END_OF_DAY if stage.end_time is None else stage.end_time
+                            activity_end = checked_time(arrival, end_time, self.logger, idx=ident)
                         else:
-                            activity_end_dt = (
-                                arrival_dt  # zero duration for pt interactions without an end_time attribute
-                            )
+                            activity_end = arrival  # zero duration for pt interactions without an end_time attribute
 
                         if act_type != "pt interaction":
                             trip_seq_idx += 1  # increment for a new trip idx
 
-                        duration = activity_end_dt - arrival_dt
+                        duration = activity_end - arrival
 
-                        x = stage.get("x")
-                        y = stage.get("y")
+                        x = stage.x
+                        y = stage.y
 
                         activities.append(
                             {
@@ -529,29 +689,22 @@ class LegLogs(PlanHandlerTool):
                                 "act": act_type,
                                 "x": x,
                                 "y": y,
-                                "start": arrival_dt.time(),
-                                "end": activity_end_dt.time(),
-                                "end_day": activity_end_dt.day,
+                                "start": arrival,
+                                "end": activity_end,
+                                "end_day": activity_end // DAY + 1,
                                 # 'duration': duration,
-                                "start_s": self.get_seconds(arrival_dt),
-                                "end_s": self.get_seconds(activity_end_dt),
-                                "duration_s": duration.total_seconds(),
+                                "start_s": arrival,
+                                "end_s": activity_end,
+                                "duration_s": duration,
                             }
                         )
 
-                    elif stage.tag == "leg":
+                    else:
                         leg_seq_idx += 1
 
-                        leg_mode = stage.get("mode")
-                        route_elem = stage.xpath("route")[0]
-                        mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
-                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
-
-                        trav_time = stage.get("trav_time")
-                        h, m, s = trav_time.split(":")
-                        td = timedelta(hours=int(h), minutes=int(m), seconds=int(s))
+                        mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
 
-                        arrival_dt = activity_end_dt + td
+                        arrival = activity_end + stage.trav_time
 
                         legs.append(
                             {
@@ -566,14 +719,14 @@ class LegLogs(PlanHandlerTool):
                                 "dy": None,
                                 "o_act": act_type,
                                 "d_act": None,
-                                "start": activity_end_dt.time(),
-                                "end": arrival_dt.time(),
-                                "end_day": arrival_dt.day,
-                                # 'duration': td,
-                                "start_s": self.get_seconds(activity_end_dt),
-                                "end_s": self.get_seconds(arrival_dt),
-                                "duration_s": td.total_seconds(),
-                                "distance": route_elem.get("distance"),
+                                "start": activity_end,
+                                "end": arrival,
+                                "end_day": arrival // DAY + 1,
+                                # 'duration': trav_time,
+                                "start_s": activity_end,
+                                "end_s": arrival,
+                                "duration_s": stage.trav_time,
+                                "distance": stage.route_distance,
                             }
                         )
 
@@ -594,25 +747,13 @@ class LegLogs(PlanHandlerTool):
         self.activities_log.finish()
         self.legs_log.finish()
 
-    @staticmethod
-    def get_seconds(dt: datetime) -> int:
-        """
-        Extract time of day in seconds from datetime.
-        :param dt: datetime
-        :return: int, seconds
-        """
-        d = dt.day
-        h = dt.hour
-        m = dt.minute
-        s = dt.second
-        return s + (60 * (m + (60 * (h + ((d - 1) * 24)))))
-
 
 class TripLogs(PlanHandlerTool):
 
     requirements = ["plans", "transit_schedule", "attributes"]
     # mode and purpose options need to be enabled for post-processing cross tabulation w euclidian distance
     valid_modes = ["all"]
+    partition_results = []
 
     # TODO make it so that 'all' option not required (maybe for all plan handlers)
 
@@ -636,7 +777,6 @@ class TripLogs(PlanHandlerTool):
 
         self.mode = mode
         self.groupby_person_attribute = groupby_person_attribute
-        self.start_datetime = datetime.strptime("2020:4:1-00:00:00", "%Y:%m:%d-%H:%M:%S")
 
         self.activities_log = None
         self.trips_log = None
@@ -657,14 +797,22 @@ class TripLogs(PlanHandlerTool):
         activity_csv_name = f"{self.name}_activities.csv"
         trips_csv_name = f"{self.name}_trips.csv"
 
+        # times are logged in seconds and formatted as chunks are written
+        formatters = {
+            "start": clock_times, "end": clock_times, "duration": durations, "duration_s": float_seconds
+        }
+
+        # coordinates are logged as raw attribute strings
         self.activities_log = self.start_csv_chunk_writer(
-            activity_csv_name, write_path=write_path, compression=self.compression
+            activity_csv_name, write_path=write_path, compression=self.compression, formatters=formatters,
+            numeric=["x", "y"]
         )
         self.trips_log = self.start_csv_chunk_writer(
-            trips_csv_name, write_path=write_path, compression=self.compression
+            trips_csv_name, write_path=write_path, compression=self.compression, formatters=formatters,
+            numeric=["ox", "oy", "dx", "dy"]
         )
 
-    def process_plans(self, elem):
+    def process_person(self, person):
 
         """
         Build list of trip and activity logs (dicts) for each selected plan.
@@ -674,53 +822,51 @@ class TripLogs(PlanHandlerTool):
 
         :return: Tuple[List[dict]]
         """
-        ident = elem.get("id")
+        ident = person.ident
 
-        for plan in elem.xpath(".//plan"):
+        for plan in person.plans:
 
             attribute = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
 
-            if plan.get("selected") != "no":
+            if plan.selected:
 
                 # check that plan starts with an activity
-                if not plan[0].tag == "activity":
+                if plan.stages[0].is_leg:
                     raise UserWarning("Plan does not start with activity.")
-                if plan[0].get("type") == "pt interaction":
+                if plan.stages[0].type == "pt interaction":
                     raise UserWarning('Plan cannot start with activity type "pt interaction".')
 
                 activities = []
                 trips = []
                 act_seq_idx = 0
 
-                activity_start_dt = self.start_datetime
-                activity_end_dt = self.start_datetime
-                # todo replace this start datetime with a real start datetime using config
+                activity_start = 0
+                activity_end = 0
+                # todo replace this start time with a real start datetime using config
 
                 x = None
                 y = None
                 modes = {}
                 trip_distance = 0
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "activity":
-                        act_type = stage.get("type")
+                    if not stage.is_leg:
+                        act_type = stage.type
 
                         if not act_type == "pt interaction":
 
                             act_seq_idx += 1  # increment for a new trip idx
-                            trip_duration = activity_start_dt - activity_end_dt
+                            trip_duration = activity_start - activity_end
 
-                            end_time_str = stage.get("end_time", "23:59:59")
+                            end_time = END_OF_DAY if stage.end_time is None else stage.end_time
 
-                            activity_end_dt = matsim_time_to_datetime(
-                                activity_start_dt, end_time_str, self.logger, idx=ident
-                            )
+                            activity_end = checked_time(activity_start, end_time, self.logger, idx=ident)
 
-                            activity_duration = activity_end_dt - activity_start_dt
+                            activity_duration = activity_end - activity_start
 
-                            x = stage.get("x")
-                            y = stage.get("y")
+                            x = stage.x
+                            y = stage.y
 
                             if modes:  # add to trips log
 
@@ -738,12 +884,12 @@ class TripLogs(PlanHandlerTool):
                                         "d_act": act_type,
                                         "start": activities[-1]["end"],
                                         "start_day": activities[-1]["end_day"],
-                                        "end": activity_start_dt.time(),
-                                        "end_day": activity_start_dt.day,
+                                        "end": activity_start,
+                                        "end_day": activity_start // DAY + 1,
                                         "start_s": activities[-1]["end_s"],
-                                        "end_s": self.get_seconds(activity_start_dt),
+                                        "end_s": activity_start,
                                         "duration": trip_duration,
-                                        "duration_s": trip_duration.total_seconds(),
+                                        "duration_s": trip_duration,
                                         "distance": trip_distance,
                                     }
                                 )
@@ -759,55 +905,42 @@ class TripLogs(PlanHandlerTool):
                                     "act": act_type,
                                     "x": x,
                                     "y": y,
-                                    "start": activity_start_dt.time(),
-                                    "start_day": activity_start_dt.day,
-                                    "end": activity_end_dt.time(),
-                                    "end_day": activity_end_dt.day,
-                                    "start_s": self.get_seconds(activity_start_dt),
-                                    "end_s": self.get_seconds(activity_end_dt),
+                                    "start": activity_start,
+                                    "start_day": activity_start // DAY + 1,
+                                    "end": activity_end,
+                                    "end_day": activity_end // DAY + 1,
+                                    "start_s": activity_start,
+                                    "end_s": activity_end,
                                     "duration": activity_duration,
-                                    "duration_s": activity_duration.total_seconds(),
+                                    "duration_s": activity_duration,
                                 }
                             )
 
-                            activity_start_dt = activity_end_dt
+                            activity_start = activity_end
 
                         # if a 'pt interaction' activity has duration (ie it has an 'end_time' attribute)
                         # then advance the next activity start time accordingly
-                        elif stage.get("end_time"):
-                            end_time_str = stage.get("end_time")
+                        elif stage.end_time is not None:
 
-                            activity_start_dt = matsim_time_to_datetime(
-                                activity_start_dt, end_time_str, self.logger, idx=ident
-                            )
-
-                    elif stage.tag == "leg":
+                            activity_start = checked_time(activity_start, stage.end_time, self.logger, idx=ident)
 
-                        leg_mode = stage.get("mode")
+                    else:
 
-                        # check for route elements. these are used to infer modes when analyzing output plans
+                        # check for routes. these are used to infer modes when analyzing output plans
                         # routes do not exist when analysing input plans (except when they are also simulation outputs)
-                        route_elem = stage.xpath("route")
-                        if route_elem:  # is not [], use route info
-                            route_elem = route_elem[0]
-
-                            distance = float(route_elem.get("distance", 0))
-
-                            mode = self.extract_mode_from_route_elem(leg_mode, route_elem)
+                        if stage.distance is not None:  # use route info
+                            distance = stage.distance
 
-                            mode = {"egress_walk": "walk", "access_walk": "walk"}.get(mode, mode)
+                            mode = {"egress_walk": "walk", "access_walk": "walk"}.get(stage.route_mode, stage.route_mode)
                             trip_distance += distance
                         else:  # use leg info
-                            mode = leg_mode
+                            mode = stage.mode
                             distance = 0  # don't know distances for unrouted trips
 
                         # update mode dictionary with leg or route information
                         modes[mode] = modes.get(mode, 0) + distance
 
-                        trav_time = stage.get("trav_time")
-                        h, m, s = trav_time.split(":")
-                        td = timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-                        activity_start_dt += td
+                        activity_start += stage.trav_time
 
                 self.activities_log.add(activities)
                 self.trips_log.add(trips)
@@ -819,24 +952,12 @@ class TripLogs(PlanHandlerTool):
         self.activities_log.finish()
         self.trips_log.finish()
 
-    @staticmethod
-    def get_seconds(dt: datetime) -> int:
-        """
-        Extract time of day in seconds from datetime.
-        :param dt: datetime
-        :return: int, seconds
-        """
-        d = dt.day
-        h = dt.hour
-        m = dt.minute
-        s = dt.second
-        return s + (60 * (m + (60 * (h + ((d - 1) * 24)))))
-
 
 class UtilityLogs(PlanHandlerTool):
 
     requirements = ["plans"]
     valid_modes = ["all"]
+    partition_results = []
 
     # todo make it so that 'all' option not required (maybe for all plan handlers)
 
@@ -864,11 +985,12 @@ class UtilityLogs(PlanHandlerTool):
 
         utility_csv_name = f"{self.name}.csv"
 
+        # scores are logged as raw attribute strings
         self.utility_log = self.start_csv_chunk_writer(
-            utility_csv_name, write_path=write_path, compression=self.compression
+            utility_csv_name, write_path=write_path, compression=self.compression, numeric=["score"]
         )
 
-    def process_plans(self, elem):
+    def process_person(self, person):
 
         """
         Build list of the utility of the selected plan for each agent.
@@ -876,13 +998,13 @@ class UtilityLogs(PlanHandlerTool):
         :return: Tuple[List[dict]]
         """
 
-        ident = elem.get("id")
+        ident = person.ident
 
-        for plan in elem.xpath(".//plan"):
+        for plan in person.plans:
 
-            if plan.get("selected") != "no":
+            if plan.selected:
 
-                score = plan.get("score")
+                score = plan.score
                 utilities = [{"agent": ident, "score": score}]
                 self.utility_log.add(utilities)
 
@@ -910,6 +1032,7 @@ class PlanLogs(PlanHandlerTool):
     """
 
     requirements = ["plans", "attributes"]
+    partition_results = []
 
     def __init__(self, config, mode="all", groupby_person_attribute="subpopulation", **kwargs):
         """
@@ -942,7 +1065,7 @@ class PlanLogs(PlanHandlerTool):
         csv_name = f"{self.name}.csv"
         self.plans_log = self.start_csv_chunk_writer(csv_name, write_path=write_path, compression=self.compression)
 
-    def process_plans(self, elem):
+    def process_person(self, person):
 
         """
         Build list of leg logs (dicts) for each selected plan.
@@ -953,20 +1076,20 @@ class PlanLogs(PlanHandlerTool):
         :return: Tuple[List[dict]]
         """
 
-        ident = elem.get("id")
+        ident = person.ident
         attribute = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
 
         if not self.mode == "all" and not attribute == self.mode:
             return None
 
-        for pidx, plan in enumerate(elem.xpath(".//plan")):
+        for pidx, plan in enumerate(person.plans):
 
-            selected = str(plan.get("selected"))
-            score = float(plan.get("score", 0))
+            selected = str(plan.selection)
+            score = float(0 if plan.score is None else plan.score)
 
             trip_records = []
             trip_seq = 0
-            arrival_dt = None
+            arrival = None
             in_transit = False
             trip_start_time = None
             prev_mode = "NA"
@@ -975,23 +1098,24 @@ class PlanLogs(PlanHandlerTool):
             prev_x = None
             prev_y = None
 
-            for stage in plan:
+            for stage in plan.stages:
 
-                if stage.tag == "activity":
-                    act_type = stage.get("type")
+                if not stage.is_leg:
+                    act_type = stage.type
 
                     if not act_type == "pt interaction":
 
-                        end_time_str = stage.get("end_time", "23:59:59")
+                        end_time = END_OF_DAY if stage.end_time is None else stage.end_time
 
-                        activity_end_dt = matsim_time_to_datetime(arrival_dt, end_time_str, self.logger, idx=ident)
+                        activity_end = checked_time(arrival, end_time, self.logger, idx=ident)
 
-                        duration, arrival_dt = safe_duration(arrival_dt, activity_end_dt)
+                        # duration as time of day, assuming start of day if there is no previous arrival
+                        duration = (activity_end - (0 if arrival is None else arrival)) % DAY
 
                         # MATSim BUG: first activity location may not be recorded
-                        # Use NaN to allow distance() -> NaN
-                        x = float(stage.get("x", np.NaN))
-                        y = float(stage.get("y", np.NaN))
+                        # NaN allows distance() -> NaN
+                        x = float(np.NaN if stage.x is None else stage.x)
+                        y = float(np.NaN if stage.y is None else stage.y)
 
                         if trip_start_time is not None:  # ignores first activity
 
@@ -1010,13 +1134,13 @@ class PlanLogs(PlanHandlerTool):
                                     # "license": license,
                                     "plan": pidx,
                                     "seq": trip_seq,
-                                    "start": self.get_seconds(trip_start_time),
+                                    "start": trip_start_time % DAY,
                                     "distance": distance(x, y, prev_x, prev_y),
                                     "mode": trip_mode,
                                     "prev_mode": prev_mode,
                                     "origin_activity": prev_act,
                                     "destination_activity": act_type,
-                                    "act_duration": duration.seconds,
+                                    "act_duration": duration,
                                     "selected": selected,
                                     "score": score,
                                 }
@@ -1028,29 +1152,25 @@ class PlanLogs(PlanHandlerTool):
                         in_transit = False
                         prev_x = x
                         prev_y = y
-                        arrival_dt = activity_end_dt
+                        arrival = activity_end
 
                     # if a 'pt interaction' activity has duration (ie it has an 'end_time' attribute)
                     # then advance the trip arrival time accordingly
-                    elif stage.get("end_time"):
-                        end_time_str = stage.get("end_time")
+                    elif stage.end_time is not None:
 
-                        arrival_dt = matsim_time_to_datetime(arrival_dt, end_time_str, self.logger, idx=ident)
+                        arrival = checked_time(arrival, stage.end_time, self.logger, idx=ident)
 
-                elif stage.tag == "leg":
+                else:
 
-                    leg_start_time = activity_end_dt
+                    leg_start_time = activity_end
                     if not in_transit:
                         trip_start_time = leg_start_time
 
-                    leg_mode = stage.get("mode")
+                    leg_mode = stage.mode
                     if leg_mode == "pt":
                         in_transit = True
 
-                    trav_time = stage.get("trav_time")
-                    h, m, s = trav_time.split(":")
-                    td = timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-                    arrival_dt = arrival_dt + td
+                    arrival = arrival + stage.trav_time
 
             total_trips = len(trip_records)
             total_duration = sum([trip["act_duration"] for trip in trip_records])
@@ -1069,18 +1189,6 @@ class PlanLogs(PlanHandlerTool):
         """
         self.plans_log.finish()
 
-    @staticmethod
-    def get_seconds(dt: datetime) -> int:
-        """
-        Extract time of day in seconds from datetime.
-        :param dt: datetime
-        :return: int, seconds
-        """
-        h = dt.hour
-        m = dt.minute
-        s = dt.second
-        return s + (60 * (m + (60 * h)))
-
 
 class AgentTollsPaidFromRPConfig(PlanHandlerTool):
     """
@@ -1134,12 +1242,12 @@ class AgentTollsPaidFromRPConfig(PlanHandlerTool):
             columns=["agent", "subpopulation", "tollname", "link", "time", "toll"]
         )  # df for results
 
-    def process_plans(self, elem):
+    def process_person(self, person):
         """
         Iteratively check whether agent pays toll as part of their car trip and append to log.
-        :param elem: Plan XML element
+        :param person: Person record
         """
-        ident = elem.get("id")
+        ident = person.ident
         attribute = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
         agent_in_tolled_space = [0, 0]  # {trip marker, whether last link was tolled}
 
@@ -1156,18 +1264,17 @@ class AgentTollsPaidFromRPConfig(PlanHandlerTool):
                 if time < elem.get("end_time"):
                     return elem.get("amount")
 
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                for stage in plan:
-                    if stage.tag == "leg":
-                        mode = stage.get("mode")
-                        start_time = stage.get("dep_time")
+                for stage in plan.stages:
+                    if stage.is_leg:
+                        mode = stage.mode
+                        start_time = stage.dep_time
                         if not mode == self.mode:
                             continue
-                        route = stage.xpath("route")[0].text.split(" ")
 
-                        for i, link in enumerate(route):
+                        for i, link in enumerate(stage.links):
                             if link in self.roadpricing.links:
                                 current_link_tolled = True
                             else:
@@ -1263,24 +1370,24 @@ class AgentHighwayDistanceLogs(PlanHandlerTool):
         # Initialise results array
         self.distances = np.zeros((len(self.agent_ids), len(self.ways)))
 
-    def process_plans(self, elem):
+    def process_person(self, person):
         """
         Iteratively aggregate distance on highway distances from legs of selected plans.
-        :param elem: Plan XML element
+        :param person: Person record
         """
-        ident = elem.get("id")
+        ident = person.ident
 
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "leg":
-                        mode = stage.get("mode")
+                    if stage.is_leg:
+                        mode = stage.mode
                         if not mode == self.mode:
                             continue
 
-                        route = stage.xpath("route")[0].text.split(" ")
+                        route = stage.links
                         length = len(route)
                         for i, link in enumerate(route):
                             way = str(self.osm_ways.ways.get(link, None))
@@ -1341,6 +1448,7 @@ class TripHighwayDistanceLogs(PlanHandlerTool):
 
     requirements = ["plans", "osm_ways", "attributes"]
     valid_modes = ["car"]
+    partition_results = []
 
     def __init__(self, config, mode="all", groupby_person_attribute="subpopulation", **kwargs):
         """
@@ -1379,25 +1487,25 @@ class TripHighwayDistanceLogs(PlanHandlerTool):
         csv_name = f"{self.name}.csv"
         self.distances_log = self.start_csv_chunk_writer(csv_name, write_path=write_path, compression=self.compression)
 
-    def process_plans(self, elem):
+    def process_person(self, person):
         """
         Iteratively aggregate distance on highway distances from legs of selected plans.
-        :param elem: Plan XML element
+        :param person: Person record
         """
-        ident = elem.get("id")
+        ident = person.ident
         attribute = self.attributes.get(ident, {}).get(self.groupby_person_attribute, None)
 
-        for plan in elem.xpath(".//plan"):
-            if plan.get("selected") != "no":
+        for plan in person.plans:
+            if plan.selected:
 
                 trips = []
                 trip_counter = None
                 trip_seq_idx = 0
 
-                for stage in plan:
+                for stage in plan.stages:
 
-                    if stage.tag == "activity":
-                        if not stage.get("type") == "pt interaction":
+                    if not stage.is_leg:
+                        if not stage.type == "pt interaction":
 
                             if trip_counter is not None:
                                 # record previous counts and move idx
@@ -1410,12 +1518,12 @@ class TripHighwayDistanceLogs(PlanHandlerTool):
                             trip_counter = {"agent": ident, "subpop": attribute, "seq": trip_seq_idx}
                             trip_counter.update({k: 0 for k in self.ways})
 
-                    if stage.tag == "leg":
-                        mode = stage.get("mode")
+                    if stage.is_leg:
+                        mode = stage.mode
                         if not mode == self.mode:
                             continue
 
-                        route = stage.xpath("route")[0].text.split(" ")
+                        route = stage.links
                         length = len(route)
                         for i, link in enumerate(route):
                             way = str(self.osm_ways.ways.get(link, None))
@@ -1442,6 +1550,10 @@ class PlanHandlerWorkStation(WorkStation):
     # allows handler to be subclassed by overriding
     plans_resource = "plans"
 
+    concurrent_build = True
+    parallel_build = 1
+    cache_results = True
+
     tools = {
         "trip_modes": TripModes,
         "trip_activity_modes": TripActivityModes,
@@ -1456,10 +1568,99 @@ class PlanHandlerWorkStation(WorkStation):
         "toll_logs": AgentTollsPaidFromRPConfig,
     }
 
+    # approximate size (bytes of xml) of the blocks of persons handed to workers
+    block_size = ELEM_BLOCK_SIZE
+
+    plan_decoder = None
+
     def __init__(self, config):
         super().__init__(config)
         self.logger = logging.getLogger(__name__)
 
+    def process_plans(self, persons, handlers: Optional[dict] = None) -> None:
+        """
+        Decode persons and hand them to handlers, in order.
+        :param persons: iterable of person elements
+        :param handlers: Optional dict of handlers, defaults to all handlers (.resources)
+        :return: None
+        """
+        handlers = list((self.resources if handlers is None else handlers).values())
+        base = 1
+
+        for i, person in enumerate(persons):
+
+            if not (i + 1) % base:
+                self.logger.info(f"parsed {i + 1} persons plans")
+                base *= 2
+
+            record = self.plan_decoder.decode(person)
+            for plan_handler in handlers:
+                plan_handler.process_person(record)
+
+    def process_plans_parallel(self, plans) -> None:
+        """
+        Process plans using worker processes. The (decompressed) plans are split into blocks of whole
+        persons, without parsing, and each block is parsed and processed by replicas of the parallel
+        capable handlers in a worker. Replica results are merged back in person order: chunk writer
+        lines are passed on and accumulated results are merged (handler.merge()).
+        Handlers that do not support parallel processing process all persons in the main process.
+        :param plans: built Plans input tool
+        :return: None
+        """
+        global _partition_handlers, _partition_plans, _partition_decoder
+
+        parallel_handlers = {name: h for name, h in self.resources.items() if h.partition_results is not None}
+        serial_handlers = {name: h for name, h in self.resources.items() if h.partition_results is None}
+        if serial_handlers:
+            self.logger.info(f"Handlers processed in main process: {list(serial_handlers)}")
+        if not parallel_handlers:
+            self.logger.warning("No handlers support parallel processing, continuing without workers")
+            return self.process_plans(plans.persons)
+
+        _partition_handlers = parallel_handlers
+        _partition_plans = plans
+        _partition_decoder = self.plan_decoder
+        pool = parallel.fork_pool(self.config.workers)
+        if pool is None:
+            return self.process_plans(plans.persons)
+
+        tmp_dir = tempfile.mkdtemp(prefix="elara-")
+        try:
+            with pool:
+                # limit blocks held in memory by waiting on the oldest block when enough are queued
+                pending = deque()
+                for index, (header, block, footer) in enumerate(plans.person_blocks(self.block_size)):
+                    pending.append(pool.apply_async(process_plans_block, ((index, header, block, footer, tmp_dir),)))
+                    if serial_handlers:
+                        for person in plans.block_persons(header, block, footer):
+                            record = self.plan_decoder.decode(person)
+                            for plan_handler in serial_handlers.values():
+                                plan_handler.process_person(record)
+                    self.logger.info(f"parsed block {index + 1} of persons plans")
+                    while len(pending) > 2 * self.config.workers:
+                        self.merge_partition(parallel_handlers, *pending.popleft().get())
+                while pending:
+                    self.merge_partition(parallel_handlers, *pending.popleft().get())
+        finally:
+            _partition_handlers = None
+            _partition_plans = None
+            _partition_decoder = None
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def merge_partition(self, handlers: dict, spool_path: str, results_path: str) -> None:
+        """
+        Merge the outputs of a block worker into the handlers.
+        :param handlers: dict of handlers processed by the worker
+        :param spool_path: worker spool file path string
+        :param results_path: worker results file path string
+        :return: None
+        """
+        parallel.replay_spool(spool_path, handlers)
+        for name, results in parallel.read_results(results_path).items():
+            handlers[name].merge(results)
+        os.remove(spool_path)
+        os.remove(results_path)
+
     def build(self, write_path=None):
         """
         Build all required handlers, then finalise and save results.
@@ -1472,20 +1673,16 @@ class PlanHandlerWorkStation(WorkStation):
 
         # build tools
         super().build()
+        self.plan_decoder = PlanDecoder(self.config, self.supplier_resources)
 
         # iterate through plans
         plans = self.supplier_resources[self.plans_resource]
         self.logger.info(" *** Commencing Plans Iteration ***")
-        base = 1
-
-        for i, person in enumerate(plans.persons):
-
-            if not (i + 1) % base:
-                self.logger.info(f"parsed {i + 1} persons plans")
-                base *= 2
 
-            for plan_handler in self.resources.values():
-                plan_handler.process_plans(person)
+        if self.config.workers > 1:
+            self.process_plans_parallel(plans)
+        else:
+            self.process_plans(plans.persons)
 
         self.logger.info("***Completed Plan Iteration***")
 
@@ -1505,13 +1702,53 @@ class PlanHandlerWorkStation(WorkStation):
 
                 for name, result in handler.results.items():
                     csv_name = "{}.csv".format(name)
-                    self.write_csv(result, csv_name, write_path=write_path, compression=handler.compression)
+                    handler.record_output(
+                        self.write_csv(result, csv_name, write_path=write_path, compression=handler.compression)
+                    )
                     del result
 
 
+# handlers to replicate, plans input and person decoder in block workers, set before forking workers
+_partition_handlers = None
+_partition_plans = None
+_partition_decoder = None
+
+
+def process_plans_block(task: tuple) -> Tuple[str, str]:
+    """
+    Worker process: parse and process a block of persons with replicas of the parallel capable
+    handlers. Lines written by replicas are spooled for the main process. Accumulated results are
+    written to a results file.
+    :param task: (block index, header, block, footer, tmp directory)
+    :return: (spool path, results path)
+    """
+    index, header, block, footer, tmp_dir = task
+
+    spool_path = os.path.join(tmp_dir, f"block-{index}.spool")
+    results_path = os.path.join(tmp_dir, f"block-{index}.pkl")
+    spool = parallel.Spool(spool_path)
+    replicas = {
+        name: parallel.replicate(handler, spool, name) for name, handler in _partition_handlers.items()
+    }
+    handlers = list(replicas.values())
+
+    for person in _partition_plans.block_persons(header, block, footer):
+        record = _partition_decoder.decode(person)
+        for plan_handler in handlers:
+            plan_handler.process_person(record)
+    spool.close()
+
+    parallel.write_results(results_path, {
+        name: {attribute: getattr(replica, attribute) for attribute in replica.partition_results}
+        for name, replica in replicas.items()
+    })
+    return spool_path, results_path
+
+
+@lru_cache(maxsize=None)
 def convert_time_to_seconds(t: str) -> Optional[int]:
     """
-    Convert MATSim output plan times into seconds.
+    Convert MATSim output plan times into seconds. Memoized, as plans repeat the same time strings.
     If t is None, must return None.
     :param t: MATSim str time
     :return: seconds int
@@ -1522,65 +1759,58 @@ def convert_time_to_seconds(t: str) -> Optional[int]:
     return ((int(t[0]) * 60) + int(t[1])) * 60 + int(t[2])
 
 
-def export_geojson(gdf, path):
-    """
-    Given a geodataframe, export geojson representation to specified path.
-    :param gdf: Input geodataframe
-    :param path: Output path
+def checked_time(current_time: Optional[int], new_time: int, logger=None, idx=None) -> int:
     """
-    with open(path, "w") as file:
-        file.write(gdf.to_json())
-
-
-def matsim_time_to_datetime(
-    current_time: datetime,
-    new_time_str: str,
-    logger=None,
-    idx=None,
-    base_year=2020,
-    base_month=4,
-    base_day=1,
-) -> datetime:
-    """
-    Function to convert matsim time strings (hours,  minutes and seconds since start)
-    to datetime objects (days, hours, minutes, seconds).
-    Raises a warning for backward time steps. To remmove backward time steps, consider
-    using the 'non_wrapping_datetime' method which has the same arguments.
-    :param current_time: datetime from previous event
-    :param new_time_str: new time string
+    Return a new plan time (seconds since start), logging backward time steps and times beyond the
+    first day.
+    :param current_time: previous time (seconds), None for start of day
+    :param new_time: new time (seconds)
     :param logger: optional logger
     :param idx: optional idx
-    :param base_year: int default=2020,
-    :param base_month: int defaul=4,
-    :param base_day: int defaul=1,
-    :return: time string, day
+    :return: new time (seconds)
     """
-    start_of_day = datetime(year=base_year, month=base_month, day=base_day, hour=0)
-    if current_time is None:
-        current_time = start_of_day
+    if logger is not None:
+        if new_time >= DAY:
+            logger.debug(f"Bad time: {new_time}s, day {new_time // DAY + 1}, idx: {idx}")
+        if current_time is not None and new_time < current_time:
+            logger.warning(f"Time Wrapping (new time:{new_time}s < previous time:{current_time}s), idx: {idx}")
+    return new_time
 
-    h, m, s = (int(i) for i in new_time_str.split(":"))
-    new_time = start_of_day + timedelta(hours=h, minutes=m, seconds=s)
 
-    if logger is not None:
-        if h > 23:
-            logger.debug(f"Bad time str: {new_time_str}, outputting: {new_time}, idx: {idx}")
-        if new_time < current_time:
-            logger.warning(f"Time Wrapping (new time:{new_time} < previous time:{current_time}), idx: {idx}")
+def clock_times(seconds: pd.Series) -> pd.Series:
+    """
+    Format times (seconds since start) as time of day strings (HH:MM:SS), for a whole chunk.
+    :param seconds: pd.Series of seconds
+    :return: pd.Series of strings
+    """
+    return pd.to_datetime(seconds % DAY, unit="s").dt.strftime("%H:%M:%S")
 
-    return new_time
 
+def durations(seconds: pd.Series) -> pd.Series:
+    """
+    Convert durations (seconds) to timedeltas, for a whole chunk.
+    :param seconds: pd.Series of seconds
+    :return: pd.Series of timedeltas
+    """
+    return pd.to_timedelta(seconds, unit="s")
 
-def safe_duration(start_time, end_time):
+
+def float_seconds(seconds: pd.Series) -> pd.Series:
+    """
+    Convert durations (seconds) to floats, for a whole chunk.
+    :param seconds: pd.Series of seconds
+    :return: pd.Series of floats
+    """
+    return seconds.astype(float)
+
+
+def export_geojson(gdf, path):
     """
-    Duration calculation that can cope with None as starting time. In which case assumes start time at start
-    of day (00:00:00).
-    Returns tuple(datetime.timedelta, datetime.datetime)
+    Given a geodataframe, export geojson representation to specified path, in row chunks.
+    :param gdf: Input geodataframe
+    :param path: Output path
     """
-    if start_time is None:
-        start_time = datetime(year=end_time.year, month=end_time.month, day=end_time.day, hour=0)
-        return timedelta(hours=end_time.hour, minutes=end_time.minute, seconds=end_time.second), start_time
-    return end_time - start_time, start_time
+    write_spatial(gdf, path)
 
 
 def distance(x, y, prev_x, prev_y):
@@ -4,7 +4,7 @@ import pandas as pd
 import logging
 from matplotlib import axes, pyplot as plt
 
-from elara.factory import WorkStation, Tool
+from elara.factory import WorkStation, Tool, spatial_name, write_spatial
 
 
 class PostProcessor(Tool):
@@ -72,13 +72,8 @@ class PlanTimeSummary(PostProcessor):
     def build(self, resource: dict, write_path=None):
         super().build(resource, write_path=write_path)
 
-        file_name = f"leg_logs_{self.mode}_legs.csv"
-        file_path = os.path.join(self.config.output_path, file_name)
-        legs_df = pd.read_csv(file_path, index_col=0)
-
-        file_name = f"leg_logs_{self.mode}_activities.csv"
-        file_path = os.path.join(self.config.output_path, file_name)
-        activity_df = pd.read_csv(file_path, index_col=0)
+        legs_df = self.read_csv(f"leg_logs_{self.mode}_legs.csv", index_col=0)
+        activity_df = self.read_csv(f"leg_logs_{self.mode}_activities.csv", index_col=0)
 
         leg_figure = self.plot_time_bins(legs_df, 'mode')
         leg_figure.suptitle("Travel Time Bins")
@@ -164,9 +159,7 @@ class TripDurationBreakdown(PostProcessor):
         super().build(resource, write_path=write_path)
 
         # read trip logs
-        file_name = f"trip_logs_{self.mode}_trips.csv"
-        file_path = os.path.join(self.config.output_path, file_name)
-        trips_df = pd.read_csv(file_path)
+        trips_df = self.read_csv(f"trip_logs_{self.mode}_trips.csv")
 
         cross_tab_dict = {"mode": trips_df["mode"],
                             "d_act": trips_df["d_act"],
@@ -200,9 +193,7 @@ class TripEuclidDistanceBreakdown(PostProcessor):
         mode = self.mode
 
         # read trip logs
-        file_name = f"trip_logs_{self.mode}_trips.csv"
-        file_path = os.path.join(self.config.output_path, file_name)
-        trips_df = pd.read_csv(file_path)
+        trips_df = self.read_csv(f"trip_logs_{self.mode}_trips.csv")
 
         # euclidean distance breakdown
         trips_df['euclidean_distance'] = ((trips_df.ox - trips_df.dx) ** 2 + (trips_df.oy - trips_df.dy) ** 2) ** 0.5
@@ -234,26 +225,39 @@ class VKT(PostProcessor):
         super().build(resource, write_path=write_path)
 
         if self.groupby_person_attribute:
-            file_name = f"link_vehicle_counts_{self.mode}_{self.groupby_person_attribute}.geojson"
-            file_path = os.path.join(self.config.output_path, file_name)
-            volumes_gdf = geopandas.read_file(file_path)
-            vkt_gdf = self.calculate_vkt(volumes_gdf)
-
-            csv_name = f"{self.name}_{self.groupby_person_attribute}.csv"
-            geojson_name = f"{self.name}_{self.groupby_person_attribute}.geojson"
-
-            self.write_csv(vkt_gdf, csv_name, write_path=write_path, compression=self.compression)
-            self.write_geojson(vkt_gdf, geojson_name, write_path=write_path)
+            vkt_gdf = self.calculate_vkt(
+                self.load_volumes(f"link_vehicle_counts_{self.mode}_{self.groupby_person_attribute}")
+            )
+            self.write_vkt(vkt_gdf, f"{self.name}_{self.groupby_person_attribute}", write_path)
 
-        file_name = f"link_vehicle_counts_{self.mode}.geojson"
-        file_path = os.path.join(self.config.output_path, file_name)
-        volumes_gdf = geopandas.read_file(file_path)
-        vkt_gdf = self.calculate_vkt(volumes_gdf)
+        vkt_gdf = self.calculate_vkt(self.load_volumes(f"link_vehicle_counts_{self.mode}"))
+        self.write_vkt(vkt_gdf, self.name, write_path)
 
-        csv_name = f"{self.name}.csv"
-        geojson_name = f"{self.name}.geojson"
-        self.write_csv(vkt_gdf, csv_name, write_path=write_path, compression=self.compression)
-        self.write_geojson(vkt_gdf, geojson_name, write_path=write_path)
+    def load_volumes(self, name: str) -> pd.DataFrame:
+        """
+        Load link volume counts output with link lengths. When geometries are written separately
+        (see Config.geometry_format), lengths are joined from the network links geometry output.
+        :param name: link volume counts output name, without extension
+        :return: (geo)dataframe
+        """
+        if not self.separate_geometry:
+            file_name = spatial_name(f"{name}.geojson", self.spatial_format)
+            file_path = os.path.join(self.config.output_path, file_name)
+            return geopandas.read_file(file_path)
+
+        volumes_df = self.read_csv(f"{name}.csv", index_col=0)
+        links_df = self.read_geometry("network_links")[["link_id", "length"]]
+        volumes_df["link_id"] = volumes_df["link_id"].astype(str)
+        links_df["link_id"] = links_df["link_id"].astype(str)
+        return volumes_df.merge(links_df, on="link_id", how="left")
+
+    def write_vkt(self, vkt_df: pd.DataFrame, name: str, write_path=None):
+        if not self.separate_geometry:
+            self.write_csv(vkt_df, f"{name}.csv", write_path=write_path, compression=self.compression)
+            self.write_geojson(vkt_df, f"{name}.geojson", write_path=write_path)
+            return
+        vkt_df = vkt_df.drop(columns="length")
+        self.write_csv(vkt_df, f"{name}.csv", write_path=write_path, compression=self.compression)
 
     def calculate_vkt(self, link_volume_counts):
         """
@@ -277,16 +281,18 @@ def generate_period_headers(time_periods):
 
 def export_geojson(gdf, path):
     """
-    Given a geodataframe, export geojson representation to specified path.
+    Given a geodataframe, export geojson representation to specified path, in row chunks.
     :param gdf: Input geodataframe
     :param path: Output path
     """
-    with open(path, "w") as file:
-        file.write(gdf.to_json())
+    write_spatial(gdf, path)
 
 
 class PostProcessWorkStation(WorkStation):
 
+    concurrent_build = True
+    cache_results = True
+
     tools = {
         'plan_summary': PlanTimeSummary,
         #'trip_logs': AgentTripLogs,
@@ -0,0 +1,205 @@
+import logging
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# resources key of the registry shared by all tools built from the same resources
+REGISTRY_KEY = "id_registry"
+
+# defaults for vehicles not found in the transit schedule or transit vehicles inputs
+DEFAULT_MODE = "car"
+DEFAULT_ROUTE = "unknown_route"
+DEFAULT_CAPACITY = 5.0
+
+
+class IdIndex:
+    """
+    Dense integer index of string ids, in order of first appearance.
+    """
+
+    def __init__(self, ids: Iterable = ()) -> None:
+        self.ids = []
+        self.indices = {}
+        for ident in ids:
+            self.intern(ident)
+
+    def intern(self, ident) -> int:
+        """
+        Return the index of an id, adding it to the index if new.
+        :param ident: id
+        :return: int
+        """
+        index = self.indices.get(ident)
+        if index is None:
+            index = len(self.ids)
+            self.indices[ident] = index
+            self.ids.append(ident)
+        return index
+
+    def get(self, ident, default=None) -> Optional[int]:
+        return self.indices.get(ident, default)
+
+    def __contains__(self, ident) -> bool:
+        return ident in self.indices
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class IdRegistry:
+    """
+    Registry of dense integer codes for the vehicle, person, link and stop ids of the inputs.
+    Built once from the Network, TransitSchedule, TransitVehicles and Attributes inputs (where
+    available) and shared by all tools built from the same resources.
+    Vehicles include persons, as (car) vehicles share the id of their driver. Per vehicle arrays of
+    mode code, route code, capacity and attribute class index let event handlers turn an event into
+    array indices with a single dict lookup.
+    """
+
+    def __init__(self, resources: dict) -> None:
+        """
+        Build registry from input resources.
+        :param resources: dict, supplier resources
+        """
+        self.logger = logging.getLogger(__name__)
+
+        network = resources.get("network")
+        schedule = resources.get("transit_schedule")
+        transit_vehicles = resources.get("transit_vehicles")
+        attributes = resources.get("attributes")
+
+        veh_to_mode_map = getattr(schedule, "veh_to_mode_map", None) or {}
+        veh_to_route_map = getattr(schedule, "veh_to_route_map", None) or {}
+        veh_id_veh_type_map = getattr(transit_vehicles, "veh_id_veh_type_map", None) or {}
+        veh_type_capacity_map = getattr(transit_vehicles, "veh_type_capacity_map", None) or {}
+        self.attributes = getattr(attributes, "attributes", None) or {}
+
+        link_gdf = getattr(network, "link_gdf", None)
+        self.links = IdIndex(link_gdf.index if link_gdf is not None else ())
+        stop_gdf = getattr(schedule, "stop_gdf", None)
+        self.stops = IdIndex(stop_gdf.index if stop_gdf is not None else ())
+        self.persons = IdIndex(self.attributes)
+
+        self.vehicles = IdIndex(self.persons.ids)
+        for vehicle_ids in [veh_to_mode_map, veh_to_route_map, veh_id_veh_type_map]:
+            for vehicle_id in vehicle_ids:
+                self.vehicles.intern(vehicle_id)
+
+        self.modes = IdIndex([DEFAULT_MODE])
+        self.default_mode_code = self.modes.indices[DEFAULT_MODE]
+        self.vehicle_modes = np.full(len(self.vehicles), self.default_mode_code, dtype=np.int32)
+        for vehicle_id, mode in veh_to_mode_map.items():
+            self.vehicle_modes[self.vehicles.indices[vehicle_id]] = self.modes.intern(mode)
+
+        self.routes = IdIndex()
+        self.vehicle_routes = np.full(len(self.vehicles), -1, dtype=np.int32)
+        for vehicle_id, route in veh_to_route_map.items():
+            self.vehicle_routes[self.vehicles.indices[vehicle_id]] = self.routes.intern(route)
+
+        self.vehicle_capacities = np.full(len(self.vehicles), DEFAULT_CAPACITY)
+        for vehicle_id, veh_type in veh_id_veh_type_map.items():
+            self.vehicle_capacities[self.vehicles.indices[vehicle_id]] = veh_type_capacity_map[veh_type]
+
+        self._vehicle_classes = {}
+        self._selections = {}
+
+        self.logger.debug(
+            f"Registered {len(self.vehicles)} vehicles, {len(self.persons)} persons, "
+            f"{len(self.links)} links and {len(self.stops)} stops"
+        )
+
+    @classmethod
+    def shared(cls, resources: dict) -> "IdRegistry":
+        """
+        Get the registry shared by all tools built from the given resources, building it on first use.
+        :param resources: dict, supplier resources
+        :return: IdRegistry
+        """
+        registry = resources.get(REGISTRY_KEY)
+        if registry is None:
+            registry = cls(resources)
+            resources[REGISTRY_KEY] = registry
+        return registry
+
+    def vehicle_mode(self, vehicle_id: str) -> str:
+        """
+        Given a vehicle's ID, return its mode type.
+        :param vehicle_id: Vehicle ID string
+        :return: Vehicle mode type string
+        """
+        index = self.vehicles.indices.get(vehicle_id)
+        if index is None:
+            return DEFAULT_MODE
+        return self.modes.ids[self.vehicle_modes.item(index)]
+
+    def vehicle_route(self, vehicle_id: str) -> str:
+        """
+        Given a vehicle's ID, return the ID of the route it belongs to.
+        :param vehicle_id: Vehicle ID string
+        :return: ID of the parent route
+        """
+        index = self.vehicles.indices.get(vehicle_id)
+        if index is None:
+            return DEFAULT_ROUTE
+        route = self.vehicle_routes.item(index)
+        if route < 0:
+            return DEFAULT_ROUTE
+        return self.routes.ids[route]
+
+    def vehicle_capacity(self, vehicle_id: str) -> float:
+        """
+        Given a vehicle's ID, return its capacity.
+        :param vehicle_id: Vehicle ID string
+        :return: Vehicle capacity float
+        """
+        index = self.vehicles.indices.get(vehicle_id)
+        if index is None:
+            return DEFAULT_CAPACITY
+        return self.vehicle_capacities.item(index)
+
+    def vehicle_classes(self, attribute_key: Optional[str], class_indices: dict) -> np.ndarray:
+        """
+        Get the attribute class index of each vehicle, for the given attribute key and class indices.
+        Vehicles that are not persons, or persons without the attribute, are given the index of the
+        None class.
+        :param attribute_key: person attribute key, e.g. 'subpopulation', or None
+        :param class_indices: dict of attribute class to index, including None
+        :return: np.ndarray of class indices, by vehicle index
+        """
+        key = (attribute_key, tuple(class_indices.items()))
+        classes = self._vehicle_classes.get(key)
+        if classes is None:
+            classes = np.full(len(self.vehicles), class_indices[None], dtype=np.int32)
+            if attribute_key is not None:
+                for index, person in enumerate(self.persons.ids):
+                    classes[index] = class_indices[self.attributes[person].get(attribute_key)]
+            self._vehicle_classes[key] = classes
+        return classes
+
+    def selection(
+            self,
+            kind: str,
+            key,
+            elems: Union[list, pd.DataFrame]
+    ) -> Tuple[list, dict]:
+        """
+        Get element ids and indices for a selection of links or stops, shared between all tools
+        making the same selection.
+        :param kind: element kind, 'links' or 'stops'
+        :param key: selection key, e.g. mode, None for all elements
+        :param elems: selected elements, list of ids or dataframe indexed by id, not used if the
+        selection has already been made
+        :return: (element IDs, element indices)
+        """
+        if key is None:
+            index = getattr(self, kind)
+            return index.ids, index.indices
+        if (kind, key) not in self._selections:
+            if isinstance(elems, pd.DataFrame):
+                elems = elems.index
+            index = IdIndex(elems)
+            self._selections[(kind, key)] = index.ids, index.indices
+        return self._selections[(kind, key)]
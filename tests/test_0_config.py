@@ -79,4 +79,68 @@ def test_check_xml_path():
     test_path = os.path.abspath('/not/a/real/file.xml')
     correct_path = os.path.abspath('/not/a/real/file.xml.gz')
     test_method_path = config.check_xml_path(test_path)
-    assert test_method_path == correct_path
\ No newline at end of file
+    assert test_method_path == correct_path
+
+def test_output_format_defaults_to_csv():
+    config = Config("tests/test_xml_scenario.toml")
+    assert config.output_format == "csv"
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "feather"])
+def test_valid_output_format(output_format):
+    assert Config.valid_output_format(output_format) == output_format
+
+
+def test_invalid_output_format():
+    from elara import ConfigError
+    with pytest.raises(ConfigError):
+        Config.valid_output_format("xlsx")
+
+
+def test_invalid_workers():
+    from elara import ConfigError
+    assert Config.valid_workers(4) == 4
+    for workers in [0, -1, 2.5, True, "four", None]:
+        with pytest.raises(ConfigError):
+            Config.valid_workers(workers)
+
+
+def test_geometry_format_defaults_to_joined():
+    config = Config("tests/test_xml_scenario.toml")
+    assert config.geometry_format == "joined"
+
+
+def test_invalid_geometry_format():
+    from elara import ConfigError
+    with pytest.raises(ConfigError):
+        Config.valid_geometry_format("shapefile")
+
+
+def test_invalid_spatial_format():
+    from elara import ConfigError
+    assert Config.valid_spatial_format("flatgeobuf") == "flatgeobuf"
+    with pytest.raises(ConfigError):
+        Config.valid_spatial_format("shapefile")
+
+
+def test_cache_results_requires_cache_path():
+    from elara import ConfigError
+    config = Config("tests/test_xml_scenario.toml")
+    assert not config.cache_results
+    config.settings["outputs"]["cache_results"] = True
+    config.settings["outputs"].pop("cache_path", None)
+    with pytest.raises(ConfigError):
+        config.load_required_settings()
+
+
+def test_checkpoint_intervals():
+    config = Config("tests/test_xml_scenario.toml")
+    assert config.checkpoint_events is None
+    assert config.checkpoint_minutes is None
+    assert not config.resume
+    assert Config.valid_checkpoint_interval(1000000, "checkpoint_events") == 1000000
+    assert Config.valid_checkpoint_interval(7.5, "checkpoint_minutes") == 7.5
+    from elara import ConfigError
+    for interval in [0, -10, True, "10"]:
+        with pytest.raises(ConfigError):
+            Config.valid_checkpoint_interval(interval, "checkpoint_events")
@@ -530,3 +530,106 @@ def test_parses_vehicle_capacity_from_file_using_vehicle_definitions_2_schema():
 
     assert capacity == expected_capacity
     assert parsed_vehicle_type == vehicle_type
+
+
+# Element streaming
+def test_get_elems_is_lazy():
+    elems = inputs.get_elems(os.path.join(test_dir, "test_fixtures/missing_file.xml"), "event")
+    with pytest.raises(FileNotFoundError):
+        next(elems)
+
+
+def test_get_tag_reads_namespace_from_gzip_head():
+    path = os.path.join(test_dir, "test_fixtures/output_transitVehicles.xml.gz")
+    assert inputs.get_tag(path, "vehicle") == "{http://www.matsim.org/files/dtd}vehicle"
+
+
+def test_get_tag_without_namespace():
+    path = os.path.join(test_dir, "test_fixtures/output_network.xml.gz")
+    assert inputs.get_tag(path, "link") == "link"
+
+
+def test_get_elems_same_for_xml_and_gzip():
+    xml_path = os.path.join(test_dir, "test_fixtures/output_events.xml")
+    gzip_path = os.path.join(test_dir, "test_fixtures/output_events.xml.gz")
+    xml_events = [dict(elem.attrib) for elem in inputs.get_elems(xml_path, "event")]
+    gzip_events = [dict(elem.attrib) for elem in inputs.get_elems(gzip_path, "event")]
+    assert xml_events == gzip_events
+    assert len(xml_events) == 194
+
+
+@pytest.mark.parametrize("file_name,tags", [
+    ("output_network.xml.gz", ["node", "link"]),
+    ("output_transitVehicles.xml.gz", ["vehicleType", "vehicle"]),
+])
+def test_get_multi_elems_matches_get_elems(file_name, tags):
+    path = os.path.join(test_dir, "test_fixtures", file_name)
+    elems = [(tag, dict(elem.attrib)) for tag, elem in inputs.get_multi_elems(path, tags)]
+    for tag in tags:
+        assert [attrib for t, attrib in elems if t == tag] == \
+            [dict(elem.attrib) for elem in inputs.get_elems(path, tag)]
+    assert {tag for tag, _ in elems} == set(tags)
+
+
+# Events cache
+def test_events_cache_round_trip(test_gzip_config, test_zip_paths, tmpdir):
+    test_gzip_config.cache_path = str(tmpdir)
+    xml_events = [dict(elem.attrib) for elem in inputs.get_elems(test_gzip_config.events_path, "event")]
+
+    events = inputs.Events(test_gzip_config)
+    events.build(test_zip_paths.resources)
+    assert not os.listdir(str(tmpdir))
+    assert [dict(elem.attrib) for elem in events.elems] == xml_events
+    assert len(os.listdir(str(tmpdir))) == 1
+
+    cached = inputs.Events(test_gzip_config)
+    cached.build(test_zip_paths.resources)
+    cached_events = list(cached.elems)
+    assert len(cached_events) == len(xml_events)
+    for cached_event, xml_event in zip(cached_events, xml_events):
+        assert cached_event.get("time") == float(xml_event.pop("time"))
+        assert {k: v for k, v in cached_event.items() if k != "time"} == xml_event
+
+
+def test_events_cache_not_written_for_partial_reads(test_gzip_config, test_zip_paths, tmpdir):
+    test_gzip_config.cache_path = str(tmpdir)
+    events = inputs.Events(test_gzip_config)
+    events.build(test_zip_paths.resources)
+    next(events.elems)
+    events.elems.close()
+    assert not os.listdir(str(tmpdir))
+
+
+# Inputs cache
+@pytest.mark.parametrize(
+    "tool_class,attributes",
+    [
+        (inputs.Network, ["node_gdf", "link_gdf", "mode_to_links_map"]),
+        (inputs.TransitSchedule, ["stop_gdf", "route_to_mode_map", "veh_to_mode_map", "mode_to_routes_map"]),
+        (inputs.TransitVehicles, ["veh_type_capacity_map", "veh_id_veh_type_map", "transit_vehicle_counts"]),
+        (inputs.Subpopulations, ["map", "classes"]),
+        (inputs.Attributes, ["attributes", "idents", "attribute_names"]),
+    ]
+)
+def test_input_state_cache_round_trip(test_gzip_config, test_zip_paths, tmpdir, tool_class, attributes):
+    test_gzip_config.cache_path = str(tmpdir)
+    built = tool_class(test_gzip_config)
+    built.build(test_zip_paths.resources)
+    assert len(os.listdir(str(tmpdir))) == 1
+
+    cached = tool_class(test_gzip_config)
+    cached.build(test_zip_paths.resources)
+    for name in attributes:
+        built_value, cached_value = getattr(built, name), getattr(cached, name)
+        if isinstance(built_value, gpd.GeoDataFrame):
+            assert cached_value.crs == built_value.crs
+            assert cached_value.equals(built_value)
+        else:
+            assert cached_value == built_value
+
+
+def test_input_state_cache_keyed_on_crs(test_gzip_config, test_zip_paths, tmpdir):
+    test_gzip_config.cache_path = str(tmpdir)
+    network = inputs.Network(test_gzip_config)
+    path = test_zip_paths.resources['network_path'].path
+    assert network.state_cache_path(path, key="EPSG:27700") != network.state_cache_path(path, key="EPSG:4326")
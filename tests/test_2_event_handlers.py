@@ -1,13 +1,17 @@
 import os
 import pytest
 import pandas as pd
+import geopandas as gpd
 import numpy as np
 import lxml.etree as etree
 
 from elara.config import Config, PathFinderWorkStation
+from elara import checkpoint
+from elara import factory
 from elara import inputs
 from elara import event_handlers
 from elara.event_handlers import EventHandlerWorkStation, LinkVehicleCounts
+from elara.registry import IdRegistry
 
 from tests.test_helpers import get_vehicle_capacity_from_vehicles_xml_file
 
@@ -44,6 +48,47 @@ def test_table_position_floor(seconds, hour):
     )[-1] == hour
 
 
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_table_buffer_matches_scalar_increments(size):
+    rng = np.random.default_rng(0)
+    table = np.zeros((4, 2, 24))
+    expected = np.zeros((4, 2, 24))
+    buffer = event_handlers.TableBuffer(table, size=size)
+    for x, y, z, weight in zip(
+            rng.integers(0, 4, 100), rng.integers(0, 2, 100), rng.integers(0, 24, 100), rng.random(100)
+    ):
+        buffer.add(x, y, z, weight)
+        expected[x, y, z] += weight
+    buffer.flush()
+    assert np.array_equal(table, expected)
+
+
+def test_pair_table_matches_dense_table():
+    rng = np.random.default_rng(0)
+    table = event_handlers.PairTable((5, 5, 2, 24), capacity=2)
+    expected = np.zeros((5, 5, 2, 24))
+    for o, d, y, z, weight in zip(
+            rng.integers(0, 5, 200), rng.integers(0, 5, 200), rng.integers(0, 2, 200), rng.integers(0, 24, 200),
+            rng.random(200)
+    ):
+        table.add(o, d, y, z, weight)
+        expected[o, d, y, z] += weight
+    assert np.array_equal(table.toarray(), expected)
+    origins, destinations, counts = table.rows()
+    assert len(origins) == len(set(zip(origins, destinations))) == np.count_nonzero(expected.sum(axis=(2, 3)))
+
+
+def test_buffered_table_flushes_on_read(base_handler):
+    handler = event_handlers.LinkVehicleCounts(base_handler.config, 'car')
+    handler.counts = np.zeros((2, 1, 24))
+    handler.counts_buffer.add(1, 0, 5)
+    handler.counts_buffer.add(1, 0, 5, 2.0)
+    assert handler.counts[1, 0, 5] == 3
+    handler.counts = handler.counts + handler.counts
+    handler.counts_buffer.add(0, 0, 0)
+    assert handler.counts.sum() == 7
+
+
 @pytest.fixture
 def test_list():
     return [1, 2, 4]
@@ -122,6 +167,32 @@ def test_get_veh_mode(base_handler):
     assert base_handler.vehicle_mode('not_a_transit_vehicle') == "car"
 
 
+def test_id_registry_matches_inputs(base_handler, input_manager):
+    registry = base_handler.ids
+    schedule = input_manager.resources["transit_schedule"]
+    transit_vehicles = input_manager.resources["transit_vehicles"]
+    assert registry is IdRegistry.shared(input_manager.resources)
+    for vehicle_id, mode in schedule.veh_to_mode_map.items():
+        assert registry.vehicle_mode(vehicle_id) == mode
+        assert registry.vehicle_route(vehicle_id) == schedule.veh_to_route_map[vehicle_id]
+    for vehicle_id, veh_type in transit_vehicles.veh_id_veh_type_map.items():
+        assert registry.vehicle_capacity(vehicle_id) == transit_vehicles.veh_type_capacity_map[veh_type]
+    assert registry.vehicle_route('not_a_transit_vehicle') == "unknown_route"
+    assert registry.vehicle_capacity('not_a_transit_vehicle') == 5.0
+    assert registry.links.ids == input_manager.resources["network"].link_gdf.index.tolist()
+
+
+def test_id_registry_vehicle_classes(input_manager):
+    registry = IdRegistry.shared(input_manager.resources)
+    attributes = input_manager.resources["attributes"]
+    class_indices = {"rich": 0, "poor": 1, None: 2}
+    classes = registry.vehicle_classes("subpopulation", class_indices)
+    for person, attribs in attributes.items():
+        assert classes[registry.vehicles.get(person)] == class_indices[attribs.get("subpopulation")]
+    assert classes[registry.vehicles.get('bus1')] == 2
+    assert registry.vehicle_classes("subpopulation", class_indices) is classes
+
+
 def test_empty_rows(base_handler, test_df):
     assert len(base_handler.remove_empty_rows(test_df)) == 2
 
@@ -362,6 +433,21 @@ def test_volume_count_finalise_car_simple(test_car_volume_count_handler_simple,
         assert np.sum(df.values) == gdf.total.sum()
 
 
+def test_volume_count_finalise_car_separate_geometry(test_config, input_manager, events):
+    test_config.geometry_format = "geoparquet"
+    handler = event_handlers.LinkVehicleCounts(test_config, mode='car')
+    handler.build(input_manager.resources, write_path=test_outputs)
+    for elem in events:
+        handler.process_event(elem)
+    handler.finalise()
+    df = handler.result_dfs["link_vehicle_counts_car"]
+    assert not isinstance(df, gpd.GeoDataFrame)
+    assert "geometry" not in df.columns
+    assert list(df.columns) == ["link_id"] + list(range(handler.config.time_periods)) + ["total"]
+    assert set(df.link_id) == set(input_manager.resources['network'].link_gdf.index)
+    assert df.total.sum() == 14 / handler.config.scale_factor
+
+
 # bus
 @pytest.fixture
 def test_bus_volume_count_handler(test_config, input_manager):
@@ -612,6 +698,35 @@ def test_link_speed_finalise_car(test_car_link_speed_handler, car_link_pair_even
             assert np.sum(df.values) == 9 * 3.6
 
 
+@pytest.mark.parametrize("geometry_format", ["joined", "geoparquet", "flatgeobuf"])
+def test_link_speed_finalise_car_geometry_formats(test_config, input_manager, car_link_pair_event, geometry_format):
+    test_config.geometry_format = geometry_format
+    handler = event_handlers.LinkVehicleSpeeds(test_config, mode='car', groupby_person_attribute="subpopulation")
+    handler.build(input_manager.resources, write_path=test_outputs)
+    for elem in car_link_pair_event:
+        handler.process_event(elem)
+    handler.finalise()
+    assert len(handler.result_dfs) == 6
+    cols = list(range(handler.config.time_periods))
+    expected = {
+        "link_vehicle_speeds_car_average": 3 / (1/2 + 1/5 + 1/4) * 3.6,
+        "link_vehicle_speeds_car_average_subpopulation": 18 + 9.6,
+        "link_vehicle_speeds_car_min": 2 * 3.6,
+        "link_vehicle_speeds_car_min_subpopulation": 7 * 3.6,
+        "link_vehicle_speeds_car_max": 5 * 3.6,
+        "link_vehicle_speeds_car_max_subpopulation": 9 * 3.6,
+    }
+    for name, df in handler.result_dfs.items():
+        if geometry_format == "joined":
+            assert isinstance(df, gpd.GeoDataFrame)
+            assert "length" in df.columns
+        else:
+            assert not isinstance(df, gpd.GeoDataFrame)
+            assert "length" not in df.columns
+            assert "geometry" not in df.columns
+        assert np.sum(df.loc[:, cols].values) == pytest.approx(expected[name])
+
+
 # With no attribute groups
 @pytest.fixture
 def test_car_link_speed_handler_simple(test_config, input_manager):
@@ -1142,7 +1257,7 @@ def test_stop_to_stop_veh_interaction_process_single_event_driver(
     handler.process_event(veh_arrives_facilty_event1)
     handler.process_event(driver_enters_veh_event)
     assert handler.veh_occupancy == {}
-    assert np.sum(handler.counts) == 0
+    assert np.sum(handler.counts.toarray()) == 0
 
 
 def test_stop_to_stop_process_events(
@@ -1161,13 +1276,13 @@ def test_stop_to_stop_process_events(
     handler.process_event(veh_arrives_facilty_event2)
 
     assert handler.veh_occupancy == {'bus1': {'poor': 1, 'rich': 1}}
-    assert np.sum(handler.counts) == 2
+    assert np.sum(handler.counts.toarray()) == 2
 
     handler.process_event(person_leaves_veh_event)
     handler.process_event(veh_arrives_facilty_event3)
 
     assert handler.veh_occupancy == {'bus1': {'poor': 0, 'rich': 1}}
-    assert np.sum(handler.counts) == 3
+    assert np.sum(handler.counts.toarray()) == 3
 
     stop_index1 = handler.elem_indices['home_stop_out']
     stop_index2 = handler.elem_indices['work_stop_in']
@@ -1175,15 +1290,15 @@ def test_stop_to_stop_process_events(
     class_index = handler.class_indices['rich']
     period = 7
 
-    assert np.sum(handler.counts[stop_index1, stop_index2, :, :]) == 2
-    assert np.sum(handler.counts[stop_index1, stop_index2, class_index, :]) == 1
-    assert np.sum(handler.counts[:, :, :, period]) == 2
+    assert np.sum(handler.counts.toarray()[stop_index1, stop_index2, :, :]) == 2
+    assert np.sum(handler.counts.toarray()[stop_index1, stop_index2, class_index, :]) == 1
+    assert np.sum(handler.counts.toarray()[:, :, :, period]) == 2
 
     period = 8
 
-    assert np.sum(handler.counts[stop_index2, stop_index1, :, :]) == 1
-    assert np.sum(handler.counts[:, :, class_index, :]) == 2
-    assert np.sum(handler.counts[:, :, :, period]) == 1
+    assert np.sum(handler.counts.toarray()[stop_index2, stop_index1, :, :]) == 1
+    assert np.sum(handler.counts.toarray()[:, :, class_index, :]) == 2
+    assert np.sum(handler.counts.toarray()[:, :, :, period]) == 1
 
 def test_vehicle_stop_to_stop_process_events(
         bus_vehicle_stop_to_stop_handler,
@@ -1215,7 +1330,7 @@ def test_vehicle_stop_to_stop_process_events(
     handler.process_event(person_enters_veh2_event) # person 1 interchanges from bus1 to bus2
     handler.process_event(veh_arrives_facilty_event3)
     handler.process_event(veh2_arrives_facilty_event3)
-    counts_ser = pd.Series(handler.counts)
+    counts_ser = pd.Series(handler.decode(handler.counts))
 
     assert handler.veh_occupancy == {'bus1': {'poor': 0, 'rich': 1}, 'bus2': {'poor': 1}}
     assert sum(handler.counts.values()) == 4
@@ -1644,4 +1759,238 @@ def test_load_all_event_handler_manager_with_mode_car_and_groupby_subpopulation(
                 for c in cols:
                     assert c in gdf.columns
                 df = gdf.loc[:, cols]
-                assert np.sum(df.values)
\ No newline at end of file
+                assert np.sum(df.values)
+
+# Event Handler Manager dispatch table
+def test_event_dispatch_table_routes_declared_event_types(test_config, test_paths):
+    input_workstation = inputs.InputsWorkStation(test_config)
+    input_workstation.connect(managers=None, suppliers=[test_paths])
+    input_workstation.load_all_tools()
+    input_workstation.build()
+    event_workstation = EventHandlerWorkStation(test_config)
+    event_workstation.connect(managers=None, suppliers=[input_workstation])
+    class CatchAll(event_handlers.EventHandlerTool):
+        def process_event(self, elem):
+            pass
+
+    counts = LinkVehicleCounts(test_config, mode='car')
+    catch_all = CatchAll(test_config, mode='car')
+    event_workstation.resources = {'link_vehicle_counts': counts, 'base': catch_all}
+
+    dispatch, default = event_workstation.build_dispatch_table()
+
+    assert set(dispatch) == {"vehicle enters traffic", "entered link"}
+    assert dispatch["entered link"] == [counts.process_event, catch_all.process_event]
+    assert default == [catch_all.process_event]
+
+
+def test_link_traversal_consumers_share_one_engine(test_config, input_manager):
+    speeds = event_handlers.LinkVehicleSpeeds(test_config, mode='car')
+    log = event_handlers.VehicleLinkLog(test_config, mode='all')
+    animate = event_handlers.VehicleLinksAnimate(test_config, mode='all')
+    handlers = {'speeds': speeds, 'log': log, 'animate': animate}
+    for handler in handlers.values():
+        handler.build(input_manager.resources)
+
+    fused = event_handlers.with_engines(handlers)
+    engine = fused[event_handlers.LinkTraversals.name]
+    assert engine.consumers == [speeds, log, animate]
+
+    dispatch, catch_all = event_handlers.dispatch_table(fused)
+    assert catch_all == []
+    for event_type in event_handlers.LinkTraversals.event_types:
+        assert dispatch[event_type] == [(event_handlers.LinkTraversals.name, engine)]
+
+    standalone = {
+        'speeds': event_handlers.LinkVehicleSpeeds(test_config, mode='car'),
+        'log': event_handlers.VehicleLinkLog(test_config, mode='all'),
+        'animate': event_handlers.VehicleLinksAnimate(test_config, mode='all'),
+    }
+    for handler in standalone.values():
+        handler.build(input_manager.resources)
+
+    for elem in input_manager.resources['events'].elems:
+        for _, target in dispatch.get(elem.get('type'), catch_all):
+            target.process_event(elem)
+        for handler in standalone.values():
+            handler.process_event(elem)
+
+    assert np.array_equal(speeds.counts, standalone['speeds'].counts)
+    assert np.array_equal(speeds.duration_sum, standalone['speeds'].duration_sum)
+    assert log.vehicle_link_log.chunk == standalone['log'].vehicle_link_log.chunk
+    assert animate.vehicle_trips.chunk == standalone['animate'].vehicle_trips.chunk
+    assert len(log.vehicle_link_log) == 10
+    assert engine.entries == {}
+
+
+def test_transit_occupancy_consumers_share_one_engine(test_config, input_manager):
+    def build_handlers():
+        handlers = {
+            'links': event_handlers.LinkPassengerCounts(
+                test_config, mode='bus', groupby_person_attribute='subpopulation'
+            ),
+            'stops': event_handlers.StopPassengerCounts(test_config, mode='bus'),
+            'stop_to_stop': event_handlers.StopToStopPassengerCounts(
+                test_config, mode='bus', groupby_person_attribute='subpopulation'
+            ),
+        }
+        for handler in handlers.values():
+            handler.build(input_manager.resources)
+        return handlers
+
+    handlers = build_handlers()
+    fused = event_handlers.with_engines(handlers)
+    engine = fused[event_handlers.TransitOccupancy.name]
+    assert all(handler.engine is engine for handler in handlers.values())
+    # occupancy is tracked once per attribute key
+    assert set(engine.occupancy) == {'subpopulation'}
+
+    dispatch, catch_all = event_handlers.dispatch_table(fused)
+    assert dispatch['waitingForPt'] == [('stops', handlers['stops'])]
+    for event_type in event_handlers.TransitOccupancy.event_types:
+        assert dispatch[event_type] == [(event_handlers.TransitOccupancy.name, engine)]
+
+    standalone = build_handlers()
+    for elem in input_manager.resources['events'].elems:
+        for _, target in dispatch.get(elem.get('type'), catch_all):
+            target.process_event(elem)
+        for handler in standalone.values():
+            handler.process_event(elem)
+
+    assert np.sum(handlers['links'].counts)
+    assert np.array_equal(handlers['links'].counts, standalone['links'].counts)
+    assert np.array_equal(handlers['stops'].boardings, standalone['stops'].boardings)
+    assert np.array_equal(handlers['stops'].alightings, standalone['stops'].alightings)
+    assert np.array_equal(
+        handlers['stop_to_stop'].counts.toarray(), standalone['stop_to_stop'].counts.toarray()
+    )
+    assert handlers['links'].veh_occupancy is handlers['stop_to_stop'].veh_occupancy
+
+
+def test_all_event_handlers_declare_event_types():
+    for handler in EventHandlerWorkStation.tools.values():
+        assert handler.event_types
+
+
+# Parallel event processing
+test_duration_min_merge_data = [
+    (5, 3, 1, False, 3),
+    (2, 3, 1, False, 2),
+    (0, 3, 1, False, 3),  # unset
+    (5, 0, 0, False, 5),  # no later durations
+    (5, 3, 2, True, 3),  # later zero duration resets the minimum
+]
+
+
+@pytest.mark.parametrize("min_a,min_b,count_b,zero_b,expected", test_duration_min_merge_data)
+def test_link_vehicle_speeds_merge_duration_min(
+        test_config, input_manager, min_a, min_b, count_b, zero_b, expected
+):
+    handler = event_handlers.LinkVehicleSpeeds(test_config, mode="car")
+    handler.build(input_manager.resources)
+    partition = event_handlers.LinkVehicleSpeeds(test_config, mode="car")
+    partition.build(input_manager.resources)
+
+    handler.counts[0, 0, 0] = 1
+    handler.duration_min[0, 0, 0] = min_a
+    partition.counts[0, 0, 0] = count_b
+    partition.duration_min[0, 0, 0] = min_b
+    partition.duration_zero[0, 0, 0] = zero_b
+
+    handler.merge({attribute: getattr(partition, attribute) for attribute in partition.partition_results})
+
+    assert handler.duration_min[0, 0, 0] == expected
+    assert handler.counts[0, 0, 0] == 1 + count_b
+
+
+def test_parallel_event_handler_manager_matches_serial(test_config, test_paths, tmpdir):
+    outputs = {}
+    for workers in [1, 3]:
+        test_config.workers = workers
+        write_path = str(tmpdir.mkdir(f"workers_{workers}"))
+        input_workstation = inputs.InputsWorkStation(test_config)
+        input_workstation.connect(managers=None, suppliers=[test_paths])
+        input_workstation.load_all_tools()
+        input_workstation.build()
+        event_workstation = EventHandlerWorkStation(test_config)
+        event_workstation.connect(managers=None, suppliers=[input_workstation])
+        event_workstation.load_all_tools(mode='car')
+        event_workstation.build(write_path=write_path)
+        outputs[workers] = write_path
+
+    names = sorted(os.listdir(outputs[1]))
+    assert names == sorted(os.listdir(outputs[3]))
+    assert "vehicle_link_log_car.csv" in names
+    for name in names:
+        with open(os.path.join(outputs[1], name), "rb") as serial, open(os.path.join(outputs[3], name), "rb") as parallel:
+            assert serial.read() == parallel.read(), name
+
+
+def build_checkpointed_event_workstation(test_config, test_paths, write_path, crash=None):
+    input_workstation = inputs.InputsWorkStation(test_config)
+    input_workstation.connect(managers=None, suppliers=[test_paths])
+    input_workstation.load_all_tools()
+    input_workstation.build()
+    if crash is not None:
+        events = input_workstation.resources["events"]
+        elems = events.elems
+
+        def crashing():
+            for i, elem in enumerate(elems):
+                if i == crash:
+                    raise RuntimeError("events pass failed")
+                yield elem
+        events.elems = crashing()
+
+    event_workstation = EventHandlerWorkStation(test_config)
+    event_workstation.connect(managers=None, suppliers=[input_workstation])
+    event_workstation.load_all_tools(mode='bus')
+    # arrow (animation) outputs can't be checkpointed
+    event_workstation.resources.pop("vehicle_links_animate", None)
+    event_workstation.build(write_path=write_path)
+    return event_workstation
+
+
+def test_event_handler_manager_resumes_from_checkpoint(test_config, test_paths, tmpdir, monkeypatch):
+    # write log chunks (lines) often, so that chunks are written after the last checkpoint
+    defaults = list(factory.ColumnarChunkWriter.__init__.__defaults__)
+    defaults[1] = 200
+    monkeypatch.setattr(factory.ColumnarChunkWriter.__init__, "__defaults__", tuple(defaults))
+
+    expected_path = str(tmpdir.mkdir("expected"))
+    build_checkpointed_event_workstation(test_config, test_paths, expected_path)
+
+    write_path = str(tmpdir.mkdir("resumed"))
+    checkpoint_path = os.path.join(write_path, checkpoint.CHECKPOINT_NAME)
+    test_config.checkpoint_events = 40
+    with pytest.raises(RuntimeError):
+        build_checkpointed_event_workstation(test_config, test_paths, write_path, crash=150)
+    assert os.path.exists(checkpoint_path)
+
+    test_config.resume = True
+    build_checkpointed_event_workstation(test_config, test_paths, write_path)
+    assert not os.path.exists(checkpoint_path)
+
+    names = sorted(os.listdir(expected_path))
+    assert names == sorted(os.listdir(write_path))
+    assert "vehicle_passenger_log_bus.csv" in names
+    for name in names:
+        with open(os.path.join(expected_path, name), "rb") as expected, open(os.path.join(write_path, name), "rb") as resumed:
+            assert expected.read() == resumed.read(), name
+
+
+def test_checkpoint_ignored_for_other_handlers(test_config, test_paths, tmpdir):
+    write_path = str(tmpdir.mkdir("resumed"))
+    checkpoint_path = os.path.join(write_path, checkpoint.CHECKPOINT_NAME)
+    test_config.checkpoint_events = 40
+    with pytest.raises(RuntimeError):
+        build_checkpointed_event_workstation(test_config, test_paths, write_path, crash=150)
+
+    test_config.resume = True
+    test_config.time_periods = 12
+    workstation = EventHandlerWorkStation(test_config)
+    workstation.connect(managers=None, suppliers=[test_paths])
+    workstation.load_all_tools(mode='bus')
+    workstation.resources.pop("vehicle_links_animate", None)
+    key = checkpoint.checkpoint_key(workstation.resources)
+    assert checkpoint.read_checkpoint(checkpoint_path, key, {}) is None
@@ -1,6 +1,7 @@
 import os
 import pytest
 import pandas as pd
+import numpy as np
 import pyarrow as pa
 import lxml.etree as etree
 
@@ -162,21 +163,25 @@ def test_vehicle_links_animate_handler_finalise(
     reader = pa.ipc.RecordBatchStreamReader(
         os.path.join(test_outputs, 'vehicle_links_animate_all.arrow')
         )
-    result = reader.read_all().to_pandas()
-    pd.testing.assert_frame_equal(
-        result,
-        pd.DataFrame(
-            {
-            "veh_mode": ["car"],
-            "color": [[200,200,200]],
-            "path": [[
-                [49.766807, -7.55716],
-                [49.766874, -7.555778],
-                [49.773375, -7.418928],
-                [49.77344, -7.417546]
-                ]],
-            "timestamps": [[1649116800, 1649116801, 1649116802, 1649116803]],
-            "vid": ["chris"],
-            }
-        )
-    )
\ No newline at end of file
+    result = reader.read_all()
+    assert result.schema == VehicleLinksAnimate.trip_schema
+    assert result.column("veh_mode").type == pa.dictionary(pa.int32(), pa.string())
+    assert result.column("path").type == pa.list_(pa.list_(pa.float32(), 2))
+    assert result.column("timestamps").type == pa.list_(pa.int32())
+
+    trips = result.to_pylist()
+    assert len(trips) == 1
+    assert trips[0]["veh_mode"] == "car"
+    assert trips[0]["vid"] == "chris"
+    assert trips[0]["color"] == [200, 200, 200]
+    assert trips[0]["timestamps"] == [1649116800, 1649116801, 1649116802, 1649116803]
+    np.testing.assert_allclose(
+        trips[0]["path"],
+        [
+            [49.766807, -7.55716],
+            [49.766874, -7.555778],
+            [49.773375, -7.418928],
+            [49.77344, -7.417546]
+        ],
+        rtol=1e-6
+    )
@@ -5,7 +5,7 @@ import pytest
 import pandas as pd
 import numpy as np
 import lxml.etree as etree
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 
 sys.path.append(os.path.abspath('../elara'))
@@ -36,6 +36,13 @@ def test_convert_time(time, seconds):
     assert plan_handlers.convert_time_to_seconds(time) == seconds
 
 
+def test_time_formatters():
+    seconds = pd.Series([0, 3661, 86399, 86400 + 25200])
+    assert list(plan_handlers.clock_times(seconds)) == ["00:00:00", "01:01:01", "23:59:59", "07:00:00"]
+    assert list(plan_handlers.durations(seconds)) == [timedelta(seconds=s) for s in seconds]
+    assert list(plan_handlers.float_seconds(seconds)) == [0.0, 3661.0, 86399.0, 111600.0]
+
+
 # Config
 @pytest.fixture
 def test_config():
@@ -148,6 +155,54 @@ def test_extract_mode_from_v11_route_elem(base_handler):
     assert base_handler.extract_mode_from_v11_route_elem(elem) == "bus"
 
 
+def test_plan_decoder(test_config, input_manager):
+    decoder = plan_handlers.PlanDecoder(test_config, input_manager.resources)
+    string = """
+    <person id="nick">
+        <plan score="1" selected="yes">
+            <activity type="home" link="1-2" x="0.0" y="0.0" end_time="08:00:00" >
+            </activity>
+            <leg mode="car" dep_time="08:00:00" trav_time="00:00:04">
+            <route type="links" start_link="1-2" end_link="1-5" trav_time="00:00:04" distance="10100.0">1-2 2-1 1-5</route>
+            </leg>
+            <leg mode="pt" trav_time="00:43:42">
+                <route type="experimentalPt1" start_link="1-2" end_link="3-4" trav_time="00:43:42" distance="10100.0">PT1===home_stop_out===city_line===work_bound===work_stop_in</route>
+            </leg>
+            <leg mode="walk" trav_time="00:01:00"></leg>
+            <activity type="work" link="1-5" x="0.0" y="10000.0" >
+            </activity>
+        </plan>
+        <plan score="2" selected="no">
+        </plan>
+    </person>
+    """
+    person = decoder.decode(etree.fromstring(string))
+    assert person.ident == "nick"
+    assert [plan.selected for plan in person.plans] == [True, False]
+    assert person.plans[1].selection == "no"
+
+    home, car, pt, walk, work = person.plans[0].stages
+    assert (home.type, home.x, home.end_time) == ("home", "0.0", 8 * 60 * 60)
+    assert work.end_time is None
+    assert (car.mode, car.route_mode, car.distance, car.trav_time) == ("car", "car", 10100.0, 4)
+    assert car.route_distance == "10100.0"
+    assert car.links == ("1-2", "2-1", "1-5")
+    assert (pt.mode, pt.route_mode, pt.links) == ("pt", "bus", ())
+    assert (walk.route_mode, walk.distance) == ("walk", None)
+
+
+def test_base_handler_processes_persons_without_results(base_handler):
+    string = """
+    <person id="nick">
+        <plan score="1" selected="yes">
+            <activity type="home" link="1-2" x="0.0" y="0.0" end_time="08:00:00" >
+            </activity>
+        </plan>
+    </person>
+    """
+    assert base_handler.process_plans(etree.fromstring(string)) is None
+
+
 def test_extract_routeid_from_v12_route_elem(base_handler):
     class Resource:
         route_to_mode_map = {"a":"bus"}
@@ -246,71 +301,6 @@ def test_utility_handler_process_plans(utility_handler, person_single_plan_elem,
 
 
 ### Leg Log Handler ###
-# Wrapping
-test_matsim_time_data = [
-    (['06:00:00', '12:45:00', '18:30:00'], '1-18:30:00'),
-    (['06:00:00', '12:45:00', '24:00:00'], '2-00:00:00'),
-    (['06:00:00', '24:00:00', '08:30:00'], '2-08:30:00'),
-    (['06:00:00', '18:45:00', '12:30:00'], '2-12:30:00'),
-    (['06:00:00', '18:45:00', '18:45:00'], '1-18:45:00'),
-    (['00:00:00', '12:45:00', '18:45:00'], '1-18:45:00'),
-    (['06:00:00', '04:45:00', '02:45:00'], '3-02:45:00'),
-    (['00:00:00'], '1-00:00:00'),
-    (['24:00:00'], '2-00:00:00'),
-]
-
-non_wrapping_test_matsim_time_data = [
-    (['06:00:00', '12:45:00', '18:30:00'], '1-18:30:00'),
-    (['06:00:00', '12:45:00', '24:00:00'], '2-00:00:00'),
-    (['06:00:00', '24:00:00', '08:30:00'], '1-08:30:00'),
-    (['06:00:00', '18:45:00', '12:30:00'], '1-12:30:00'),
-    (['00:00:00'], '1-00:00:00'),
-    (['24:00:00'], '2-00:00:00'),
-]
-
-@pytest.mark.parametrize("times,final_string", non_wrapping_test_matsim_time_data)
-def test_matsim_time_to_datetime(times, final_string):
-    current_dt = None
-    for new_time_str in times:
-        current_dt = plan_handlers.matsim_time_to_datetime(
-            current_dt,
-            new_time_str,
-            base_year=1900,
-            base_month=1,
-            )
-    assert isinstance(current_dt, datetime)
-    assert current_dt == datetime.strptime(f"{final_string}", '%d-%H:%M:%S')
-
-
-test_durations_data = [
-    (
-        None, datetime(year=2020, month=4, day=1, hour=0),
-        timedelta(hours=0), datetime(year=2020, month=4, day=1, hour=0)
-    ),
-    (
-        None, datetime(year=2020, month=4, day=1, hour=1),
-        timedelta(hours=1), datetime(year=2020, month=4, day=1, hour=0)
-    ),
-    (
-        datetime(year=2020, month=4, day=1, hour=1), datetime(year=2020, month=4, day=1, hour=1),
-        timedelta(hours=0), datetime(year=2020, month=4, day=1, hour=1)
-    ),
-    (
-        datetime(year=2020, month=4, day=1, hour=1), datetime(year=2020, month=4, day=1, hour=2),
-        timedelta(hours=1), datetime(year=2020, month=4, day=1, hour=1)
-    ),
-    (
-        datetime(year=2020, month=4, day=1, hour=2), datetime(year=2020, month=4, day=1, hour=1),
-        timedelta(hours=-1), datetime(year=2020, month=4, day=1, hour=2)
-    ),
-]
-@pytest.mark.parametrize("start,end,duration,start_time", test_durations_data)
-def test_safe_duration(start, end, duration, start_time):
-    d, st = plan_handlers.safe_duration(start, end)
-    assert d == duration
-    assert st == start_time
-
-
 test_distance_data = [
     (0,0,0,0,0),
     (1,1,1,1,0),
@@ -2577,6 +2567,34 @@ def test_load_workstation_with_logs(test_config, test_paths):
     assert os.path.exists(os.path.join(test_outputs, "trip_logs_all_trips.csv"))
     assert os.path.exists(os.path.join(test_outputs, "trip_logs_all_activities.csv"))
 
+def test_parallel_plan_workstation_matches_serial(test_config, test_paths, tmpdir):
+    outputs = {}
+    for workers in [1, 3]:
+        test_config.workers = workers
+        test_config.output_path = str(tmpdir.mkdir(f"workers_{workers}"))
+        input_workstation = InputsWorkStation(test_config)
+        input_workstation.connect(managers=None, suppliers=[test_paths])
+        input_workstation.load_all_tools()
+        input_workstation.build()
+
+        plan_workstation = PlanHandlerWorkStation(test_config)
+        plan_workstation.connect(managers=None, suppliers=[input_workstation])
+        plan_workstation.block_size = 1  # one person per block
+        for name in ["trip_modes", "leg_logs", "trip_logs", "plan_logs", "utility_logs"]:
+            plan_workstation.resources[name] = plan_workstation.tools[name](test_config, mode='all')
+        plan_workstation.build(write_path=test_config.output_path)
+        outputs[workers] = test_config.output_path
+
+    names = sorted(os.listdir(outputs[1]))
+    assert names == sorted(os.listdir(outputs[3]))
+    assert "leg_logs_all_legs.csv" in names
+    for name in names:
+        path = os.path.join(outputs[1], name)
+        if os.path.isfile(path):
+            with open(path, "rb") as serial, open(os.path.join(outputs[3], name), "rb") as parallel:
+                assert serial.read() == parallel.read(), name
+
+
 def test_non_zero_pt_interaction_legs(agent_leg_log_handler):
     """ PT interaction activity has non-zero duration """
 
@@ -3,8 +3,9 @@ import os
 import pytest
 import pandas as pd
 import geopandas as gp
-from shapely.geometry import Polygon
+from shapely.geometry import Point, Polygon
 import logging
+import time
 
 
 sys.path.append(os.path.abspath('../elara'))
@@ -238,6 +239,126 @@ def test_complex_requirements_workstation(test_complex_config):
     }
 
 
+class SleepyWorkStation(factory.WorkStation):
+    """
+    Workstation that logs before and after sleeping, instead of building tools.
+    """
+    tools = None
+    concurrent_build = True
+
+    def __init__(self, config, name, sleep=0.0, fail=False):
+        super().__init__(config)
+        self.label = name
+        self.sleep = sleep
+        self.fail = fail
+
+    def __str__(self):
+        return self.label
+
+    def build(self, write_path=None):
+        self.logger.info(f"start {self}")
+        self.logger.info(f"{self} workers {self.config.workers}")
+        time.sleep(self.sleep)
+        if self.fail:
+            raise ValueError(f"{self} failed")
+        self.logger.info(f"end {self}")
+
+
+def sleepy_dag(fail=False):
+    class DummyConfig:
+        workers = 2
+    config = DummyConfig()
+    first = SleepyWorkStation(config, "first")
+    first.concurrent_build = False
+    slow = SleepyWorkStation(config, "slow", sleep=1.0, fail=fail)
+    fast = SleepyWorkStation(config, "fast")
+    last = SleepyWorkStation(config, "last")
+    last.concurrent_build = False
+    first.connect(managers=[slow, fast], suppliers=None)
+    slow.connect(managers=[last], suppliers=[first])
+    fast.connect(managers=[last], suppliers=[first])
+    last.connect(managers=None, suppliers=[slow, fast])
+    return [last, fast, slow, first]
+
+
+def test_build_dag_concurrently_logs_in_build_order(caplog):
+    caplog.set_level(logging.INFO)
+    queue = sleepy_dag()
+    sequence = factory.build_dag(queue)
+    visited = [str(station) for station in sequence[len(queue):]]
+    assert visited == ["first", "fast", "slow", "last"]
+    messages = [record.getMessage() for record in caplog.records if record.getMessage().startswith(("start", "end"))]
+    assert messages == [
+        "start first", "end first", "start slow", "end slow", "start fast", "end fast", "start last", "end last"
+    ]
+
+
+def test_build_dag_concurrently_raises_build_errors():
+    with pytest.raises(RuntimeError, match="slow failed"):
+        factory.build_dag(sleepy_dag(fail=True))
+
+
+def test_build_dag_concurrently_logs_while_building(caplog):
+    caplog.set_level(logging.INFO)
+    emitted = {}
+
+    class Clock(logging.Handler):
+        def emit(self, record):
+            emitted[record.getMessage()] = time.monotonic()
+
+    clock = Clock()
+    logging.getLogger().addHandler(clock)
+    try:
+        factory.build_dag(sleepy_dag())
+    finally:
+        logging.getLogger().removeHandler(clock)
+    assert emitted["end slow"] - emitted["start slow"] > 0.5
+
+
+def test_build_dag_concurrently_keeps_logs_of_failed_builds(caplog):
+    caplog.set_level(logging.INFO)
+    with pytest.raises(RuntimeError, match="slow failed"):
+        factory.build_dag(sleepy_dag(fail=True))
+    messages = [record.getMessage() for record in caplog.records]
+    assert "start slow" in messages
+
+
+def test_build_dag_concurrently_shares_workers(caplog):
+    caplog.set_level(logging.INFO)
+    queue = sleepy_dag()
+    queue[0].config.workers = 4
+    queue[1].parallel_build = queue[2].parallel_build = 1
+    factory.build_dag(queue)
+    messages = [record.getMessage() for record in caplog.records]
+    assert "slow workers 2" in messages
+    assert "fast workers 2" in messages
+    assert queue[0].config.workers == 4
+
+
+def test_share_workers_gives_spare_workers_to_parallel_builds():
+    class DummyConfig:
+        workers = 4
+    config = DummyConfig()
+    events = SleepyWorkStation(config, "events")
+    events.parallel_build = 2
+    plans = SleepyWorkStation(config, "plans")
+    plans.parallel_build = 1
+    other = SleepyWorkStation(config, "other")
+    shares = factory.share_workers([other, plans, events], 4)
+    assert [shares[station] for station in [events, plans, other]] == [2, 1, 1]
+    shares = factory.share_workers([other, plans, events], 8)
+    assert [shares[station] for station in [events, plans, other]] == [4, 3, 1]
+    shares = factory.share_workers([other, plans, events], 2)
+    assert [shares[station] for station in [events, plans, other]] == [1, 1, 1]
+
+
+def test_build_dag_concurrently_warns_of_unshared_parallel_builds(caplog):
+    queue = sleepy_dag()
+    queue[1].parallel_build = 1
+    factory.build_dag(queue)
+    assert "fast is built with 1 of 2 workers" in caplog.text
+
+
 def test_dfs_complex(requirements_complex):
     factory.build_graph_depth(requirements_complex)
     assert requirements_complex.depth == 0
@@ -620,6 +741,112 @@ def test_dict_equals():
     assert factory.equals({1:[1]}, {1:[2]}) == False
 
 
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_write_csv_in_output_format(tmpdir, output_format):
+    df = pd.DataFrame(
+        {"mode": ["car", "bus", "car", "car"], "count": [1, 2, 3, 4]},
+        index=pd.Index(["1-2", "2-3", "3-4", "4-5"], name="link_id")
+    )
+    class DummyConfig:
+        output_path = tmpdir
+    config = DummyConfig()
+    config.output_format = output_format
+    workstation = factory.WorkStation(config=config)
+    workstation.write_csv(df, "test.csv", compression="gzip")
+    path = os.path.join(tmpdir, f"test.{output_format}")
+    assert os.path.exists(path)
+
+    tool = factory.Tool(config=config)
+    tool.logger = logging.getLogger(__name__)
+    result = tool.read_csv("test.csv", index_col=0)
+    assert result["mode"].dtype == "category"
+    assert list(result.index) == ["1-2", "2-3", "3-4", "4-5"]
+    assert list(result["count"]) == [1, 2, 3, 4]
+
+    flat = factory.read_table(path, output_format, usecols=["link_id", "count"])
+    assert list(flat.columns) == ["link_id", "count"]
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_results_read_from_memory(tmpdir, output_format, monkeypatch):
+    df = pd.DataFrame(
+        {"mode": ["car", "bus", "car", "car"], 0: [1.5, 2.0, 3.0, 4.0]},
+        index=pd.Index(["1-2", "2-3", "3-4", "4-5"], name="link_id")
+    )
+    path = os.path.join(tmpdir, f"test.{output_format}")
+    factory.write_table(df, path, output_format)
+    expected = factory.read_table(path, output_format, index_col=0)
+
+    def no_disk_reads(*args, **kwargs):
+        raise AssertionError("read from disk")
+    monkeypatch.setattr(pd, "read_parquet", no_disk_reads)
+    monkeypatch.setattr(factory.feather, "read_table", no_disk_reads)
+
+    result = factory.read_table(path, output_format, index_col=0)
+    pd.testing.assert_frame_equal(result, expected)
+    result["0"] = 0.0  # readers get their own copy
+    pd.testing.assert_frame_equal(factory.read_table(path, output_format, index_col=0), expected)
+
+    # changed outputs are read from disk
+    factory.write_table(df.iloc[:2], os.path.join(tmpdir, f"other.{output_format}"), output_format)
+    os.replace(os.path.join(tmpdir, f"other.{output_format}"), path)
+    with pytest.raises(AssertionError):
+        factory.read_table(path, output_format, index_col=0)
+
+
+def test_result_registry_is_bounded(tmpdir):
+    df = pd.DataFrame({"count": list(range(100))})
+    size = factory.ResultRegistry.frame_bytes(df)
+    registry = factory.ResultRegistry(max_bytes=2 * size)
+    paths = [os.path.join(tmpdir, f"test_{i}.parquet") for i in range(3)]
+    for path in paths:
+        df.to_parquet(path)
+        registry.publish(path, df)
+    # oldest result dropped to make room
+    assert registry.get(paths[0]) is None
+    assert registry.get(paths[1]) is not None
+    assert registry.get(paths[2]) is not None
+    assert registry.size == 2 * size
+
+    large = pd.concat([df] * 3, ignore_index=True)
+    large.to_parquet(paths[0])
+    registry.publish(paths[0], large)
+    assert registry.get(paths[0]) is None
+    assert registry.size == 2 * size
+
+
+def test_csv_results_not_registered(tmpdir):
+    df = pd.DataFrame({"count": [1, 2]}, index=["1", "2"])
+    path = os.path.join(tmpdir, "test.csv")
+    factory.write_table(df, path, "csv")
+    assert factory.RESULTS.get(path) is None
+    assert list(factory.read_table(path, "csv", index_col=0).index) == [1, 2]
+
+
+@pytest.mark.parametrize("geometry_format", ["geoparquet", "flatgeobuf"])
+def test_write_geometry(tmpdir, geometry_format):
+    gdf = gp.GeoDataFrame(
+        {"length": [1.0, 2.0]},
+        geometry=[Point(0, 0), Point(1, 1)],
+        index=["1-2", "2-3"],
+        crs="EPSG:4326"
+    )
+    class DummyConfig:
+        output_path = tmpdir
+    config = DummyConfig()
+    config.geometry_format = geometry_format
+    workstation = factory.WorkStation(config=config)
+    assert workstation.separate_geometry
+    workstation.write_geometry(gdf, "network_links", "link_id")
+
+    tool = factory.Tool(config=config)
+    tool.logger = logging.getLogger(__name__)
+    result = tool.read_geometry("network_links")
+    assert list(result["link_id"]) == ["1-2", "2-3"]
+    assert list(result["length"]) == [1.0, 2.0]
+    assert result.geometry.iloc[1] == Point(1, 1)
+
+
 def test_write_geojson(tmpdir):
     df = pd.DataFrame({1:[1,2,3], 2: [4,5,6]})
     poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
@@ -652,6 +879,38 @@ def test_write_geojson_no_path(tmpdir):
     assert os.path.exists(path)
 
 
+@pytest.mark.parametrize("chunksize", [1, 2, 10])
+def test_write_spatial_geojson_in_chunks(tmpdir, chunksize):
+    df = pd.DataFrame({1: [1, 2, 3], "mode": ["car", None, "bus"]}, index=["a", "b", "c"])
+    poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
+    gdf = gp.GeoDataFrame(df, geometry=[poly]*3)
+    path = os.path.join(tmpdir, 'test.geojson')
+    factory.write_spatial(gdf, path, chunksize=chunksize)
+    with open(path) as file:
+        assert file.read() == gdf.to_json()
+
+
+def test_write_geojson_as_flatgeobuf(tmpdir):
+    df = pd.DataFrame({1:[1,2,3], 2: [4,5,6]})
+    poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
+    gdf = gp.GeoDataFrame(df, geometry=[poly]*3, crs="EPSG:4326")
+    class DummyConfig:
+        output_path = tmpdir
+    config = DummyConfig()
+    config.spatial_format = "flatgeobuf"
+    workstation = factory.WorkStation(config=config)
+    workstation.write_geojson(
+        write_object=gdf,
+        name='test.geojson',
+        write_path=None
+    )
+    path = os.path.join(tmpdir, 'test.fgb')
+    assert os.path.exists(path)
+    result = gp.read_file(path)
+    assert list(result["1"]) == [1, 2, 3]
+    assert result.crs == "EPSG:4326"
+
+
 def test_write_json(tmpdir):
     data = {1:[1,2,3], 2: [4,5,6]}
     workstation = factory.WorkStation(config=None)
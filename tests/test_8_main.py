@@ -256,3 +256,75 @@ def test_main_bad_input_path(test_config_bad_path):
 
     with pytest.raises(Exception):
         factory.build(requirements, write_path=test_outputs)
+
+
+def test_main_restores_cached_results(test_config, tmpdir):
+    import logging
+    from elara.main import define_and_connect_workstations
+
+    test_config.benchmarks = {}
+    test_config.cache_path = str(tmpdir.join("cache"))
+    test_config.cache_results = True
+    logger = logging.getLogger(__name__)
+
+    test_config.output_path = str(tmpdir.join("first"))
+    first = factory.build(define_and_connect_workstations(test_config, logger))
+
+    test_config.output_path = str(tmpdir.join("second"))
+    second = factory.build(define_and_connect_workstations(test_config, logger))
+
+    # handler and post processor results are restored, without building inputs
+    for station in second:
+        if isinstance(station, (EventHandlerWorkStation, PostProcessWorkStation)):
+            assert station.cached_resources
+        if isinstance(station, (EventHandlerWorkStation, PlanHandlerWorkStation, PostProcessWorkStation)):
+            assert not station.resources
+        if isinstance(station, InputsWorkStation):
+            assert not station.resources
+
+    first_files = sorted(f for f in os.listdir(tmpdir.join("first")) if os.path.isfile(tmpdir.join("first", f)))
+    second_files = sorted(f for f in os.listdir(tmpdir.join("second")) if os.path.isfile(tmpdir.join("second", f)))
+    assert first_files and first_files == second_files
+    for name in first_files:
+        assert tmpdir.join("first", name).read_binary() == tmpdir.join("second", name).read_binary()
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_main_post_processors_in_output_format(test_config, tmpdir, output_format):
+    import logging
+    from elara.main import define_and_connect_workstations
+
+    test_config.benchmarks = test_config.settings["benchmarks"] = {}
+    test_config.post_processors = test_config.settings["post_processors"] = {
+        "plan_summary": {"modes": ["all"]},
+        "trip_duration_breakdown": {"modes": ["all"]},
+        "trip_euclid_distance_breakdown": {"modes": ["all"]},
+    }
+    logger = logging.getLogger(__name__)
+
+    test_config.output_path = str(tmpdir.join("csv"))
+    factory.build(define_and_connect_workstations(test_config, logger))
+    test_config.output_path = str(tmpdir.join(output_format))
+    test_config.output_format = output_format
+    factory.build(define_and_connect_workstations(test_config, logger))
+
+    # post processor results are the same as for csv outputs
+    names = [
+        "plan_time_summary_all_legs", "plan_time_summary_all_activities",
+        "trip_duration_breakdown_all", "trip_duration_breakdown_mode",
+        "trip_euclid_distance_breakdown_all", "trip_euclid_distance_breakdown_mode",
+        "trip_euclid_distance_breakdown_d_act",
+    ]
+    for name in names:
+        expected = pd.read_csv(tmpdir.join("csv", f"{name}.csv"), index_col=0)
+        path = str(tmpdir.join(output_format, f"{name}.{output_format}"))
+        result = factory.read_table(path, output_format, index_col=0)
+        assert list(result.columns) == list(expected.columns), name
+        assert len(result) == len(expected), name
+        for column, series in expected.items():
+            if pd.api.types.is_numeric_dtype(series):
+                pd.testing.assert_series_equal(
+                    result[column].astype(float), series.astype(float), check_index=False, check_names=False
+                )
+            else:
+                assert list(result[column].astype(str)) == list(series.astype(str)), (name, column)
@@ -1,9 +1,11 @@
 import sys
 import os
 import pytest
+import numpy as np
+import pandas as pd
 
 sys.path.append(os.path.abspath('../elara'))
-from elara.factory import CSVChunkWriter, ArrowChunkWriter
+from elara.factory import CSVChunkWriter, ColumnarChunkWriter, ArrowChunkWriter, WriterThread
 
 test_dir = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 test_inputs = os.path.join(test_dir, "test_intermediate_data")
@@ -111,4 +113,119 @@ def test_arrow_auto_write_twice(arrow_data_A, arrow_data_B):
     writer.add(arrow_data_B)
     writer.add(arrow_data_A)
     writer.add(arrow_data_B)
-    assert len(writer.chunk) == 0
\ No newline at end of file
+    assert len(writer.chunk) == 0
+
+@pytest.fixture
+def columnar_schema():
+    return [('veh_id', object), ('entry_time', np.int64), ('speed', np.float64)]
+
+
+def test_columnar_add(columnar_schema):
+    writer = ColumnarChunkWriter(os.path.join(test_outputs, "test_chunks.csv"), columnar_schema)
+    writer.add([('a', 1, 2.5), ('b', 2, 3.5)])
+    writer.append(('c', 3, 4.5))
+    assert len(writer) == 3
+    assert writer.chunk[1] == {'veh_id': 'b', 'entry_time': 2, 'speed': 3.5}
+
+
+def test_columnar_auto_write_by_bytes(columnar_schema):
+    path = os.path.join(test_outputs, "test_columnar_chunks.csv")
+    # object values are assumed to take 64 bytes, so lines take 80 bytes
+    writer = ColumnarChunkWriter(path, columnar_schema, chunk_bytes=240)
+    assert writer.chunksize == 3
+    writer.add([('a', i, 1.5) for i in range(7)])
+    assert len(writer.chunk) == 1
+    assert len(writer) == 7
+    writer.finish()
+    df = pd.read_csv(path, index_col=0)
+    assert list(df.columns) == ['veh_id', 'entry_time', 'speed']
+    assert list(df.index) == list(range(7))
+    assert list(df.entry_time) == list(range(7))
+
+
+def test_columnar_parquet(columnar_schema):
+    path = os.path.join(test_outputs, "test_chunks.parquet")
+    writer = ColumnarChunkWriter(path, columnar_schema, chunk_bytes=240, file_format="parquet")
+    writer.add([('a', i, 1.5) for i in range(7)])
+    writer.finish()
+    df = pd.read_parquet(path)
+    assert list(df.entry_time) == list(range(7))
+    assert df.entry_time.dtype == np.int64
+    assert list(df.veh_id) == ['a'] * 7
+
+
+def test_finish_waits_for_background_writes(csv_data_streamer):
+    path = os.path.join(test_outputs, "test_background_chunks.csv")
+    writer = CSVChunkWriter(path, chunksize=5)
+    for _ in range(20):
+        writer.add(csv_data_streamer)
+    assert writer.writer_thread is not None
+    writer.finish()
+    assert writer.writer_thread is None
+    df = pd.read_csv(path, index_col=0)
+    assert list(df.index) == list(range(200))
+
+
+def test_writer_thread_raises_write_errors():
+    thread = WriterThread(name="test")
+
+    def fail():
+        raise OSError("disk full")
+
+    thread.submit(fail)
+    with pytest.raises(OSError):
+        thread.join()
+
+
+def test_arrow_schema_batches(arrow_data_A, arrow_data_B):
+    import pyarrow as pa
+    path = os.path.join(test_outputs, "test_schema_chunks.arrow")
+    schema = pa.schema([
+        ("trip", pa.int32()),
+        ("pid", pa.dictionary(pa.int32(), pa.string())),
+        ("mode", pa.dictionary(pa.int32(), pa.string())),
+        ("path", pa.list_(pa.list_(pa.float32(), 2))),
+        ("timestamps", pa.list_(pa.int32())),
+        ("color", pa.list_(pa.uint8(), 3)),
+    ])
+    writer = ArrowChunkWriter(path, chunksize=2, schema=schema)
+    writer.add(arrow_data_A)
+    writer.add(arrow_data_B)
+    writer.add(arrow_data_B)
+    writer.finish()
+    table = pa.ipc.RecordBatchStreamReader(path).read_all()
+    assert table.schema == schema
+    assert table.column("mode").to_pylist() == ["car", "bus", "bus"]
+    assert [len(path) for path in table.column("path").to_pylist()] == [4, 2, 2]
+    assert table.column("timestamps").to_pylist()[1] == [1590083729, 1590083729]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_csv_chunk_writer_columnar_formats(csv_data_streamer, file_format):
+    from elara.factory import read_table
+    path = os.path.join(test_outputs, f"test_chunks_format.{file_format}")
+    writer = CSVChunkWriter(path, chunksize=5, file_format=file_format)
+    writer.add(csv_data_streamer)
+    writer.add([{'a': 3, 'b': None}])
+    writer.finish()
+    df = read_table(path, file_format)
+    assert list(df.columns) == ['a', 'b']
+    assert len(df) == 11
+    assert df.a.dtype == np.int64
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_csv_chunk_writer_columnar_formats_null_first_chunk(file_format):
+    from elara.factory import read_table
+    path = os.path.join(test_outputs, f"test_chunks_null.{file_format}")
+    writer = CSVChunkWriter(path, chunksize=1, file_format=file_format)
+    writer.add([{'a': 1, 'b': None, 'c': None}, {'a': 2, 'b': None, 'c': None}])
+    writer.add([{'a': 3, 'b': 1.5, 'c': None}, {'a': 4, 'b': 2.5, 'c': "x"}])
+    writer.add([{'a': 5, 'b': None, 'c': "y"}])
+    writer.finish()
+    df = read_table(path, file_format)
+    assert len(df) == 5
+    assert df.b.dtype == np.float64
+    assert df.b.isna().tolist() == [True, True, False, False, True]
+    assert df.b.tolist()[2:4] == [1.5, 2.5]
+    assert df.c.tolist()[3:] == ["x", "y"]